@@ -0,0 +1,180 @@
+"""
+Time the scoring functions and the HTTP endpoints against a seeded database.
+
+    DB_HOST=127.0.0.1 python -m benchmarks.run --scale 100k [--seed] [--repeat 20]
+        [--output results.json] [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Each target is called --repeat times for latency (p50/p95) and once more
+under tracemalloc for peak Python memory. With --baseline the results are
+compared with the stored numbers for the same scale and the run exits with
+status 1 when a target is more than --tolerance slower or larger.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+
+from benchmarks.seed import DEFAULT_DATABASE, SCALES, use_database
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def targets(client, customers, rng):
+    """(name, callable) pairs for everything that is timed."""
+    from src.backend import calculate_health_score as health
+    from src.backend.health_cache import health_cache
+
+    def random_id():
+        return int(rng.integers(1, customers + 1))
+
+    def get(path):
+        def call():
+            # Cold read: the cache would otherwise answer every call after the first
+            health_cache.clear()
+            response = client.get(path() if callable(path) else path)
+            response.raise_for_status()
+        return call
+
+    def post(path, body):
+        def call():
+            client.post(path(), json=body()).raise_for_status()
+        return call
+
+    return [
+        ('login_freq', health.login_freq),
+        ('features_used', health.features_used),
+        ('tickets', health.tickets),
+        ('invoice', health.invoice),
+        ('api_call', health.api_call),
+        ('get_health_details', health.get_health_details),
+        ('get_health_details[1]', lambda: health.get_health_details([random_id()])),
+        ('GET /api/customers', get("/api/customers")),
+        ('GET /api/customers/{id}/health', get(lambda: f"/api/customers/{random_id()}/health")),
+        ('GET /api/customers/{id}/trend', get(lambda: f"/api/customers/{random_id()}/trend")),
+        ('GET /api/customers.json', get("/api/customers.json?limit=1000")),
+        ('GET /api/dashboard', get("/api/dashboard")),
+        ('GET /api/dashboard.json', get("/api/dashboard.json?sort=health_score&limit=1000")),
+        ('GET /api/export/health', get("/api/export/health")),
+        ('GET /api/cache/stats', get("/api/cache/stats")),
+        ('POST /api/customers/{id}/events', post(lambda: f"/api/customers/{random_id()}/events",
+                                                 lambda: {"type": "login", "details": {}})),
+        ('POST /api/events/batch', post(lambda: "/api/events/batch", lambda: {"events": [
+            {"customer_id": random_id(), "type": "api", "details": {"calls_count": 10}} for _ in range(100)]})),
+    ]
+
+
+def measure(func, repeat):
+    """Latency percentiles over `repeat` calls, then peak traced memory of one more."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "runs": repeat,
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "mean_ms": round(float(np.mean(timings)), 3),
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return [(target, metric, baseline, current)] for every regression beyond tolerance."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "peak_mb"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--seed', action='store_true', help='(re)create and seed the database first')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per target (default: 20)')
+    parser.add_argument('--only', action='append', help='run only targets whose name contains this')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown / growth over the baseline (default: 0.25)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the baseline for this scale')
+    args = parser.parse_args(argv)
+
+    customers = SCALES[args.scale]
+    if args.seed:
+        from benchmarks.seed import seed
+        seed(customers, args.database, workers=os.cpu_count())
+    # Must be set before the application opens its connection pool
+    use_database(args.database)
+
+    from fastapi.testclient import TestClient
+    from src.backend.main import app
+
+    rng = np.random.default_rng(0)
+    results = {}
+    with TestClient(app) as client:
+        for name, func in targets(client, customers, rng):
+            if args.only and not any(part in name for part in args.only):
+                continue
+            results[name] = measure(func, args.repeat)
+            r = results[name]
+            print(f"{name:36} p50 {r['p50_ms']:10.2f} ms  p95 {r['p95_ms']:10.2f} ms  peak {r['peak_mb']:8.2f} MB")
+
+    report = {
+        "scale": args.scale,
+        "customers": customers,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        # ru_maxrss is in KiB on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[args.scale] = results
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {args.scale} to {args.baseline}")
+        return 0
+
+    if args.scale not in baselines:
+        print(f"No baseline for {args.scale}; run with --save-baseline to record one")
+        return 0
+    regressions = compare(results, baselines[args.scale], args.tolerance)
+    for name, metric, before, after in regressions:
+        print(f"REGRESSION {name}: {metric} {before} -> {after}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Create and fill a benchmark database with synthetic customers and events.
+
+    DB_HOST=127.0.0.1 python -m benchmarks.seed --scale 100k [--database customer_health_bench] [--workers 8]
+
+The database is dropped and rebuilt from database/schema.sql and loaded by
+the sample generator (database/creating_samples.py, in parallel with
+--workers). With DB_BACKEND=sqlite it is the file <database>.sqlite3
+instead, loaded by this process. The derived tables (rollups, snapshot, today's history) are then
+built the same way the Docker entrypoint builds them.
+"""
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+SCHEMA = Path(__file__).resolve().parent.parent / "database" / "schema.sql"
+
+# Customer counts per named scale
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_DATABASE = "customer_health_bench"
+
+# Months of event history generated (see database/creating_samples.py for
+# the per-customer distributions)
+HISTORY_MONTHS = 3
+
+
+def schema_statements(database):
+    """schema.sql split into statements, with its USE pointed at `database`."""
+    text = "\n".join(line for line in SCHEMA.read_text().splitlines() if not line.lstrip().startswith("--"))
+    text = re.sub(r"USE\s+\w+", f"USE {database}", text)
+    return [statement.strip() for statement in text.split(";") if statement.strip()]
+
+
+def use_database(database):
+    """Point the application at `database`: a MySQL schema, or with DB_BACKEND=sqlite the file <database>.sqlite3."""
+    if os.getenv("DB_BACKEND") == "sqlite":
+        os.environ["DB_PATH"] = f"{database}.sqlite3"
+    else:
+        os.environ["DB_NAME"] = database
+
+
+def create_mysql_database(database):
+    """Drop and recreate `database` from schema.sql. Returns its connection settings."""
+    import mysql.connector
+    from src.utils import config
+
+    server = {k: v for k, v in config().items() if k != 'database'}
+    conn = mysql.connector.connect(**server)
+    cur = conn.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS {database}")
+    cur.execute(f"CREATE DATABASE {database}")
+    for statement in schema_statements(database):
+        cur.execute(statement)
+    conn.close()
+    return dict(server, database=database)
+
+
+def load_sqlite(customers, seed=0):
+    """Generate and load every block through the application's (SQLite) pool; SQLite has a single writer."""
+    from database.creating_samples import BLOCK_SIZE, generate_block, insert_rows, name_pool
+    from src.backend import db
+
+    names = name_pool(seed)
+    counts = {}
+    for block in range((customers + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        with db.transaction() as cur:
+            for table, df in generate_block(block, customers, seed, HISTORY_MONTHS, names=names).items():
+                insert_rows(cur, table, df)
+                counts[table] = counts.get(table, 0) + len(df)
+    return counts
+
+
+def seed(customers, database=DEFAULT_DATABASE, seed=0, workers=1):
+    """Rebuild `database` and load it with `customers` customers. Returns {table: rows}."""
+    from database.creating_samples import load_samples
+
+    sqlite = os.getenv("DB_BACKEND") == "sqlite"
+    if sqlite:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(f"{database}.sqlite3{suffix}"):
+                os.remove(f"{database}.sqlite3{suffix}")
+    else:
+        db_config = create_mysql_database(database)
+
+    # Everything below goes through the application's pool, pointed at the new database
+    use_database(database)
+    from src.backend import retention, rollups
+    from src.backend.health_history import record_health_history
+    from src.backend.health_snapshot import refresh_health_snapshot
+
+    retention.run()
+    if sqlite:
+        counts = load_sqlite(customers, seed)
+    else:
+        counts = load_samples(db_config, customers, seed, HISTORY_MONTHS, workers=workers)
+    rollups.backfill()
+    refresh_health_snapshot()
+    record_health_history(refresh=False)
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--seed', type=int, default=0, help='random seed (same seed, same data)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parallel loading processes')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for table, rows in seed(SCALES[args.scale], args.database, args.seed, args.workers).items():
+        print(f"{table}: {rows} rows")
+    print(f"Seeded {args.database} in {time.perf_counter() - started:.1f}s")
@@ -1,125 +1,258 @@
-import mysql.connector
-from faker import Faker
-import random
-from datetime import datetime, timedelta
+"""
+Generate sample customers and events and bulk-load them into the database.
+
+    python -m database.creating_samples [--customers 60] [--months 3] [--seed 42]
+        [--workers 4] [--load insert|infile] [--end-date YYYY-MM-DD]
+
+Customers are generated in fixed blocks of BLOCK_SIZE ids, each from its own
+random stream seeded with (seed, block), so the same arguments always give
+the same rows however many workers load them. Customer activity is skewed:
+a few heavy customers produce a large share of the events and most are in
+the long tail.
+"""
+import argparse
 import os
-import json
+import tempfile
+import time
+from datetime import date
+from multiprocessing import Pool
 from pathlib import Path
+import numpy as np
+import pandas as pd
+import mysql.connector
+from faker import Faker
+from src.utils import config as db_config
+
 BASE_DIR = Path(__file__).parent
-# --- Database Connection ---
-print(f"using base dir {BASE_DIR}")
-with open(str(BASE_DIR.parent / "src/db_config.json")) as f:
-    db_config = json.load(f)
-db_config["host"] = os.getenv("DB_HOST", db_config["host"])
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
-faker = Faker()
-# --- Idempotency Check ---
-try:
-    cursor.execute("SELECT COUNT(*) FROM customers")
-    result = cursor.fetchone()
-    if result[0] > 0:
-        print("Data already exists. Skipping data generation.")
-        cursor.close()
-        conn.close()
-        # Exit the script
-        exit()
-except mysql.connector.Error as err:
-    print(f"Error checking for existing data: {err}")
-    cursor.close()
-    conn.close()
-    exit()
-# --- Parameters ---
-NUM_CUSTOMERS = 60
-NUM_MONTHS = 3
-START_DATE = datetime.now() - timedelta(days=NUM_MONTHS * 30)
-
-# --- Helper function ---
-def random_date(start, end):
-    delta = end - start
-    return start + timedelta(days=random.randint(0, delta.days))
-
-# --- Insert Customers ---
-segments = ['Enterprise', 'SMB', 'Startup']
-customers = []
-for _ in range(NUM_CUSTOMERS):
-    name = faker.company()
-    email = faker.company_email()
-    segment = random.choice(segments)
-    created_at = random_date(START_DATE, datetime.now())
-    cursor.execute(
-        "INSERT INTO customers (name, email, segment, created_at) VALUES (%s, %s, %s, %s)",
-        (name, email, segment, created_at)
-    )
-    customers.append(cursor.lastrowid)
-
-conn.commit()
-
-# --- Insert Login Activity ---
-for customer_id in customers:
-    for _ in range(random.randint(10, 100)):
-        login_date = random_date(START_DATE, datetime.now())
-        cursor.execute(
-            "INSERT INTO logins (customer_id, login_date) VALUES (%s, %s)",
-            (customer_id, login_date)
-        )
 
-conn.commit()
-
-# --- Insert Feature Usage ---
-features = ['Feature_A', 'Feature_B', 'Feature_C', 'Feature_D', 'Feature_E']
-for customer_id in customers:
-    for _ in range(random.randint(5, 20)):
-        feature = random.choice(features)
-        usage_count = random.randint(1, 15)
-        usage_date = random_date(START_DATE, datetime.now())
-        cursor.execute(
-            "INSERT INTO feature_usage (customer_id, feature_name, usage_count, usage_date) VALUES (%s, %s, %s, %s)",
-            (customer_id, feature, usage_count, usage_date)
-        )
+# Customers per generation block (the unit of work handed to a worker)
+BLOCK_SIZE = 10000
+# Rows per multi-row INSERT
+INSERT_BATCH_SIZE = 5000
 
-conn.commit()
-
-# --- Insert Support Tickets ---
-ticket_statuses = ['open', 'closed', 'pending']
-priorities = ['low', 'medium', 'high']
-for customer_id in customers:
-    for _ in range(random.randint(0, 5)):  # some customers may have no tickets
-        created_at = random_date(START_DATE, datetime.now())
-        status = random.choice(ticket_statuses)
-        priority = random.choice(priorities)
-        cursor.execute(
-            "INSERT INTO support_tickets (customer_id, created_at, status, priority) VALUES (%s, %s, %s, %s)",
-            (customer_id, created_at, status, priority)
-        )
+# Mean events per customer over the whole period. Each customer's counts
+# are scaled by its activity level, lognormal with mean 1; with sigma 1 the
+# busiest 5% of customers produce about a quarter of all events.
+EVENTS_PER_CUSTOMER = {
+    'logins': 55,
+    'feature_usage': 12.5,
+    'support_tickets': 2.5,
+    'invoices': 3,
+    'api_usage': 20,
+}
+ACTIVITY_SIGMA = 1.0
 
-conn.commit()
-
-# --- Insert Invoices ---
-for customer_id in customers:
-    for _ in range(random.randint(1, 5)):  # 1–5 invoices per customer
-        amount = round(random.uniform(100, 1000), 2)
-        due_date = random_date(START_DATE, datetime.now())
-        paid_date = None if random.random() < 0.2 else random_date(due_date, datetime.now())
-        cursor.execute(
-            "INSERT INTO invoices (customer_id, amount, due_date, paid_date) VALUES (%s, %s, %s, %s)",
-            (customer_id, amount, due_date, paid_date)
-        )
+SEGMENTS = (['Enterprise', 'SMB', 'Startup'], [0.1, 0.4, 0.5])
+FEATURES = (['Feature_A', 'Feature_B', 'Feature_C', 'Feature_D', 'Feature_E'], [0.4, 0.25, 0.15, 0.12, 0.08])
+TICKET_STATUSES = (['open', 'closed', 'pending'], [0.25, 0.6, 0.15])
+PRIORITIES = (['low', 'medium', 'high'], [0.5, 0.35, 0.15])
+# Share of invoices never paid
+UNPAID_RATE = 0.1
+# Company names are drawn from a seeded pool (Faker is too slow per row)
+NAME_POOL_SIZE = 1000
+
+# Column order of the generated rows, per table (customers first: invoices
+# reference them)
+COLUMNS = {
+    'customers': ['id', 'name', 'email', 'segment', 'created_at'],
+    'logins': ['customer_id', 'login_date'],
+    'feature_usage': ['customer_id', 'feature_name', 'usage_count', 'usage_date'],
+    'support_tickets': ['customer_id', 'created_at', 'status', 'priority'],
+    'invoices': ['customer_id', 'amount', 'due_date', 'paid_date'],
+    'api_usage': ['customer_id', 'calls_count', 'usage_date'],
+}
+
+
+def name_pool(seed):
+    faker = Faker()
+    faker.seed_instance(seed)
+    return np.array([faker.company() for _ in range(NAME_POOL_SIZE)], dtype=object)
+
+
+def generate_block(block, customers, seed=42, months=3, end=None, names=None):
+    """
+    Generate the customers of one block and all their events.
+
+    Returns {table: DataFrame} with the COLUMNS of each table. Dates fall in
+    the months * 30 days up to end (today by default).
+    """
+    end = np.datetime64(end or date.today(), 'D')
+    period = months * 30
+    names = name_pool(seed) if names is None else names
+    rng = np.random.default_rng([seed, block])
+    ids = np.arange(block * BLOCK_SIZE + 1, min((block + 1) * BLOCK_SIZE, customers) + 1)
+    n = len(ids)
+
+    def choice(options, size):
+        values, weights = options
+        return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights)]
+
+    def dates(size, span=period):
+        return end - rng.integers(0, span + 1, size=size).astype('timedelta64[D]')
+
+    activity = rng.lognormal(-ACTIVITY_SIGMA ** 2 / 2, ACTIVITY_SIGMA, size=n)
+
+    def owners(table):
+        return np.repeat(ids, rng.poisson(EVENTS_PER_CUSTOMER[table] * activity))
+
+    data = {'customers': pd.DataFrame({
+        'id': ids,
+        'name': names[rng.integers(0, len(names), size=n)],
+        'email': [f"contact{i}@example.com" for i in ids],
+        'segment': choice(SEGMENTS, n),
+        'created_at': dates(n),
+    })}
 
-conn.commit()
+    customer_id = owners('logins')
+    data['logins'] = pd.DataFrame({'customer_id': customer_id, 'login_date': dates(len(customer_id))})
 
-# --- Insert API Usage ---
-for customer_id in customers:
-    for _ in range(random.randint(10, 30)):  # 10–30 API usage records
-        calls_count = random.randint(10, 500)
-        usage_date = random_date(START_DATE, datetime.now())
-        cursor.execute(
-            "INSERT INTO api_usage (customer_id, calls_count, usage_date) VALUES (%s, %s, %s)",
-            (customer_id, calls_count, usage_date)
+    customer_id = owners('feature_usage')
+    data['feature_usage'] = pd.DataFrame({
+        'customer_id': customer_id,
+        'feature_name': choice(FEATURES, len(customer_id)),
+        'usage_count': rng.integers(1, 16, size=len(customer_id)),
+        'usage_date': dates(len(customer_id)),
+    })
+
+    customer_id = owners('support_tickets')
+    data['support_tickets'] = pd.DataFrame({
+        'customer_id': customer_id,
+        'created_at': dates(len(customer_id)),
+        'status': choice(TICKET_STATUSES, len(customer_id)),
+        'priority': choice(PRIORITIES, len(customer_id)),
+    })
+
+    # Some customers habitually pay late: each has its own lateness rate
+    lateness = rng.beta(1, 4, size=n)
+    customer_id = owners('invoices')
+    due = dates(len(customer_id))
+    late = rng.random(len(customer_id)) < lateness[customer_id - ids[0]]
+    paid = np.where(late, due + rng.integers(1, 31, size=len(customer_id)).astype('timedelta64[D]'),
+                    due - rng.integers(0, 11, size=len(customer_id)).astype('timedelta64[D]'))
+    # Payments after the end date have not happened yet
+    unpaid = (rng.random(len(customer_id)) < UNPAID_RATE) | (paid > end)
+    data['invoices'] = pd.DataFrame({
+        'customer_id': customer_id,
+        'amount': np.round(rng.lognormal(6, 0.6, size=len(customer_id)), 2),
+        'due_date': due,
+        'paid_date': np.where(unpaid, np.datetime64('NaT'), paid),
+    })
+
+    customer_id = owners('api_usage')
+    data['api_usage'] = pd.DataFrame({
+        'customer_id': customer_id,
+        'calls_count': rng.integers(10, 501, size=len(customer_id)),
+        'usage_date': dates(len(customer_id)),
+    })
+    return data
+
+
+def column_values(series):
+    """A column as Python values for the driver: dates for datetimes, None for NaT."""
+    if series.dtype.kind == 'M':
+        return series.to_numpy().astype('datetime64[D]').astype(object).tolist()
+    return series.tolist()
+
+
+def insert_rows(cur, table, df):
+    """Load df with multi-row INSERTs."""
+    query = f"INSERT INTO {table} ({', '.join(COLUMNS[table])}) VALUES ({', '.join(['%s'] * len(COLUMNS[table]))})"
+    rows = list(zip(*(column_values(df[column]) for column in df.columns)))
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        cur.executemany(query, rows[start:start + INSERT_BATCH_SIZE])
+
+
+def infile_rows(cur, table, df):
+    """Load df with LOAD DATA LOCAL INFILE from a temporary CSV file."""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        df.to_csv(f, index=False, header=False, na_rep='\\N', date_format='%Y-%m-%d')
+    try:
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} FIELDS TERMINATED BY ',' "
+            f"OPTIONALLY ENCLOSED BY '\"' ({', '.join(COLUMNS[table])})",
+            (f.name,)
         )
+    finally:
+        os.remove(f.name)
+
+
+LOADERS = {'insert': insert_rows, 'infile': infile_rows}
+
+_worker = {}
 
-conn.commit()
 
-cursor.close()
-conn.close()
-print("Sample data generation completed successfully!")
+def _init_worker(config, load, customers, seed, months, end):
+    _worker.update(config=config, load=load, customers=customers, seed=seed, months=months, end=end,
+                   names=name_pool(seed))
+
+
+def _load_block(block):
+    """Generate one block and load it on a connection of its own, closed afterwards."""
+    w = _worker
+    conn = mysql.connector.connect(allow_local_infile=w['load'] == 'infile', **w['config'])
+    try:
+        cursor = conn.cursor()
+        counts = {}
+        try:
+            for table, df in generate_block(block, w['customers'], w['seed'], w['months'], w['end'], w['names']).items():
+                LOADERS[w['load']](cursor, table, df)
+                counts[table] = len(df)
+            conn.commit()
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+    return counts
+
+
+def load_samples(config, customers, seed=42, months=3, end=None, workers=1, load='insert'):
+    """Generate and load every block, in parallel when workers > 1. Returns {table: rows}."""
+    blocks = range((customers + BLOCK_SIZE - 1) // BLOCK_SIZE)
+    initargs = (config, load, customers, seed, months, end)
+    totals = dict.fromkeys(COLUMNS, 0)
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            results = list(pool.imap_unordered(_load_block, blocks))
+    else:
+        _init_worker(*initargs)
+        results = [_load_block(block) for block in blocks]
+    for counts in results:
+        for table, rows in counts.items():
+            totals[table] += rows
+    return totals
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--customers', type=int, default=60)
+    parser.add_argument('--months', type=int, default=3, help='months of event history (default: 3)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (same seed, same data)')
+    parser.add_argument('--end-date', type=date.fromisoformat, help='last day of generated data (default: today)')
+    parser.add_argument('--workers', type=int, default=1, help='parallel generate-and-load processes')
+    parser.add_argument('--load', choices=sorted(LOADERS), default='insert',
+                        help='multi-row INSERTs, or LOAD DATA LOCAL INFILE (needs local_infile=ON on the server)')
+    args = parser.parse_args()
+
+    config = db_config()
+    print(f"using base dir {BASE_DIR}")
+    # --- Idempotency Check ---
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM customers")
+        existing = cursor.fetchone()[0]
+    except mysql.connector.Error as err:
+        print(f"Error checking for existing data: {err}")
+        raise SystemExit(1)
+    finally:
+        cursor.close()
+        conn.close()
+    if existing > 0:
+        print("Data already exists. Skipping data generation.")
+        raise SystemExit(0)
+
+    started = time.perf_counter()
+    totals = load_samples(config, args.customers, args.seed, args.months, args.end_date, args.workers, args.load)
+    for table, rows in totals.items():
+        print(f"{table}: {rows} rows")
+    print(f"Sample data generation completed successfully in {time.perf_counter() - started:.1f}s!")
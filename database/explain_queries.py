@@ -0,0 +1,127 @@
+"""
+Capture the EXPLAIN plan of every query issued by
+src/backend/calculate_health_score.py and flag full table scans.
+
+    python -m database.explain_queries [--customer-id 1] [--output plans.json]
+
+Exits with status 1 when a plan regresses to a full scan, so it can run in CI
+against a database created from schema.sql.
+"""
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+from src.backend import db
+from src.backend import calculate_health_score as health
+
+# Tables that population-wide queries are expected to read in full
+# (the query is driven from customers so every customer is returned)
+POPULATION_FULL_SCANS_ALLOWED = {'customers', 'c'}
+
+
+class CapturingCursor:
+    """Cursor stand-in that records statements instead of running them."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=()):
+        self.statements.append((query, tuple(params or ())))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def capture_queries(customer_id):
+    """
+    Run each scoring function against a CapturingCursor and return
+    [(name, point_query, query, params)] for everything they would execute.
+    """
+    functions = [
+        ('login_freq', health.login_freq),
+        ('features_used', health.features_used),
+        ('tickets', health.tickets),
+        ('invoice', health.invoice),
+        ('api_call', health.api_call),
+        ('health_components', health.health_components),
+    ]
+    captured = []
+    original = db.cursor
+    try:
+        for name, func in functions:
+            for point_query in (False, True):
+                capture = CapturingCursor()
+
+                @contextmanager
+                def capturing_cursor(dictionary=False):
+                    yield capture
+
+                db.cursor = capturing_cursor
+                func([customer_id] if point_query else None)
+                label = f"{name}(customer_ids=[{customer_id}])" if point_query else f"{name}()"
+                for query, params in capture.statements:
+                    captured.append((label, point_query, query, params))
+    finally:
+        db.cursor = original
+    return captured
+
+
+def full_scans(plan, point_query):
+    """
+    Return the plan rows that read a whole table. Point queries must not
+    scan anything in full; population queries may only scan customers.
+    Materialized derived tables (<derivedN>) are never flagged.
+    """
+    flagged = []
+    for row in plan:
+        table = row.get('table') or ''
+        if table.startswith('<'):
+            continue
+        access = row.get('type')
+        if access == 'ALL' and (point_query or table not in POPULATION_FULL_SCANS_ALLOWED):
+            flagged.append(row)
+        elif access == 'index' and point_query:
+            # Full index scan: cheaper than ALL, still O(table) per lookup
+            flagged.append(row)
+    return flagged
+
+
+def explain(cur, query, params):
+    cur.execute("EXPLAIN " + query, params)
+    return cur.fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--customer-id', type=int, default=1,
+                        help='customer used for the single-customer variants (default: 1)')
+    parser.add_argument('--output', help='write the captured plans to this JSON file')
+    args = parser.parse_args(argv)
+
+    report = []
+    with db.cursor(dictionary=True) as cur:
+        for label, point_query, query, params in capture_queries(args.customer_id):
+            plan = explain(cur, query, params)
+            flagged = full_scans(plan, point_query)
+            report.append({'query': label, 'sql': query.strip(), 'plan': plan, 'full_scans': flagged})
+            status = 'FULL SCAN' if flagged else 'ok'
+            print(f"{status:9} {label}")
+            for row in plan:
+                # Partitioned tables list the partitions left after pruning
+                if row.get('partitions'):
+                    print(f"          table={row.get('table')} partitions={row.get('partitions')}")
+            for row in flagged:
+                print(f"          table={row.get('table')} type={row.get('type')} rows={row.get('rows')}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    return 1 if any(entry['full_scans'] for entry in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,20 @@
+-- Adds the customer_health snapshot table to an existing database.
+-- Populate it afterwards with `python -m src.backend.health_snapshot`.
+USE customer_health;
+
+-- Materialized health scores (one row per customer).
+-- Kept current by the event write path and rebuilt with
+-- `python -m src.backend.health_snapshot`; the read endpoints only scan this table.
+CREATE TABLE IF NOT EXISTS customer_health (
+    customer_id INT PRIMARY KEY,
+    login_score DOUBLE,
+    feature_score DOUBLE,
+    ticket_score DOUBLE,
+    invoice_payment_score DOUBLE,
+    api_score DOUBLE,
+    health_score DOUBLE,
+    updated_at DATETIME,
+    INDEX idx_customer_health_score (health_score),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+
@@ -0,0 +1,20 @@
+-- Covering indexes for the scoring queries in src/backend/calculate_health_score.py.
+-- Fresh databases get them from schema.sql; run this once on existing ones.
+-- Check the resulting plans with `python -m database.explain_queries`.
+USE customer_health;
+
+-- login_freq(): window count per customer
+CREATE INDEX idx_logins_customer_date ON logins (customer_id, login_date);
+
+-- features_used(): COUNT(DISTINCT feature_name) per customer
+CREATE INDEX idx_feature_usage_customer_feature ON feature_usage (customer_id, feature_name);
+
+-- tickets(): open/pending tickets in the window, for the population and per customer
+CREATE INDEX idx_tickets_status_created ON support_tickets (status, created_at, customer_id);
+CREATE INDEX idx_tickets_customer_status ON support_tickets (customer_id, status, created_at);
+
+-- invoice(): on-time ratio per customer
+CREATE INDEX idx_invoices_customer_dates ON invoices (customer_id, due_date, paid_date);
+
+-- api_call(): SUM(calls_count) in the window per customer
+CREATE INDEX idx_api_usage_customer_date ON api_usage (customer_id, usage_date, calls_count);
@@ -0,0 +1,41 @@
+-- Adds the daily rollup tables to an existing database.
+-- Fill them from the raw events afterwards with `python -m src.backend.rollups`.
+USE customer_health;
+
+-- Daily per-customer rollups of the event tables. Maintained on ingest
+-- (src/backend/events.py) and rebuilt with `python -m src.backend.rollups`;
+-- the scoring queries read these instead of the raw events.
+CREATE TABLE IF NOT EXISTS daily_logins (
+    customer_id INT,
+    day DATE,
+    logins INT NOT NULL,
+    PRIMARY KEY (customer_id, day),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_api_usage (
+    customer_id INT,
+    day DATE,
+    calls_count BIGINT NOT NULL,
+    PRIMARY KEY (customer_id, day),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_feature_usage (
+    customer_id INT,
+    day DATE,
+    feature_name VARCHAR(50),
+    usage_count INT NOT NULL,
+    PRIMARY KEY (customer_id, day, feature_name),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_tickets (
+    customer_id INT,
+    day DATE,
+    status ENUM('open', 'closed', 'pending'),
+    tickets INT NOT NULL,
+    PRIMARY KEY (customer_id, day, status),
+    INDEX idx_daily_tickets_status_day (status, day, customer_id),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
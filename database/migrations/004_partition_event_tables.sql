@@ -0,0 +1,57 @@
+-- Partitions the raw event tables and the windowed rollups by month.
+-- Fresh databases get this layout from schema.sql; run this once on existing ones,
+-- then `python -m src.backend.retention` to split pmax into monthly partitions.
+--
+-- MySQL requires the partitioning column in every unique key and does not allow
+-- foreign keys on partitioned tables, so the date joins the primary key and the
+-- foreign keys are dropped. The constraint names are the ones MySQL generates for
+-- the unnamed constraints in schema.sql; check SHOW CREATE TABLE if they differ.
+-- Each ALTER ... PARTITION BY rebuilds the table, so run this in a quiet period.
+USE customer_health;
+
+ALTER TABLE logins DROP FOREIGN KEY logins_ibfk_1;
+ALTER TABLE logins MODIFY login_date DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, login_date);
+ALTER TABLE logins PARTITION BY RANGE COLUMNS(login_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE feature_usage DROP FOREIGN KEY feature_usage_ibfk_1;
+ALTER TABLE feature_usage MODIFY usage_date DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, usage_date);
+ALTER TABLE feature_usage PARTITION BY RANGE COLUMNS(usage_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE support_tickets DROP FOREIGN KEY support_tickets_ibfk_1;
+ALTER TABLE support_tickets MODIFY created_at DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at);
+ALTER TABLE support_tickets PARTITION BY RANGE COLUMNS(created_at) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE api_usage DROP FOREIGN KEY api_usage_ibfk_1;
+ALTER TABLE api_usage MODIFY usage_date DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY (id, usage_date);
+ALTER TABLE api_usage PARTITION BY RANGE COLUMNS(usage_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Rollups read only inside the scoring window (daily_feature_usage keeps lifetime data)
+ALTER TABLE daily_logins DROP FOREIGN KEY daily_logins_ibfk_1;
+ALTER TABLE daily_logins PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE daily_api_usage DROP FOREIGN KEY daily_api_usage_ibfk_1;
+ALTER TABLE daily_api_usage PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE daily_tickets DROP FOREIGN KEY daily_tickets_ibfk_1;
+ALTER TABLE daily_tickets PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,24 @@
+-- Adds the health score history table to an existing database.
+-- Run `python -m src.backend.retention` afterwards to create its monthly partitions.
+USE customer_health;
+
+-- Daily health score history, one row per customer per day, written by
+-- `python -m src.backend.health_history`. Component scores are whole numbers
+-- 0-100 and health_score is stored in hundredths, so a row is 14 bytes of data.
+-- Monthly partitions past HISTORY_RETENTION_MONTHS are dropped by
+-- `python -m src.backend.retention`.
+CREATE TABLE IF NOT EXISTS health_score_history (
+    customer_id INT,
+    day DATE,
+    login_score TINYINT UNSIGNED NOT NULL,
+    feature_score TINYINT UNSIGNED NOT NULL,
+    ticket_score TINYINT UNSIGNED NOT NULL,
+    invoice_payment_score TINYINT UNSIGNED NOT NULL,
+    api_score TINYINT UNSIGNED NOT NULL,
+    health_score SMALLINT UNSIGNED NOT NULL,
+    PRIMARY KEY (customer_id, day)
+)
+PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
@@ -12,31 +12,56 @@ CREATE TABLE customers (
 );
 
 -- Login activity (frequency)
+-- The raw event tables are partitioned by month on their event date, so they
+-- carry no foreign keys (MySQL does not allow them on partitioned tables) and
+-- the date is part of the primary key.
 CREATE TABLE logins (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     customer_id INT,
-    login_date DATE,
-    FOREIGN KEY (customer_id) REFERENCES customers(id)
+    login_date DATE NOT NULL,
+    PRIMARY KEY (id, login_date),
+    INDEX idx_logins_customer_date (customer_id, login_date)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(login_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
 );
 
 -- Feature adoption
 CREATE TABLE feature_usage (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     customer_id INT,
     feature_name VARCHAR(50),
     usage_count INT,
-    usage_date DATE,
-    FOREIGN KEY (customer_id) REFERENCES customers(id)
+    usage_date DATE NOT NULL,
+    PRIMARY KEY (id, usage_date),
+    INDEX idx_feature_usage_customer_feature (customer_id, feature_name)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(usage_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
 );
 
 -- Support tickets
 CREATE TABLE support_tickets (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     customer_id INT,
-    created_at DATE,
+    created_at DATE NOT NULL,
     status ENUM('open', 'closed', 'pending'),
     priority ENUM('low', 'medium', 'high'),
-    FOREIGN KEY (customer_id) REFERENCES customers(id)
+    PRIMARY KEY (id, created_at),
+    INDEX idx_tickets_status_created (status, created_at, customer_id),
+    INDEX idx_tickets_customer_status (customer_id, status, created_at)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(created_at) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
 );
 
 -- Invoices (payment timeliness)
@@ -46,14 +71,114 @@ CREATE TABLE invoices (
     amount DECIMAL(10,2),
     due_date DATE,
     paid_date DATE,
+    INDEX idx_invoices_customer_dates (customer_id, due_date, paid_date),
     FOREIGN KEY (customer_id) REFERENCES customers(id)
 );
 
 -- API usage
 CREATE TABLE api_usage (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     customer_id INT,
     calls_count INT,
-    usage_date DATE,
+    usage_date DATE NOT NULL,
+    PRIMARY KEY (id, usage_date),
+    INDEX idx_api_usage_customer_date (customer_id, usage_date, calls_count)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(usage_date) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Materialized health scores (one row per customer).
+-- Kept current by the event write path and rebuilt with
+-- `python -m src.backend.health_snapshot`; the read endpoints only scan this table.
+CREATE TABLE customer_health (
+    customer_id INT PRIMARY KEY,
+    login_score DOUBLE,
+    feature_score DOUBLE,
+    ticket_score DOUBLE,
+    invoice_payment_score DOUBLE,
+    api_score DOUBLE,
+    health_score DOUBLE,
+    updated_at DATETIME,
+    INDEX idx_customer_health_score (health_score),
+    FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+
+-- Daily per-customer rollups of the event tables. Maintained on ingest
+-- (src/backend/events.py) and rebuilt with `python -m src.backend.rollups`;
+-- the scoring queries read these instead of the raw events. The rollups that
+-- are only read inside the scoring window are partitioned by month as well,
+-- so window queries prune to the months they cover.
+CREATE TABLE daily_logins (
+    customer_id INT,
+    day DATE,
+    logins INT NOT NULL,
+    PRIMARY KEY (customer_id, day)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE daily_api_usage (
+    customer_id INT,
+    day DATE,
+    calls_count BIGINT NOT NULL,
+    PRIMARY KEY (customer_id, day)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE daily_feature_usage (
+    customer_id INT,
+    day DATE,
+    feature_name VARCHAR(50),
+    usage_count INT NOT NULL,
+    PRIMARY KEY (customer_id, day, feature_name),
     FOREIGN KEY (customer_id) REFERENCES customers(id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE daily_tickets (
+    customer_id INT,
+    day DATE,
+    status ENUM('open', 'closed', 'pending'),
+    tickets INT NOT NULL,
+    PRIMARY KEY (customer_id, day, status),
+    INDEX idx_daily_tickets_status_day (status, day, customer_id)
+)
+-- Monthly partitions are added (and expired ones compacted and dropped) by
+-- `python -m src.backend.retention`
+PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- Daily health score history, one row per customer per day, written by
+-- `python -m src.backend.health_history`. Component scores are whole numbers
+-- 0-100 and health_score is stored in hundredths, so a row is 14 bytes of data.
+-- Monthly partitions past HISTORY_RETENTION_MONTHS are dropped by
+-- `python -m src.backend.retention`.
+CREATE TABLE health_score_history (
+    customer_id INT,
+    day DATE,
+    login_score TINYINT UNSIGNED NOT NULL,
+    feature_score TINYINT UNSIGNED NOT NULL,
+    ticket_score TINYINT UNSIGNED NOT NULL,
+    invoice_payment_score TINYINT UNSIGNED NOT NULL,
+    api_score TINYINT UNSIGNED NOT NULL,
+    health_score SMALLINT UNSIGNED NOT NULL,
+    PRIMARY KEY (customer_id, day)
+)
+PARTITION BY RANGE COLUMNS(day) (
+    PARTITION p_old VALUES LESS THAN ('2000-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,110 @@
+-- Schema of the embedded SQLite backend (DB_BACKEND=sqlite).
+-- The same tables as schema.sql, without partitions: retention deletes
+-- expired rows instead of dropping partitions. Applied automatically the
+-- first time the backend opens its database file.
+
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100),
+    email VARCHAR(100),
+    segment TEXT CHECK (segment IN ('Enterprise', 'SMB', 'Startup')),
+    created_at DATE
+);
+
+CREATE TABLE IF NOT EXISTS logins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT,
+    login_date DATE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logins_customer_date ON logins (customer_id, login_date);
+
+CREATE TABLE IF NOT EXISTS feature_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT,
+    feature_name VARCHAR(50),
+    usage_count INT,
+    usage_date DATE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feature_usage_customer_feature ON feature_usage (customer_id, feature_name);
+
+CREATE TABLE IF NOT EXISTS support_tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT,
+    created_at DATE NOT NULL,
+    status TEXT CHECK (status IN ('open', 'closed', 'pending')),
+    priority TEXT CHECK (priority IN ('low', 'medium', 'high'))
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON support_tickets (status, created_at, customer_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_customer_status ON support_tickets (customer_id, status, created_at);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT REFERENCES customers(id),
+    amount DECIMAL(10,2),
+    due_date DATE,
+    paid_date DATE
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_customer_dates ON invoices (customer_id, due_date, paid_date);
+
+CREATE TABLE IF NOT EXISTS api_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT,
+    calls_count INT,
+    usage_date DATE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_api_usage_customer_date ON api_usage (customer_id, usage_date, calls_count);
+
+CREATE TABLE IF NOT EXISTS customer_health (
+    customer_id INT PRIMARY KEY REFERENCES customers(id),
+    login_score DOUBLE,
+    feature_score DOUBLE,
+    ticket_score DOUBLE,
+    invoice_payment_score DOUBLE,
+    api_score DOUBLE,
+    health_score DOUBLE,
+    updated_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_customer_health_score ON customer_health (health_score);
+
+CREATE TABLE IF NOT EXISTS daily_logins (
+    customer_id INT,
+    day DATE,
+    logins INT NOT NULL,
+    PRIMARY KEY (customer_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS daily_api_usage (
+    customer_id INT,
+    day DATE,
+    calls_count BIGINT NOT NULL,
+    PRIMARY KEY (customer_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS daily_feature_usage (
+    customer_id INT REFERENCES customers(id),
+    day DATE,
+    feature_name VARCHAR(50),
+    usage_count INT NOT NULL,
+    PRIMARY KEY (customer_id, day, feature_name)
+);
+
+CREATE TABLE IF NOT EXISTS daily_tickets (
+    customer_id INT,
+    day DATE,
+    status TEXT CHECK (status IN ('open', 'closed', 'pending')),
+    tickets INT NOT NULL,
+    PRIMARY KEY (customer_id, day, status)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_tickets_status_day ON daily_tickets (status, day, customer_id);
+
+CREATE TABLE IF NOT EXISTS health_score_history (
+    customer_id INT,
+    day DATE,
+    login_score TINYINT UNSIGNED NOT NULL,
+    feature_score TINYINT UNSIGNED NOT NULL,
+    ticket_score TINYINT UNSIGNED NOT NULL,
+    invoice_payment_score TINYINT UNSIGNED NOT NULL,
+    api_score TINYINT UNSIGNED NOT NULL,
+    health_score SMALLINT UNSIGNED NOT NULL,
+    PRIMARY KEY (customer_id, day)
+);
@@ -1,7 +1,5 @@
 #!/bin/sh
 
-# The database container is ready and the schema has been applied.
-# Now, run the Python script to populate the database with sample data.
-python /app/database/creating_samples.py
-
-uvicorn src.backend.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# The init service has already set up the database and the scheduler service
+# keeps it maintained, so a replica only starts the API
+exec uvicorn src.backend.main:app --host 0.0.0.0 --port 8000
@@ -0,0 +1,21 @@
+#!/bin/sh
+set -e
+
+# One-shot database setup, run by the init service before any backend
+# replica starts (see docker-compose.backend.yml). The schema has been
+# applied by the database container.
+
+# Create the monthly partitions of the event and rollup tables
+python -m src.backend.retention
+
+# Populate the database with sample data (skipped when data exists)
+python -m database.creating_samples
+
+# Build the daily rollups the scoring queries read from the raw events
+python -m src.backend.rollups
+
+# Materialize the health scores the read endpoints serve from
+python -m src.backend.health_snapshot
+
+# Record today's scores in the trend history (the scheduler service repeats it daily)
+python -m src.backend.health_history --no-refresh
@@ -1,55 +1,206 @@
-import mysql.connector
-import pandas as pd
+import calendar
+import contextvars
+import functools
 import os
-import json
-from src.utils import config
-db_config = config()
-    
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor(dictionary=True)
-def login_freq():
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import date
+from src.backend import db, tracing
+from src.backend.metrics import QUERY_ROWS, current_function, timed
+from src.backend.scoring import SCORE_TABLES, score_column, score_components
+
+# Login, feature, ticket and API components are read from the daily rollup
+# tables (see rollups.py), so their cost scales with customers x days rather
+# than raw event volume. Invoices are read directly.
+
+# Raw components returned by health_components(), one row per customer
+COMPONENT_COLUMNS = ['customer_id', 'avg_logins_per_week', 'feature_adoption_score',
+                     'open_tickets', 'invoice_payment_score', 'avg_api_calls_per_week']
+# Their array types: ids fit the INT primary key; the metrics stay float64
+# because the feature and invoice values are stored as scores unchanged
+COMPONENT_DTYPES = {'customer_id': np.int32, **{column: np.float64 for column in COMPONENT_COLUMNS[1:]}}
+
+# Customers scored per round-trip by iter_health_details()
+EXPORT_CHUNK_SIZE = 1000
+# Most ids put in one IN list: the component query repeats the filter six
+# times, which keeps it well under SQLite's bound-variable limit (32766)
+FILTER_CHUNK_SIZE = 1000
+
+# Look-back of the login, ticket and API components
+WINDOW_MONTHS = 3
+
+# Optional fan-out (environment overrides the defaults): with
+# PARALLEL_COMPONENTS=1, health_components() outside a transaction runs the
+# five per-table aggregates and the customer list as six queries at once on
+# their own pooled connections, so it waits for the slowest aggregate rather
+# than for all of them in turn. Size DB_POOL_SIZE for the extra connections.
+PARALLEL_COMPONENTS = os.getenv("PARALLEL_COMPONENTS", "0") == "1"
+# Threads shared by every call's component queries; each holds one pooled
+# connection while its query runs
+COMPONENT_WORKERS = int(os.getenv("COMPONENT_WORKERS", str(db.POOL_SIZE)))
+# Seconds the component queries of one call may take, waiting included
+COMPONENT_TIMEOUT = float(os.getenv("COMPONENT_TIMEOUT", "30"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ComponentQueryError(Exception):
+    """Raised when a concurrently run component query fails or misses COMPONENT_TIMEOUT."""
+
+
+def customer_filter(customer_ids, keyword='AND', column='customer_id'):
+    """
+    Return (sql, params) restricting column to customer_ids, e.g.
+    (" AND customer_id IN (%s,%s)", (1, 2)). No filter when customer_ids is None.
+    """
+    if customer_ids is None:
+        return "", ()
+    params = tuple(customer_ids)
+    # IN (NULL) matches nothing, so an empty id list returns no rows
+    placeholders = ",".join(["%s"] * len(params)) or "NULL"
+    return f" {keyword} {column} IN ({placeholders})", params
+
+
+def id_chunks(customer_ids, size=FILTER_CHUNK_SIZE):
+    """Split customer_ids into lists of at most size ids ([[]] for no ids), one per filtered query."""
+    customer_ids = list(customer_ids)
+    return [customer_ids[start:start + size] for start in range(0, len(customer_ids), size)] or [customer_ids]
+
+
+def months_before(day, months=WINDOW_MONTHS):
+    """day minus months, clamped to the end of the month like MySQL's INTERVAL n MONTH."""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def window_filter(as_of=None, column='day'):
+    """
+    Return (sql condition, params) for the WINDOW_MONTHS ending on as_of.
+    Without as_of the window ends now, as "day >= NOW() - INTERVAL 3 MONTH";
+    against a DATE column that keeps the days after the date 3 months ago,
+    which is what the as_of form spells out.
+    """
+    if as_of is None:
+        return f"{column} >= NOW() - INTERVAL {WINDOW_MONTHS} MONTH", ()
+    return f"{column} > %s AND {column} <= %s", (months_before(as_of), as_of)
+
+
+def as_of_filter(as_of, keyword='AND', column='day'):
+    """Return (sql, params) keeping rows dated on or before as_of; no filter when as_of is None."""
+    if as_of is None:
+        return "", ()
+    return f" {keyword} {column} <= %s", (as_of,)
+
+
+def _fetch_rows(query, params, cur):
+    """Run query on cur and return its rows, recording the row count (and the query when traced)."""
+    started = time.perf_counter()
+    if params:
+        cur.execute(query, params)
+    else:
+        cur.execute(query)
+    rows = cur.fetchall()
+    QUERY_ROWS.observe(len(rows), function=current_function())
+    trace = tracing.current()
+    if trace is not None:
+        trace.add_query(query, time.perf_counter() - started, len(rows))
+    return rows
+
+
+def fetch_all(query, params=(), cur=None):
+    """Run query and return all rows as dicts, on a pooled connection unless cur is given."""
+    if cur is None:
+        with db.cursor(dictionary=True) as cur:
+            return fetch_all(query, params, cur)
+    return _fetch_rows(query, params, cur)
+
+
+def fetch_arrays(query, dtypes, params=(), cur=None):
+    """
+    Run query and return {column: NumPy array}, dtypes mapping each selected
+    column (in order) to its array type; NULLs become NaN in float columns.
+
+    Rows are read as plain tuples (pass a tuple cursor as cur), so a large
+    result costs one tuple per row instead of a dict, and is held as typed
+    arrays rather than Python objects once converted.
+    """
+    if cur is None:
+        with db.cursor() as cur:
+            return fetch_arrays(query, dtypes, params, cur)
+    rows = _fetch_rows(query, params, cur)
+    columns = zip(*rows) if rows else [()] * len(dtypes)
+    return {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(dtypes.items(), columns)}
+
+
+def login_freq_query(customer_ids=None, as_of=None):
+    window, window_params = window_filter(as_of)
+    where, params = customer_filter(customer_ids)
     query = """
     SELECT
         customer_id,
-        COUNT(*) / 12 AS avg_logins_per_week
-    FROM logins
-    WHERE login_date >= NOW() - INTERVAL 3 MONTH
+        SUM(logins) / 12 AS avg_logins_per_week
+    FROM daily_logins
+    WHERE """ + window + where + """
     GROUP BY customer_id
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    return query, window_params + params
+
+
+@timed
+def login_freq(customer_ids=None, as_of=None):
+    rows = fetch_all(*login_freq_query(customer_ids, as_of))
     
     # Ensure column names exist even if no data
     df_login = pd.DataFrame(rows, columns=['customer_id', 'avg_logins_per_week'])
     return df_login
 
-def features_used():
+
+def features_used_query(customer_ids=None, as_of=None):
+    # Lifetime adoption: every feature used up to as_of
+    cutoff, cutoff_params = as_of_filter(as_of, 'WHERE')
+    where, params = customer_filter(customer_ids, 'AND' if cutoff else 'WHERE')
     query = """
     SELECT
         customer_id,
         COUNT(DISTINCT feature_name) / 5.0 * 100 AS feature_adoption_score
-    FROM feature_usage
+    FROM daily_feature_usage""" + cutoff + where + """
     GROUP BY customer_id
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    return query, cutoff_params + params
+
+
+@timed
+def features_used(customer_ids=None, as_of=None):
+    rows = fetch_all(*features_used_query(customer_ids, as_of))
 
     df_feature = pd.DataFrame(rows, columns=['customer_id','feature_adoption_score'])
     return df_feature
 
-def tickets():
+
+def tickets_query(customer_ids=None, as_of=None):
     # Count of open/pending tickets in last 3 months
+    window, window_params = window_filter(as_of)
+    where, params = customer_filter(customer_ids)
     query = """
     SELECT
         customer_id,
-        COUNT(*) AS open_tickets
-    FROM support_tickets
+        SUM(tickets) AS open_tickets
+    FROM daily_tickets
     WHERE status IN ('open','pending')
-    AND created_at >= NOW() - INTERVAL 3 MONTH
+    AND """ + window + where + """
     GROUP BY customer_id
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    return query, window_params + params
+
+
+@timed
+def tickets(customer_ids=None, as_of=None):
+    rows = fetch_all(*tickets_query(customer_ids, as_of))
 
     # Ensure columns exist even if no data
     df_tickets = pd.DataFrame(rows, columns=['customer_id', 'open_tickets'])
@@ -59,123 +210,229 @@ def tickets():
         df_tickets = pd.DataFrame(columns=['customer_id', 'open_tickets', 'ticket_score'])
 
     # Convert to score (inverse: more tickets = lower score)
-    def ticket_score(open_tickets):
-        if open_tickets == 0: 
-            return 100
-        elif open_tickets <= 2: 
-            return 75
-        elif open_tickets <= 5: 
-            return 50
-        else: 
-            return 25
-
     # Apply scoring only if column exists
     if 'open_tickets' in df_tickets.columns and not df_tickets.empty:
-        df_tickets['ticket_score'] = df_tickets['open_tickets'].apply(ticket_score)
+        df_tickets['ticket_score'] = score_column(df_tickets['open_tickets'], SCORE_TABLES['ticket_score'])
     else:
         df_tickets['ticket_score'] = pd.Series(dtype=float)
 
     return df_tickets
-def invoice():
+
+
+def invoice_query(customer_ids=None, as_of=None):
+    # As of a past date only the invoices already due by then count
+    cutoff, cutoff_params = as_of_filter(as_of, 'WHERE', 'due_date')
+    where, params = customer_filter(customer_ids, 'AND' if cutoff else 'WHERE')
     query = """
     SELECT
         customer_id,
         SUM(CASE WHEN paid_date <= due_date THEN 1 ELSE 0 END) / COUNT(*) * 100 AS invoice_payment_score
-    FROM invoices
+    FROM invoices""" + cutoff + where + """
     GROUP BY customer_id
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    return query, cutoff_params + params
+
+
+@timed
+def invoice(customer_ids=None, as_of=None):
+    rows = fetch_all(*invoice_query(customer_ids, as_of))
 
     df_invoice = pd.DataFrame(rows,columns=['customer_id','invoice_payment_score'])
     return df_invoice
 
-def api_call():
+
+def api_call_query(customer_ids=None, as_of=None):
      # Average API calls per week in last 3 months
+    window, window_params = window_filter(as_of)
+    where, params = customer_filter(customer_ids)
     query = """
     SELECT
         customer_id,
         SUM(calls_count) / 12 AS avg_api_calls_per_week
-    FROM api_usage
-    WHERE usage_date >= NOW() - INTERVAL 3 MONTH
+    FROM daily_api_usage
+    WHERE """ + window + where + """
     GROUP BY customer_id
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
-
-    df_api = pd.DataFrame(rows,columns=['customer_id', 'avg_api_calls_per_week'])
-    def api_score(calls):
-        if calls > 400: return 100
-        elif calls > 200: return 75
-        elif calls > 50: return 50
-        else: return 25
-
-    df_api['api_score'] = df_api['avg_api_calls_per_week'].apply(api_score)
-    return df_api
-
+    return query, window_params + params
 
 
-def get_health_scores():
-    df_login = login_freq()
-    df_feature = features_used()
-    df_tickets = tickets()
-    df_invoice = invoice()
-    df_api = api_call()
+@timed
+def api_call(customer_ids=None, as_of=None):
+    rows = fetch_all(*api_call_query(customer_ids, as_of))
 
+    df_api = pd.DataFrame(rows,columns=['customer_id', 'avg_api_calls_per_week'])
+    df_api['api_score'] = score_column(df_api['avg_api_calls_per_week'], SCORE_TABLES['api_score'])
+    return df_api
 
-    # Merge all dataframes on customer_id
-    df = df_login.merge(df_feature, on='customer_id', how='outer') \
-                .merge(df_tickets[['customer_id','ticket_score']], on='customer_id', how='outer') \
-                .merge(df_invoice, on='customer_id', how='outer') \
-                .merge(df_api[['customer_id','api_score']], on='customer_id', how='outer')
 
-    # Optional: convert login and API metrics to 0–100 using thresholds
-    # Example for login frequency
-    def login_score(avg_logins):
-        if avg_logins >= 20: return 100
-        elif avg_logins >= 10: return 75
-        elif avg_logins >= 5: return 50
-        elif avg_logins >= 1: return 25
-        else: return 0
 
+def component_executor():
+    """The process-wide thread pool of the concurrent component queries, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(COMPONENT_WORKERS, thread_name_prefix="component")
+    return _executor
 
 
-    df['login_score'] = df['avg_logins_per_week'].apply(login_score)
+def run_concurrently(calls, timeout=COMPONENT_TIMEOUT):
+    """
+    Run {name: callable} on the component executor and return {name: result}.
+    Each call runs in a copy of the caller's context, so its queries land in
+    the request's trace. The first failure, or the timeout passing, cancels
+    the calls that haven't started and raises ComponentQueryError; a query
+    already running finishes in the background and returns its connection.
+    """
+    executor = component_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, call) for name, call in calls.items()}
+    done, pending = wait(futures.values(), timeout, return_when=FIRST_EXCEPTION)
+    for future in pending:
+        future.cancel()
+    for name, future in futures.items():
+        if future in done and future.exception() is not None:
+            raise ComponentQueryError(f"{name} query failed: {future.exception()}") from future.exception()
+    if pending:
+        late = [name for name, future in futures.items() if future in pending]
+        raise ComponentQueryError(f"{', '.join(late)} did not finish within {timeout}s")
+    return {name: future.result() for name, future in futures.items()}
+
+
+def customer_list(customer_ids=None):
+    """The customers scored by health_components(), as an int32 id array in id order."""
+    where, params = customer_filter(customer_ids, 'WHERE', 'id')
+    query = "SELECT id AS customer_id FROM customers" + where + " ORDER BY id"
+    return fetch_arrays(query, {'customer_id': COMPONENT_DTYPES['customer_id']}, params)['customer_id']
+
+
+# Per-table component queries (the standalone functions' queries) by the
+# name of that function, and the health_components() column each fills
+COMPONENT_QUERIES = [
+    ('login_freq', login_freq_query, 'avg_logins_per_week'),
+    ('features_used', features_used_query, 'feature_adoption_score'),
+    ('tickets', tickets_query, 'open_tickets'),
+    ('invoice', invoice_query, 'invoice_payment_score'),
+    ('api_call', api_call_query, 'avg_api_calls_per_week'),
+]
+
+
+def typed_component(build_query, column, customer_ids=None, as_of=None):
+    """
+    One component as a float64 Series indexed by customer_id: the component's
+    query with its metric cast to DOUBLE, read into arrays like the
+    consolidated query (no Decimals or dict rows).
+    """
+    query, params = build_query(customer_ids, as_of)
+    query = f"SELECT customer_id, CAST({column} AS DOUBLE) AS {column} FROM ({query}) AS component"
+    arrays = fetch_arrays(query, {'customer_id': COMPONENT_DTYPES['customer_id'], column: COMPONENT_DTYPES[column]},
+                          params)
+    return pd.Series(arrays[column], index=arrays['customer_id'], copy=False)
+
+
+def parallel_components(customer_ids=None, as_of=None):
+    """health_components() as six concurrent queries, joined on customer_id (same dtypes)."""
+    calls = {'customers': functools.partial(customer_list, customer_ids)}
+    for name, build_query, column in COMPONENT_QUERIES:
+        calls[name] = functools.partial(typed_component, build_query, column, customer_ids, as_of)
+    results = run_concurrently(calls)
+
+    # Customers without a row in a component get NaN, like the LEFT JOINs' NULL
+    ids = results['customers']
+    columns = {'customer_id': ids}
+    for name, _, column in COMPONENT_QUERIES:
+        columns[column] = results[name].reindex(ids).to_numpy(dtype=COMPONENT_DTYPES[column])
+    return pd.DataFrame(columns, copy=False)[COMPONENT_COLUMNS]
+
+
+@timed
+def health_components(customer_ids=None, cur=None, as_of=None):
+    """
+    Return every raw health component for each customer in one round-trip.
 
-    # Example for feature adoption
-    df['feature_score'] = df['feature_adoption_score']  # already 0–100
+    The query is driven from the customers table so customers without any
+    events are still returned (their components come back as NULL and are
+    filled with the defaults in get_health_details()).
 
-    # Calculate overall health score using weights
-    weights = {'login_score':0.25, 'feature_score':0.25, 'ticket_score':0.2,
-            'invoice_payment_score':0.15, 'api_score':0.15}
+    customer_ids restricts the result to those customers and is pushed into
+    every per-table aggregate, so a single customer is a set of indexed point
+    queries. cur lets a caller run the query on its own (tuple) cursor, e.g.
+    inside a write transaction. as_of (a date) scores the customers as they
+    stood at the end of that day instead of now.
 
-    # Columns that are decimal from MySQL
-    decimal_cols = ['login_score', 'feature_score', 'ticket_score', 'invoice_payment_score', 'api_score']
+    The metrics are cast to DOUBLE in SQL, so the driver hands back floats
+    rather than Decimals, and the columns are typed arrays (COMPONENT_DTYPES).
 
-    for col in decimal_cols:
-        df[col] = df[col].astype(float)
+    With PARALLEL_COMPONENTS and no cur, the aggregates run as concurrent
+    queries instead (see parallel_components()).
+    """
+    if PARALLEL_COMPONENTS and cur is None:
+        return parallel_components(customer_ids, as_of)
+
+    # The same filter goes into the five aggregates and the customers scan
+    and_ids, ids = customer_filter(customer_ids)
+    where_c, _ = customer_filter(customer_ids, 'WHERE', 'c.id')
+    window, window_params = window_filter(as_of)
+    feature_cutoff, cutoff_params = as_of_filter(as_of, 'WHERE')
+    where_features, _ = customer_filter(customer_ids, 'AND' if feature_cutoff else 'WHERE')
+    invoice_cutoff, _ = as_of_filter(as_of, 'WHERE', 'due_date')
+    where_invoices, _ = customer_filter(customer_ids, 'AND' if invoice_cutoff else 'WHERE')
+
+    # In the order the placeholders appear: logins, features, tickets, invoices, API, customers
+    params = (window_params + ids + cutoff_params + ids + window_params + ids
+              + cutoff_params + ids + window_params + ids + ids)
 
-    df['login_score'] = df['login_score'].fillna(0)
-    df['feature_score'] = df['feature_score'].fillna(0)
-    df['ticket_score'] = df['ticket_score'].fillna(100)
-    df['invoice_payment_score'] = df['invoice_payment_score'].fillna(100)
-    df['api_score'] = df['api_score'].fillna(25)
+    query = """
+    SELECT
+        c.id AS customer_id,
+        CAST(l.avg_logins_per_week AS DOUBLE) AS avg_logins_per_week,
+        CAST(f.feature_adoption_score AS DOUBLE) AS feature_adoption_score,
+        CAST(t.open_tickets AS DOUBLE) AS open_tickets,
+        CAST(i.invoice_payment_score AS DOUBLE) AS invoice_payment_score,
+        CAST(a.avg_api_calls_per_week AS DOUBLE) AS avg_api_calls_per_week
+    FROM customers c
+    LEFT JOIN (
+        SELECT customer_id, SUM(logins) / 12 AS avg_logins_per_week
+        FROM daily_logins
+        WHERE """ + window + and_ids + """
+        GROUP BY customer_id
+    ) l ON l.customer_id = c.id
+    LEFT JOIN (
+        SELECT customer_id, COUNT(DISTINCT feature_name) / 5.0 * 100 AS feature_adoption_score
+        FROM daily_feature_usage""" + feature_cutoff + where_features + """
+        GROUP BY customer_id
+    ) f ON f.customer_id = c.id
+    LEFT JOIN (
+        SELECT customer_id, SUM(tickets) AS open_tickets
+        FROM daily_tickets
+        WHERE status IN ('open','pending')
+        AND """ + window + and_ids + """
+        GROUP BY customer_id
+    ) t ON t.customer_id = c.id
+    LEFT JOIN (
+        SELECT customer_id,
+            SUM(CASE WHEN paid_date <= due_date THEN 1 ELSE 0 END) / COUNT(*) * 100 AS invoice_payment_score
+        FROM invoices""" + invoice_cutoff + where_invoices + """
+        GROUP BY customer_id
+    ) i ON i.customer_id = c.id
+    LEFT JOIN (
+        SELECT customer_id, SUM(calls_count) / 12 AS avg_api_calls_per_week
+        FROM daily_api_usage
+        WHERE """ + window + and_ids + """
+        GROUP BY customer_id
+    ) a ON a.customer_id = c.id""" + where_c + """
+    ORDER BY c.id
+    """
+    return pd.DataFrame(fetch_arrays(query, COMPONENT_DTYPES, params, cur), copy=False)
 
-    df['health_score'] = (
-        df['login_score']*weights['login_score'] +
-        df['feature_score']*weights['feature_score'] +
-        df['ticket_score']*weights['ticket_score'] +
-        df['invoice_payment_score']*weights['invoice_payment_score'] +
-        df['api_score']*weights['api_score']
-    )
-    
 
+@timed
+def get_health_scores(customer_ids=None, as_of=None):
+    df = get_health_details(customer_ids, as_of=as_of)
     return df[['customer_id','health_score']]
 
 
-
-
-def get_health_details():
+@timed
+def get_health_details(customer_ids=None, cur=None, as_of=None):
     """
     Return a DataFrame with all health score components for each customer:
     - customer_id
@@ -185,62 +442,47 @@ def get_health_details():
     - invoice_payment_score
     - api_score
     - overall health_score
+
+    customer_ids / cur / as_of are passed through to health_components(), in
+    FILTER_CHUNK_SIZE pieces when there are more ids than that.
     """
-    df_login = login_freq()
-    df_feature = features_used()
-    df_tickets = tickets()
-    df_invoice = invoice()
-    df_api = api_call()
-
-    # Merge all dataframes on customer_id
-    df = df_login.merge(df_feature, on='customer_id', how='outer') \
-                 .merge(df_tickets[['customer_id','ticket_score']], on='customer_id', how='outer') \
-                 .merge(df_invoice, on='customer_id', how='outer') \
-                 .merge(df_api[['customer_id','api_score']], on='customer_id', how='outer')
-
-    # Convert login frequency to score
-    def login_score(avg_logins):
-        if avg_logins >= 20: return 100
-        elif avg_logins >= 10: return 75
-        elif avg_logins >= 5: return 50
-        elif avg_logins >= 1: return 25
-        else: return 0
-
-    df['login_score'] = df['avg_logins_per_week'].apply(login_score)
-    df['feature_score'] = df['feature_adoption_score']  # already 0–100
-
-    # Define weights
-    weights = {
-        'login_score': 0.25,
-        'feature_score': 0.25,
-        'ticket_score': 0.2,
-        'invoice_payment_score': 0.15,
-        'api_score': 0.15
-    }
-
-    # Ensure all columns are floats
-    decimal_cols = ['login_score', 'feature_score', 'ticket_score', 'invoice_payment_score', 'api_score']
-    for col in decimal_cols:
-        df[col] = df[col].astype(float)
-
-    # Fill missing values
-    df['login_score'] = df['login_score'].fillna(0)
-    df['feature_score'] = df['feature_score'].fillna(0)
-    df['ticket_score'] = df['ticket_score'].fillna(100)
-    df['invoice_payment_score'] = df['invoice_payment_score'].fillna(100)
-    df['api_score'] = df['api_score'].fillna(25)
-
-    # Calculate overall health score
-    df['health_score'] = (
-        df['login_score']*weights['login_score'] +
-        df['feature_score']*weights['feature_score'] +
-        df['ticket_score']*weights['ticket_score'] +
-        df['invoice_payment_score']*weights['invoice_payment_score'] +
-        df['api_score']*weights['api_score']
-    )
-
-    # Return all columns
-    return df[['customer_id','login_score','feature_score','ticket_score','invoice_payment_score','api_score','health_score']]
+    if customer_ids is None:
+        df = health_components(None, cur, as_of)
+    else:
+        chunks = id_chunks(customer_ids)
+        df = health_components(chunks[0], cur, as_of) if len(chunks) == 1 else pd.concat(
+            [health_components(ids, cur, as_of) for ids in chunks], ignore_index=True)
+
+    # Thresholds, defaults for missing data and weights live in scoring.py
+    return score_components(df)
 
 
 # print(get_health_scores())
+
+
+def iter_customer_ids(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every customer id in ascending lists of up to chunk_size, read by keyset."""
+    last_id = 0  # AUTO_INCREMENT ids start at 1
+    while True:
+        rows = fetch_all("SELECT id FROM customers WHERE id > %s ORDER BY id LIMIT %s", (last_id, chunk_size))
+        if not rows:
+            return
+        ids = [row['id'] for row in rows]
+        yield ids
+        if len(ids) < chunk_size:
+            return
+        last_id = ids[-1]
+
+
+def iter_health_details(chunk_size=EXPORT_CHUNK_SIZE, as_of=None):
+    """
+    Yield get_health_details() DataFrames covering every customer, chunk_size
+    customers at a time in customer_id order (scored as of as_of, if given).
+
+    Each chunk is a keyset read of the next customer ids followed by the
+    usual filtered component query, each on a briefly borrowed pooled
+    connection, so memory is bounded by the chunk and no connection is held
+    while the consumer (e.g. a slow HTTP client) works through a chunk.
+    """
+    for ids in iter_customer_ids(chunk_size):
+        yield get_health_details(ids, as_of=as_of)
@@ -0,0 +1,245 @@
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from src.utils import config
+
+# Pool settings (environment overrides the defaults)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections idle for longer than this are pinged before being handed out
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+# Failed connection attempts are retried this many times, waiting
+# DB_CONNECT_BACKOFF seconds and doubling up to DB_CONNECT_BACKOFF_MAX
+CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "3"))
+CONNECT_BACKOFF = float(os.getenv("DB_CONNECT_BACKOFF", "0.2"))
+CONNECT_BACKOFF_MAX = float(os.getenv("DB_CONNECT_BACKOFF_MAX", "5"))
+# Database file of the embedded backend (DB_BACKEND=sqlite)
+SQLITE_PATH = "customer_health.sqlite3"
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+def backoff_delays(retries=CONNECT_RETRIES, backoff=CONNECT_BACKOFF, limit=CONNECT_BACKOFF_MAX):
+    """Seconds to wait before each retry: doubling from backoff, capped at limit, with jitter."""
+    # Jitter keeps replicas started together from reconnecting in lockstep
+    return [min(backoff * 2 ** attempt, limit) * random.uniform(0.5, 1) for attempt in range(retries)]
+
+
+def connect_with_retry(connect, retries=CONNECT_RETRIES, backoff=CONNECT_BACKOFF, sleep=None):
+    """Return connect(), retrying failures with exponential backoff; the last error is raised."""
+    sleep = sleep or time.sleep
+    for delay in backoff_delays(retries, backoff):
+        try:
+            return connect()
+        except Exception:
+            sleep(delay)
+    return connect()
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe pool of MySQL connections.
+
+    Connections are opened on demand up to `size` (nothing is opened when the
+    pool is created), and failed connects are retried with backoff; callers
+    beyond that block (up to `timeout` seconds) until one is returned. Idle
+    connections are health-checked before reuse and transparently replaced
+    when broken.
+    """
+
+    def __init__(self, db_config, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.db_config = db_config
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()  # (connection, released_at)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.created = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        conn = connect_with_retry(lambda: mysql.connector.connect(**self.db_config))
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _healthy(self, conn, released_at):
+        if time.monotonic() - released_at < self.ping_after:
+            return True
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection free after {self.timeout}s (pool size {self.size})")
+        try:
+            try:
+                conn, released_at = self._idle.get_nowait()
+                if not self._healthy(conn, released_at):
+                    self._close(conn)
+                    with self._lock:
+                        self.reconnects += 1
+                    conn = self._connect()
+            except queue.Empty:
+                conn = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        try:
+            if not discard:
+                try:
+                    # End any open transaction so the next user gets a fresh read view
+                    if conn.in_transaction:
+                        conn.rollback()
+                except Exception:
+                    discard = True
+            if discard:
+                self._close(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            # Any interruption (errors, KeyboardInterrupt, cancellation) rolls
+            # back; a connection that can't is closed instead of reused
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def prefill(self, count=None):
+        """Open connections up to count (default: the pool size) so early requests don't pay for them."""
+        count = self.size if count is None else min(count, self.size)
+        conns = []
+        try:
+            for _ in range(count):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "created": self.created,
+                "reconnects": self.reconnects,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def dialect():
+    """
+    The storage backend, from DB_BACKEND: "mysql" (default, the server in
+    db_config.json) or "sqlite" (an embedded database file at DB_PATH, for
+    small deployments, CI and benchmarks without a database server).
+    """
+    return os.getenv("DB_BACKEND", "mysql")
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if dialect() == "sqlite":
+                    from src.backend.sqlite_backend import SQLitePool
+                    _pool = SQLitePool(os.getenv("DB_PATH", SQLITE_PATH))
+                elif dialect() == "mysql":
+                    _pool = ConnectionPool(config())
+                else:
+                    raise ValueError(f"Unknown DB_BACKEND: {dialect()}")
+    return _pool
+
+
+def pool_stats():
+    """The pool's stats(), or None if no connection has been needed yet."""
+    return _pool.stats() if _pool is not None else None
+
+
+def ping():
+    """True if a pooled connection answers a trivial query."""
+    try:
+        with cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        return True
+    except Exception:
+        return False
+
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def cursor(dictionary=False):
+    """A cursor on a pooled connection, for reads."""
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+@contextmanager
+def transaction(dictionary=False):
+    """A cursor whose work is committed on success and rolled back on error."""
+    with connection() as conn:
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            yield cur
+            conn.commit()
+        finally:
+            cur.close()
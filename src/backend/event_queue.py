@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import time
+
+# Write-behind ingestion settings (environment overrides the defaults)
+EVENT_QUEUE_ENABLED = os.getenv("EVENT_QUEUE_ENABLED", "0") == "1"
+EVENT_QUEUE_CAPACITY = int(os.getenv("EVENT_QUEUE_CAPACITY", "10000"))
+# A flush happens every EVENT_QUEUE_FLUSH_MS or as soon as this many events are queued
+EVENT_QUEUE_FLUSH_MS = int(os.getenv("EVENT_QUEUE_FLUSH_MS", "200"))
+EVENT_QUEUE_FLUSH_EVENTS = int(os.getenv("EVENT_QUEUE_FLUSH_EVENTS", "500"))
+# Attempts per batch before it is dropped (and counted as such)
+EVENT_QUEUE_MAX_ATTEMPTS = 3
+
+_STOP = object()
+
+logger = logging.getLogger("customer_health.event_queue")
+
+
+class QueueFull(Exception):
+    """Raised when accepting the events would exceed the queue capacity."""
+
+
+class QueueClosed(Exception):
+    """Raised when events are enqueued after shutdown has started."""
+
+
+class EventQueue:
+    """
+    Bounded in-process queue that acknowledges validated events immediately
+    and writes them in the background with grouped inserts.
+
+    `writer` is called (in a worker thread) with a list of
+    (customer_id, event_type, details) tuples, e.g. events.write_events.
+    """
+
+    def __init__(self, writer, capacity=EVENT_QUEUE_CAPACITY, flush_ms=EVENT_QUEUE_FLUSH_MS,
+                 flush_events=EVENT_QUEUE_FLUSH_EVENTS, max_attempts=EVENT_QUEUE_MAX_ATTEMPTS):
+        self.writer = writer
+        self.capacity = capacity
+        self.flush_interval = flush_ms / 1000
+        self.flush_events = flush_events
+        self.max_attempts = max_attempts
+        self._queue = None
+        self._task = None
+        self._closing = False
+        self.enqueued = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the background flusher on the running event loop."""
+        # One slot is kept free for the shutdown marker
+        self._queue = asyncio.Queue(maxsize=self.capacity + 1)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, events):
+        """Accept all of `events` or none of them."""
+        if self._closing or self._queue is None:
+            raise QueueClosed("Event queue is not accepting events")
+        if self._queue.qsize() + len(events) > self.capacity:
+            self.rejected += len(events)
+            raise QueueFull(f"Event queue is full ({self.capacity} events)")
+        for event in events:
+            self._queue.put_nowait(event)
+        self.enqueued += len(events)
+
+    async def stop(self, timeout=30):
+        """Stop accepting events and flush everything already queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await asyncio.wait_for(self._task, timeout)
+        self._task = None
+
+    async def _collect(self):
+        """Wait for the first event, then gather more until the size or time limit."""
+        batch = []
+        item = await self._queue.get()
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.flush_events:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch, attempts=None):
+        """
+        Write a batch, retrying up to max_attempts times. A batch that still
+        fails is split in halves, each written once more, so only the events
+        the database keeps rejecting are dropped (and logged).
+        """
+        attempts = self.max_attempts if attempts is None else attempts
+        error = None
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.writer, batch)
+            except Exception as e:
+                error = e
+                self.failed_flushes += 1
+                if attempt < attempts:
+                    await asyncio.sleep(self.flush_interval)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return
+
+        if len(batch) > 1:
+            middle = len(batch) // 2
+            await self._flush(batch[:middle], attempts=1)
+            await self._flush(batch[middle:], attempts=1)
+            return
+        self.dropped += 1
+        logger.error("dropped event after failed flush: %r", batch[0], exc_info=error)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+        # Anything still queued behind the marker
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for start in range(0, len(remaining), self.flush_events):
+            await self._flush(remaining[start:start + self.flush_events])
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+        }
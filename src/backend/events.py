@@ -0,0 +1,184 @@
+import math
+from datetime import date
+from src.backend import db
+from src.backend.calculate_health_score import customer_filter, id_chunks
+from src.backend.health_snapshot import lock_customers, refresh_health_snapshot
+from src.backend.metrics import EVENTS_INSERTED
+from src.backend.rollups import update_rollups
+
+# Largest batch accepted by POST /api/events/batch
+MAX_BATCH_EVENTS = 10000
+
+# Fields each event type must carry in "details"
+REQUIRED_FIELDS = {
+    "login": [],
+    "feature": ["feature_name"],
+    "ticket": [],
+    "invoice": ["amount", "due_date"],
+    "api": []
+}
+
+# Optional counters per event type; they are summed into the daily rollups,
+# so they must be non-negative integers (a JSON string would concatenate)
+COUNT_FIELDS = {
+    "feature": "usage_count",
+    "api": "calls_count",
+}
+
+# Largest value of an INT column
+MAX_INT = 2**31 - 1
+
+# Allowed values of the ENUM columns per event type (database/schema.sql)
+ENUM_FIELDS = {
+    "ticket": {"status": ("open", "closed", "pending"), "priority": ("low", "medium", "high")},
+}
+
+# DATE columns per event type, sent as ISO dates (YYYY-MM-DD); the optional
+# ones may also be null
+DATE_FIELDS = {
+    "invoice": {"due_date": False, "paid_date": True},
+}
+
+# feature_usage.feature_name is a VARCHAR(50); invoices.amount a DECIMAL(10,2)
+MAX_FEATURE_NAME = 50
+MAX_AMOUNT = 10**8
+
+# INSERT statement per event type and how to build its parameters from
+# (customer_id, details). Used for single events and batches alike.
+EVENT_INSERTS = {
+    "login": (
+        "INSERT INTO logins (customer_id, login_date) VALUES (%s, NOW())",
+        lambda customer_id, details: (customer_id,)
+    ),
+    "feature": (
+        "INSERT INTO feature_usage (customer_id, feature_name, usage_count, usage_date) VALUES (%s,%s,%s,NOW())",
+        lambda customer_id, details: (customer_id, details['feature_name'], details.get('usage_count', 1))
+    ),
+    "ticket": (
+        "INSERT INTO support_tickets (customer_id, created_at, status, priority) VALUES (%s,NOW(),%s,%s)",
+        lambda customer_id, details: (customer_id, details.get('status', 'open'), details.get('priority', 'medium'))
+    ),
+    "invoice": (
+        "INSERT INTO invoices (customer_id, amount, due_date, paid_date) VALUES (%s,%s,%s,%s)",
+        lambda customer_id, details: (customer_id, details['amount'], details['due_date'], details.get('paid_date'))
+    ),
+    "api": (
+        "INSERT INTO api_usage (customer_id, calls_count, usage_date) VALUES (%s,%s,NOW())",
+        lambda customer_id, details: (customer_id, details.get('calls_count', 1))
+    ),
+}
+
+
+class UnknownCustomers(Exception):
+    """Raised by write_events when events name customers that do not exist."""
+
+    def __init__(self, customer_ids):
+        self.customer_ids = sorted(customer_ids)
+        super().__init__(f"Unknown customer_id: {', '.join(map(str, self.customer_ids))}")
+
+
+def validate_event(event_type, details):
+    """Return an error message for an invalid event, or None if it is valid."""
+    if event_type not in REQUIRED_FIELDS:
+        return f"Unknown event type: {event_type}"
+    if not isinstance(details, dict):
+        return "Event details must be an object"
+    missing = [f for f in REQUIRED_FIELDS[event_type] if f not in details]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    # Everything the INSERTs would reject is caught here, so a queued event
+    # acknowledged with 202 is one the flush can write
+    field = COUNT_FIELDS.get(event_type)
+    if field in details:
+        count = details[field]
+        if not isinstance(count, int) or isinstance(count, bool) or not 0 <= count <= MAX_INT:
+            return f"{field} must be a non-negative integer"
+    for field, allowed in ENUM_FIELDS.get(event_type, {}).items():
+        if field in details and details[field] not in allowed:
+            return f"{field} must be one of: {', '.join(allowed)}"
+    for field, optional in DATE_FIELDS.get(event_type, {}).items():
+        value = details.get(field)
+        if value is None and optional:
+            continue
+        try:
+            # Only the plain YYYY-MM-DD form, which MySQL and SQLite both take
+            valid = date.fromisoformat(value).isoformat() == value
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            return f"{field} must be a date (YYYY-MM-DD)"
+    if event_type == "feature":
+        name = details["feature_name"]
+        if not isinstance(name, str) or not 0 < len(name) <= MAX_FEATURE_NAME:
+            return f"feature_name must be a string of 1 to {MAX_FEATURE_NAME} characters"
+    if event_type == "invoice":
+        amount = details["amount"]
+        if (not isinstance(amount, (int, float)) or isinstance(amount, bool) or not math.isfinite(amount)
+                or abs(amount) >= MAX_AMOUNT):
+            return f"amount must be a number below {MAX_AMOUNT}"
+    return None
+
+
+def existing_customers(customer_ids):
+    """The subset of customer_ids that exist, looked up in one query per FILTER_CHUNK_SIZE ids."""
+    customer_ids = sorted(set(customer_ids))
+    if not customer_ids:
+        return set()
+    found = set()
+    with db.cursor() as cur:
+        for ids in id_chunks(customer_ids):
+            where, params = customer_filter(ids, 'WHERE', 'id')
+            cur.execute("SELECT id FROM customers" + where, params)
+            found.update(row[0] for row in cur.fetchall())
+    return found
+
+
+def write_events(events):
+    """
+    Insert validated events, add them to the daily rollups and refresh the
+    affected customers' health snapshots in a single transaction.
+
+    events is a list of (customer_id, event_type, details). Events are grouped
+    per target table and each group is written with one multi-row INSERT.
+    The partitioned event tables have no foreign keys, so the customers are
+    checked here: if any is missing nothing is written and UnknownCustomers
+    is raised.
+    """
+    if not events:
+        return
+
+    grouped = {}
+    for customer_id, event_type, details in events:
+        build_row = EVENT_INSERTS[event_type][1]
+        grouped.setdefault(event_type, []).append(build_row(customer_id, details))
+
+    customer_ids = sorted({customer_id for customer_id, _, _ in events})
+
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # Serialize with other writers of these customers (see lock_customers)
+            missing = set(customer_ids) - lock_customers(cursor, customer_ids)
+            if missing:
+                raise UnknownCustomers(missing)
+
+            for event_type, rows in grouped.items():
+                query = EVENT_INSERTS[event_type][0]
+                if len(rows) == 1:
+                    cursor.execute(query, rows[0])
+                else:
+                    # mysql-connector rewrites this into one multi-row INSERT
+                    cursor.executemany(query, rows)
+
+            # Keep the daily rollups the scoring queries read in step
+            update_rollups(cursor, events)
+
+            # Recompute the affected snapshots in the same transaction
+            refresh_health_snapshot(customer_ids, cursor)
+
+            conn.commit()
+        finally:
+            cursor.close()
+
+    for event_type, rows in grouped.items():
+        EVENTS_INSERTED.inc(len(rows), type=event_type)
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Safety net for writes this process never hears about (other replicas,
+# the snapshot rebuild job): entries older than this are recomputed anyway
+CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "30"))
+# Entries kept at most; past this the least recently used one is evicted, so
+# crawling many customers / as_of / days values can't grow the cache unbounded
+CACHE_MAX_ENTRIES = int(os.getenv("HEALTH_CACHE_MAX_ENTRIES", "1000"))
+# Customers whose last-change version is tracked for per-customer ETags;
+# past this, the map is reset and every customer counts as changed
+MAX_TRACKED_CUSTOMERS = 100_000
+
+
+class VersionedCache:
+    """
+    In-process result cache keyed by a data-version watermark.
+
+    Every writer calls bump() after committing; entries computed under an
+    older version are treated as misses. Entries also expire after ttl seconds,
+    and at most max_entries are kept (least recently used evicted first).
+    The watermark also yields ETags for conditional GETs (see etag()).
+    """
+
+    def __init__(self, ttl=CACHE_TTL, clock=time.monotonic, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries = OrderedDict()  # key -> (version, stored_at, value), least recently used first
+        # Version numbers restart with the process, so tags carry its id
+        self._epoch = uuid.uuid4().hex[:8]
+        self._customer_versions = {}  # customer_id -> version of its last write
+        self._floor = 0  # every customer changed at or before this version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self, customer_ids=None):
+        """
+        Advance the watermark so every cached result is recomputed. Pass the
+        customer_ids a write touched to keep the other customers' ETags.
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            if customer_ids is None or len(self._customer_versions) > MAX_TRACKED_CUSTOMERS:
+                self._customer_versions.clear()
+                self._floor = self._version
+            if customer_ids is not None:
+                for customer_id in customer_ids:
+                    self._customer_versions[customer_id] = self._version
+            return self._version
+
+    def etag(self, customer_id=None, variant=None):
+        """
+        Weak ETag of data as of the current watermark: global, or covering
+        only customer_id's writes. variant (e.g. an as_of date) tells apart
+        different views of the same data at one URL. It also changes every
+        ttl seconds, so changes by writers this process never hears about
+        show within two ttl periods. Read it before the data so a racing
+        write can only make the tag older than the body. None when nothing
+        is cached (ttl <= 0).
+        """
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            version = self._version if customer_id is None else max(
+                self._floor, self._customer_versions.get(customer_id, 0))
+        window = int(self._clock() // self.ttl)
+        if variant is not None:
+            return f'W/"{self._epoch}-{version}-{window}-{variant}"'
+        return f'W/"{self._epoch}-{version}-{window}"'
+
+    def _fresh(self, entry, now):
+        version, stored_at, _ = entry
+        return version == self._version and now - stored_at < self.ttl
+
+    def get(self, key, compute):
+        """Return the cached value for key, calling compute() on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry, self._clock()):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                del self._entries[key]
+            self.misses += 1
+            version = self._version
+
+        value = compute()
+
+        with self._lock:
+            # Don't store a result that raced with a write
+            if version == self._version:
+                self._store(key, (version, self._clock(), value))
+        return value
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) <= self.max_entries:
+            return
+        # Full: drop the expired entries first, then the least recently used
+        now = self._clock()
+        for stale in [k for k, e in self._entries.items() if not self._fresh(e, now)]:
+            del self._entries[stale]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+# Shared by the read endpoints in main.py
+health_cache = VersionedCache()
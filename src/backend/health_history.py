@@ -0,0 +1,222 @@
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from src.backend import db
+from src.backend.calculate_health_score import (COMPONENT_COLUMNS, customer_filter, fetch_all, iter_customer_ids,
+                                                months_before)
+from src.backend.health_snapshot import refresh_health_snapshot
+from src.backend.scoring import SCORE_COLUMNS, score_components
+
+# health_score is stored in hundredths in a SMALLINT, the components as
+# whole numbers in TINYINTs (see health_score_history in schema.sql)
+HEALTH_SCORE_SCALE = 100
+
+# Copy today's snapshot into the history in one statement; re-running on the
+# same day overwrites that day's row
+RECORD_QUERY = """
+    INSERT INTO health_score_history
+        (customer_id, day, login_score, feature_score, ticket_score, invoice_payment_score, api_score, health_score)
+    SELECT customer_id, %s,
+        ROUND(login_score), ROUND(feature_score), ROUND(ticket_score),
+        ROUND(invoice_payment_score), ROUND(api_score), ROUND(health_score * """ + str(HEALTH_SCORE_SCALE) + """)
+    FROM customer_health
+    ON DUPLICATE KEY UPDATE
+        login_score = VALUES(login_score),
+        feature_score = VALUES(feature_score),
+        ticket_score = VALUES(ticket_score),
+        invoice_payment_score = VALUES(invoice_payment_score),
+        api_score = VALUES(api_score),
+        health_score = VALUES(health_score)
+    """
+
+# Customers per backfill pass. A pass holds a handful of customers x days
+# float arrays, i.e. about 4 MB per array for a year.
+BACKFILL_CHUNK_SIZE = 1000
+# Rows per multi-row upsert when writing backfilled history
+BACKFILL_BATCH_SIZE = 5000
+
+UPSERT_QUERY = """
+    INSERT INTO health_score_history
+        (customer_id, day, login_score, feature_score, ticket_score, invoice_payment_score, api_score, health_score)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE
+        login_score = VALUES(login_score),
+        feature_score = VALUES(feature_score),
+        ticket_score = VALUES(ticket_score),
+        invoice_payment_score = VALUES(invoice_payment_score),
+        api_score = VALUES(api_score),
+        health_score = VALUES(health_score)
+    """
+
+# Per-day inputs of the backfill, each selected as (customer_id, day, amount).
+# The windowed ones cover (first - 3 months, last]; features and invoices
+# count from the beginning, so they are read up to last.
+BACKFILL_INPUTS = {
+    'logins': """
+    SELECT customer_id, day, logins FROM daily_logins
+    WHERE day > %s AND day <= %s""",
+    'api_calls': """
+    SELECT customer_id, day, calls_count FROM daily_api_usage
+    WHERE day > %s AND day <= %s""",
+    'tickets': """
+    SELECT customer_id, day, SUM(tickets) FROM daily_tickets
+    WHERE status IN ('open','pending') AND day > %s AND day <= %s""",
+    # First day each feature was used
+    'features': """
+    SELECT customer_id, MIN(day), 1 FROM daily_feature_usage
+    WHERE day <= %s""",
+    'invoices': """
+    SELECT customer_id, due_date, CASE WHEN paid_date <= due_date THEN 1 ELSE 0 END FROM invoices
+    WHERE due_date <= %s""",
+}
+BACKFILL_GROUP_BY = {
+    'tickets': " GROUP BY customer_id, day",
+    'features': " GROUP BY customer_id, feature_name",
+}
+
+TREND_QUERY = """
+    SELECT day, """ + ", ".join(SCORE_COLUMNS) + """, health_score
+    FROM health_score_history
+    WHERE customer_id = %s AND day >= %s
+    ORDER BY day
+    """
+
+
+def record_health_history(day=None, refresh=True):
+    """
+    Store every customer's current scores as the history row for `day`
+    (today by default). With refresh the snapshot is rebuilt first so the
+    3-month windows have slid to today. Returns MySQL's affected-row count
+    (a replaced row counts twice).
+    """
+    if refresh:
+        refresh_health_snapshot()
+    with db.transaction() as cur:
+        cur.execute(RECORD_QUERY, (day or date.today(),))
+        return cur.rowcount
+
+
+def read_health_trend(customer_id, days=90, today=None):
+    """
+    A customer's daily scores over the last `days` days, oldest first, as
+    column lists: {'day': [...], 'login_score': [...], ..., 'health_score': [...]}.
+    One primary-key range scan.
+    """
+    since = (today or date.today()) - timedelta(days=days - 1)
+    rows = fetch_all(TREND_QUERY, (customer_id, since))
+    trend = {'day': [row['day'].isoformat() for row in rows]}
+    for column in SCORE_COLUMNS:
+        trend[column] = [row[column] for row in rows]
+    trend['health_score'] = [row['health_score'] / HEALTH_SCORE_SCALE for row in rows]
+    return trend
+
+
+
+def history_components(customer_ids, first, last, inputs):
+    """
+    Raw components (COMPONENT_COLUMNS plus day) of every customer for every
+    day in [first, last], computed in one vectorized pass.
+
+    inputs maps each BACKFILL_INPUTS name to (customer_id, day, amount)
+    tuples for customer_ids (ascending). Each input becomes a customers x
+    days matrix of per-day amounts; a cumulative sum along the days turns
+    any window total into the difference of two columns, so every day's
+    3-month window costs the same no matter how long the range is.
+    """
+    ids = np.asarray(customer_ids)
+    base = months_before(first)
+    n_days = (last - base).days + 1
+    targets = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    end_idx = np.array([(day - base).days for day in targets])
+    start_idx = np.array([(months_before(day) - base).days for day in targets])
+
+    def cumulative(rows, amount=True):
+        daily = np.zeros((len(ids), n_days))
+        if rows:
+            customer, day, value = zip(*rows)
+            row_idx = np.searchsorted(ids, np.asarray(customer))
+            # Anything before the first window counts on its first day
+            col_idx = (np.asarray(day, dtype='datetime64[D]') - np.datetime64(base, 'D')).astype(int)
+            np.add.at(daily, (row_idx, np.clip(col_idx, 0, n_days - 1)),
+                      np.asarray(value, dtype=float) if amount else 1.0)
+        return np.cumsum(daily, axis=1)
+
+    def window(rows):
+        totals = cumulative(rows)
+        return totals[:, end_idx] - totals[:, start_idx]
+
+    invoices_due = cumulative(inputs['invoices'], amount=False)[:, end_idx]
+    invoices_on_time = cumulative(inputs['invoices'])[:, end_idx]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        invoice_score = np.where(invoices_due > 0, invoices_on_time / invoices_due * 100, np.nan)
+
+    components = {
+        'avg_logins_per_week': window(inputs['logins']) / 12,
+        'feature_adoption_score': cumulative(inputs['features'])[:, end_idx] / 5.0 * 100,
+        'open_tickets': window(inputs['tickets']),
+        'invoice_payment_score': invoice_score,
+        'avg_api_calls_per_week': window(inputs['api_calls']) / 12,
+    }
+    df = pd.DataFrame({'customer_id': np.repeat(ids, len(targets)), 'day': np.tile(targets, len(ids))})
+    for column in COMPONENT_COLUMNS[1:]:
+        df[column] = components[column].ravel()
+    return df
+
+
+def fetch_backfill_inputs(customer_ids, first, last):
+    """Read the BACKFILL_INPUTS of customer_ids for the days up to last."""
+    where, ids = customer_filter(customer_ids)
+    inputs = {}
+    for name, query in BACKFILL_INPUTS.items():
+        dates = (last,) if name in ('features', 'invoices') else (months_before(first), last)
+        rows = fetch_all(query + where + BACKFILL_GROUP_BY.get(name, ""), dates + ids)
+        inputs[name] = [tuple(row.values()) for row in rows]
+    return inputs
+
+
+def history_rows(df):
+    """Scored DataFrame (customer_id, day, scores) -> health_score_history rows."""
+    # ROUND() in MySQL rounds halves away from zero; scores are never negative
+    scores = [np.floor(df[column].to_numpy() + 0.5).astype(int) for column in SCORE_COLUMNS]
+    health = np.floor(df['health_score'].to_numpy() * HEALTH_SCORE_SCALE + 0.5).astype(int)
+    return list(zip(df['customer_id'].tolist(), df['day'].tolist(), *(c.tolist() for c in scores), health.tolist()))
+
+
+def backfill_history(first, last, chunk_size=BACKFILL_CHUNK_SIZE):
+    """
+    Compute and store the daily history of every customer for [first, last]
+    from the rollups, chunk_size customers at a time. Each chunk is a few
+    range reads and one vectorized scoring pass for the whole range, not a
+    recompute per day. Returns the number of history rows written.
+
+    Needs the rollups from 3 months before first onwards (see
+    ROLLUP_RETENTION_MONTHS in retention.py).
+    """
+    written = 0
+    for ids in iter_customer_ids(chunk_size):
+        df = history_components(ids, first, last, fetch_backfill_inputs(ids, first, last))
+        scored = score_components(df)
+        scored['day'] = df['day'].to_numpy()
+        rows = history_rows(scored)
+        with db.transaction() as cur:
+            for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+                cur.executemany(UPSERT_QUERY, rows[start:start + BACKFILL_BATCH_SIZE])
+        written += len(rows)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Record today's health scores in health_score_history")
+    parser.add_argument('--no-refresh', action='store_true',
+                        help='copy the snapshot as it is instead of rebuilding it first')
+    parser.add_argument('--backfill', nargs=2, metavar=('FIRST', 'LAST'), type=date.fromisoformat,
+                        help='compute the history for every day from FIRST to LAST (YYYY-MM-DD) instead')
+    args = parser.parse_args()
+
+    if args.backfill:
+        count = backfill_history(*args.backfill)
+        print(f"Backfilled {count} history rows")
+    else:
+        count = record_health_history(refresh=not args.no_refresh)
+        print(f"Recorded health history ({count} rows affected)")
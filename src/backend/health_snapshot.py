@@ -0,0 +1,177 @@
+import pandas as pd
+from src.backend import db
+from src.backend.calculate_health_score import (EXPORT_CHUNK_SIZE, customer_filter, fetch_all, get_health_details,
+                                                 id_chunks, iter_customer_ids)
+from src.backend.scoring import SCORE_COLUMNS
+
+# Columns stored per customer in the customer_health table
+SNAPSHOT_COLUMNS = ['customer_id'] + SCORE_COLUMNS + ['health_score']
+
+# Rows per multi-row upsert when rebuilding the whole table
+UPSERT_BATCH_SIZE = 1000
+# Customers locked and recomputed per transaction by a full rebuild
+REFRESH_CHUNK_SIZE = EXPORT_CHUNK_SIZE
+
+UPSERT_QUERY = """
+    INSERT INTO customer_health
+        (customer_id, login_score, feature_score, ticket_score, invoice_payment_score, api_score, health_score, updated_at)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,NOW())
+    ON DUPLICATE KEY UPDATE
+        login_score = VALUES(login_score),
+        feature_score = VALUES(feature_score),
+        ticket_score = VALUES(ticket_score),
+        invoice_payment_score = VALUES(invoice_payment_score),
+        api_score = VALUES(api_score),
+        health_score = VALUES(health_score),
+        updated_at = VALUES(updated_at)
+    """
+
+
+def lock_customers(cur, customer_ids):
+    """
+    Lock the customers' rows (SELECT ... FOR UPDATE, in id order) for the
+    rest of cur's transaction. A writer refreshing a customer's snapshot
+    then waits for any other writer of that customer to commit, and its
+    recompute sees that writer's events instead of overwriting its result.
+    Take the lock before inserting events: their foreign-key checks take
+    shared locks on the same rows, and upgrading those would deadlock.
+    Returns the set of ids locked, i.e. those that exist.
+    """
+    locked = set()
+    for ids in id_chunks(sorted(customer_ids)):
+        where, params = customer_filter(ids, 'WHERE', 'id')
+        cur.execute("SELECT id FROM customers" + where + " ORDER BY id FOR UPDATE", params)
+        locked.update(row[0] for row in cur.fetchall())
+    return locked
+
+
+def refresh_health_snapshot(customer_ids=None, cur=None):
+    """
+    Recompute the health scores of customer_ids (all customers if None) from
+    the raw event tables and upsert them into customer_health.
+
+    Pass the (tuple) cursor of an open write transaction that already holds
+    lock_customers() as cur to refresh the snapshot atomically with the event
+    insert; committing is then left to the caller. Without cur the refresh
+    locks and recomputes the customers in its own transaction, REFRESH_CHUNK_SIZE
+    customers at a time for a full rebuild so writers are only briefly held up.
+    Returns the number of customers refreshed.
+    """
+    if cur is None:
+        chunks = [customer_ids] if customer_ids is not None else iter_customer_ids(REFRESH_CHUNK_SIZE)
+        count = 0
+        for ids in chunks:
+            with db.transaction() as cur:
+                lock_customers(cur, ids)
+                count += refresh_health_snapshot(ids, cur)
+        return count
+
+    df = get_health_details(customer_ids, cur)
+
+    # Series.tolist() hands back plain Python scalars for the DB driver
+    rows = list(zip(*(df[col].tolist() for col in SNAPSHOT_COLUMNS)))
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        cur.executemany(UPSERT_QUERY, rows[start:start + UPSERT_BATCH_SIZE])
+    return len(rows)
+
+
+def read_health_snapshot(customer_id=None, columns=SNAPSHOT_COLUMNS):
+    """
+    Read materialized health scores: a primary-key lookup when customer_id is
+    given, otherwise every customer ordered by customer_id.
+    """
+    query = "SELECT " + ", ".join(columns) + " FROM customer_health"
+    params = ()
+    if customer_id is not None:
+        query += " WHERE customer_id = %s"
+        params = (customer_id,)
+    query += " ORDER BY customer_id"
+
+    rows = fetch_all(query, params)
+    return pd.DataFrame(rows, columns=columns)
+
+
+
+# Dashboard histogram: ten 10-point health_score buckets, 100 counted in the last
+HISTOGRAM_BUCKETS = 10
+
+SUMMARY_QUERY = (
+    "SELECT COUNT(*) AS customers, AVG(health_score) AS average, "
+    "MIN(health_score) AS minimum, MAX(health_score) AS maximum, "
+    + ", ".join(f"SUM(LEAST(FLOOR(health_score / 10), {HISTOGRAM_BUCKETS - 1}) = {i}) AS bucket_{i}"
+                for i in range(HISTOGRAM_BUCKETS))
+    + " FROM customer_health"
+)
+
+
+def read_health_summary():
+    """
+    Population-wide dashboard figures computed in the database in a single
+    pass over idx_customer_health_score: customer count, average, minimum and
+    maximum health score and the histogram bucket counts. The result has a
+    constant size whatever the number of customers.
+    """
+    row = fetch_all(SUMMARY_QUERY)[0]
+    customers = int(row['customers'] or 0)
+    return {
+        'customers': customers,
+        'average': round(float(row['average']), 1) if customers else None,
+        'minimum': float(row['minimum']) if customers else None,
+        'maximum': float(row['maximum']) if customers else None,
+        # SUM() over an empty table is NULL
+        'buckets': [int(row[f'bucket_{i}'] or 0) for i in range(HISTOGRAM_BUCKETS)],
+    }
+
+
+# Keyset orderings for read_health_page: name -> (key columns, descending).
+# The health_score orderings walk idx_customer_health_score, whose entries
+# carry the primary key, so ties are broken by customer_id for free.
+PAGE_ORDERS = {
+    'customer_id': (['customer_id'], False),
+    'health_score': (['health_score', 'customer_id'], False),
+    '-health_score': (['health_score', 'customer_id'], True),
+}
+
+
+def read_health_page(columns=SNAPSHOT_COLUMNS, order='customer_id', after=None, limit=100):
+    """
+    Read one page of materialized health scores in keyset order.
+
+    after is the key of the last row of the previous page (None for the
+    first page), so every page is an index range read of at most limit + 1
+    rows however deep it is. The order's key columns are always selected
+    but only the requested columns are returned.
+    Returns (rows as dicts, key of the last row or None on the last page).
+    """
+    keys, descending = PAGE_ORDERS[order]
+    selected = [c for c in SNAPSHOT_COLUMNS if c in columns or c in keys]
+    op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+
+    query = "SELECT " + ", ".join(selected) + " FROM customer_health"
+    params = ()
+    if after is not None:
+        if len(keys) == 1:
+            query += f" WHERE {keys[0]} {op} %s"
+            params = tuple(after)
+        else:
+            # Expanded row comparison, which MySQL turns into an index range
+            query += f" WHERE {keys[0]} {op} %s OR ({keys[0]} = %s AND {keys[1]} {op} %s)"
+            params = (after[0], after[0], after[1])
+    query += " ORDER BY " + ", ".join(f"{k} {direction}" for k in keys) + " LIMIT %s"
+
+    rows = fetch_all(query, params + (limit + 1,))
+    last = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = tuple(rows[-1][k] for k in keys)
+    # Drop the sort keys the client did not ask for
+    if any(c not in columns for c in selected):
+        rows = [{c: row[c] for c in selected if c in columns} for row in rows]
+    return rows, last
+
+
+if __name__ == '__main__':
+    # Full rebuild, e.g. after loading sample data; the scheduler (see
+    # scheduler.py) repeats it so the 3-month windows keep sliding
+    count = refresh_health_snapshot()
+    print(f"Refreshed health snapshot for {count} customers")
@@ -1,50 +1,306 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
-import mysql.connector
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
 from pathlib import Path
+from datetime import date
+from contextlib import asynccontextmanager
 import json
-from src.backend.calculate_health_score import get_health_scores, get_health_details
-from src.utils import config
-db_config = config()
-app = FastAPI()
+import base64
+import time
+from src.backend.calculate_health_score import EXPORT_CHUNK_SIZE, get_health_details, iter_health_details
+from src.backend.health_snapshot import (PAGE_ORDERS, SNAPSHOT_COLUMNS, read_health_page, read_health_snapshot,
+                                         read_health_summary)
+from src.backend.events import (REQUIRED_FIELDS, MAX_BATCH_EVENTS, UnknownCustomers, existing_customers, validate_event,
+                                write_events)
+from src.backend.health_cache import health_cache
+from src.backend.health_history import read_health_trend
+from src.backend.event_queue import EVENT_QUEUE_ENABLED, EventQueue, QueueClosed, QueueFull
+from src.backend.json_response import FastJSONResponse, dumps
+from src.backend.warmup import WARM_CACHE, Warmup
+from src.backend import db, metrics, tracing
+
+# Largest page served by the JSON list endpoints
+MAX_PAGE_SIZE = 1000
+
+
+def persist_events(events):
+    """Write events and invalidate cached reads (inline or from the write-behind queue)."""
+    write_events(events)
+    # Cached read results are stale now, and so are these customers' ETags
+    health_cache.bump({customer_id for customer_id, _, _ in events})
+
+
+# Optional write-behind ingestion: events are acknowledged once validated and
+# flushed in the background with grouped inserts
+event_queue = EventQueue(persist_events) if EVENT_QUEUE_ENABLED else None
+
+
+def load_customer_list():
+    # Health scores (materialized in customer_health) as a list of dicts for templating
+    return read_health_snapshot(columns=['customer_id', 'health_score']).to_dict(orient='records')
+
+
+# Cached reads computed before the replica reports ready (see warm_cache)
+WARM_READS = {("customers",): load_customer_list, ("dashboard",): read_health_summary}
+
+
+def warm_cache():
+    for key, compute in WARM_READS.items():
+        health_cache.get(key, compute)
+
+
+def warm_templates():
+    # Compile the templates now rather than on their first request
+    for name in templates.env.list_templates():
+        templates.get_template(name)
+
+
+# Optional background warm-up: no database is needed to start, and /readyz
+# reports ready once the pool is open and the cache and templates are hot
+warmup = Warmup([lambda: db.get_pool().prefill(), warm_cache, warm_templates]) if WARM_CACHE else None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if event_queue is not None:
+        await event_queue.start()
+    if warmup is not None:
+        await warmup.start()
+    yield
+    if warmup is not None:
+        await warmup.stop()
+    # Flush everything still queued before the process exits
+    if event_queue is not None:
+        await event_queue.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 BASE_DIR = Path(__file__).parent
+
+
+class TimedTemplates(Jinja2Templates):
+    """Jinja2Templates recording each render in metrics.TEMPLATE_SECONDS."""
+
+    def TemplateResponse(self, name, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().TemplateResponse(name, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.TEMPLATE_SECONDS.observe(elapsed, template=name)
+            trace = tracing.current()
+            if trace is not None:
+                trace.add_span(f"render:{name}", elapsed)
+
+
 # Construct the absolute path to the templates directory
-templates = Jinja2Templates(directory=str(BASE_DIR.parent / "templates"))
+templates = TimedTemplates(directory=str(BASE_DIR.parent / "templates"))
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time every request under its route template (e.g. /api/customers/{customer_id}/health)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                        route=route.path if route else "unmatched", status=str(status))
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Trace requests sent with "X-Trace: <TRACE_HEADER_SECRET>" (or sampled by TRACE_SAMPLE_RATE):
+    the query / phase breakdown is returned in a Server-Timing header and
+    slow ones are logged (see tracing.py).
+    """
+    if not tracing.should_trace(request.headers.get(tracing.TRACE_HEADER)):
+        return await call_next(request)
+    token = tracing.start(request.method, request.url.path)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        trace = tracing.finish(token, status)
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+async def ingest_events(events):
+    """Persist events now, or enqueue them when write-behind is enabled. Returns True if queued."""
+    if event_queue is None:
+        await run_in_threadpool(persist_events, events)
+        return False
+    try:
+        event_queue.enqueue(events)
+    except (QueueFull, QueueClosed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return True
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header with etag."""
+    if etag is None or not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def conditional(request, etag, render):
+    """
+    Conditional GET: a 304 without calling render() (no query, no template)
+    when the client already holds etag, otherwise render() with the tag.
+    no-cache makes clients revalidate on every poll.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response = render()
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
 
 @app.get("/api/customers", response_class=HTMLResponse)
 def list_customers(request: Request):
-    # Get health scores as DataFrame
-    df = get_health_scores()
-    
-    # Convert to list of dicts for templating
-    customers = df.to_dict(orient='records')
-    
-    # Render the HTML template
-    return templates.TemplateResponse("customers.html", {"request": request, "customers": customers})
+    def render():
+        # Served from memory until the next event write
+        customers = health_cache.get(("customers",), load_customer_list)
+        return templates.TemplateResponse("customers.html", {"request": request, "customers": customers})
 
-@app.get("/api/customers/{customer_id}/health", response_class=HTMLResponse)
-def customer_health(request: Request, customer_id: int):
-    # Get all health scores
-    
-    df = get_health_details()
-    
-    # Filter for the specific customer
-    customer = df[df['customer_id'] == customer_id]
-    if customer.empty:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    
-    # Convert to dict for templating
-    customer_data = customer.to_dict(orient='records')[0]
-    # Render template
-    return templates.TemplateResponse(
-        "customer_detail.html",
-        {"request": request, "customer": customer_data}
+    return conditional(request, health_cache.etag(), render)
+
+def encode_cursor(order, key):
+    """Opaque pagination cursor for the row with the given keyset key."""
+    return base64.urlsafe_b64encode(json.dumps([order, *key]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order):
+    """Key encoded in cursor; 400 if it is malformed or from another sort order."""
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        value = None
+    keys = PAGE_ORDERS[order][0]
+    if (not isinstance(value, list) or len(value) != len(keys) + 1 or value[0] != order
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value[1:])):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(value[1:])
+
+
+def health_page(fields, sort, cursor, limit, default_fields):
+    """
+    One keyset page of the health snapshot as JSON. Pages are read straight
+    from customer_health (not cached), so memory stays bounded by the page
+    size however many customers there are.
+    """
+    columns = default_fields if fields is None else [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [c for c in columns if c not in SNAPSHOT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if sort not in PAGE_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(PAGE_ORDERS)}")
+
+    after = decode_cursor(cursor, sort) if cursor else None
+    rows, last = read_health_page(columns, sort, after, limit)
+    return FastJSONResponse({"items": rows, "next": encode_cursor(sort, last) if last else None})
+
+
+@app.get("/api/customers.json")
+def list_customers_json(fields: str = None, sort: str = 'customer_id', cursor: str = None,
+                        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)):
+    """JSON variant of /api/customers: customer_id and health_score by default."""
+    return health_page(fields, sort, cursor, limit, ['customer_id', 'health_score'])
+
+
+@app.get("/api/dashboard.json")
+def dashboard_json(fields: str = None, sort: str = 'customer_id', cursor: str = None,
+                   limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)):
+    """JSON variant of /api/dashboard: every score column by default."""
+    return health_page(fields, sort, cursor, limit, SNAPSHOT_COLUMNS)
+
+
+def export_ndjson(chunks):
+    for df in chunks:
+        yield b"".join(dumps(record) + b"\n" for record in df.to_dict(orient='records'))
+
+
+def export_csv(chunks):
+    # The header goes out first, so an export with no customers is still a valid CSV
+    yield ",".join(SNAPSHOT_COLUMNS) + "\n"
+    for df in chunks:
+        yield df.to_csv(index=False, header=False, columns=SNAPSHOT_COLUMNS)
+
+
+# format -> (generator over iter_health_details() chunks, media type)
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, "application/x-ndjson"),
+    'csv': (export_csv, "text/csv"),
+}
+
+
+@app.get("/api/export/health")
+def export_health(format: str = 'ndjson', chunk_size: int = Query(EXPORT_CHUNK_SIZE, ge=1, le=10000),
+                  as_of: date = None):
+    """
+    Stream live health details for every customer as NDJSON or CSV, scored
+    now or as of the end of the given day.
+
+    Customers are fetched and scored chunk by chunk with get_health_details(),
+    and each chunk is sent as soon as it is scored, so the response starts
+    after the first chunk and memory does not grow with the customer count.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    serialize, media_type = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        serialize(iter_health_details(chunk_size, as_of)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="customer_health.{format}"'}
     )
 
-from fastapi import HTTPException
+
+@app.get("/api/customers/{customer_id}/health", response_class=HTMLResponse)
+def customer_health(request: Request, customer_id: int, as_of: date = None):
+    def load_customer():
+        # Primary-key lookup in the health snapshot; customers not materialized
+        # yet (and past dates) are scored live with the filter pushed into
+        # every component query
+        df = read_health_snapshot(customer_id) if as_of is None else pd.DataFrame()
+        if df.empty:
+            df = get_health_details([customer_id], as_of=as_of)
+        return df.to_dict(orient='records')
+
+    def render():
+        records = health_cache.get(("customer", customer_id, as_of), load_customer)
+        if not records:
+            raise HTTPException(status_code=404, detail="Customer not found")
+
+        customer_data = records[0]
+        # Render template
+        return templates.TemplateResponse(
+            "customer_detail.html",
+            {"request": request, "customer": customer_data}
+        )
+
+    # The tag only changes with this customer's writes, so polls keep getting
+    # 304s while other customers receive events; as_of views get their own tag
+    return conditional(request, health_cache.etag(customer_id, as_of), render)
+
+@app.get("/api/customers/{customer_id}/trend")
+def customer_trend(customer_id: int, days: int = Query(90, ge=1, le=400)):
+    """Daily score series for one customer from health_score_history, oldest first."""
+    trend = health_cache.get(("trend", customer_id, days), lambda: read_health_trend(customer_id, days))
+    return FastJSONResponse({"customer_id": customer_id, "days": days, **trend})
 
 @app.post("/api/customers/{customer_id}/events", response_class=HTMLResponse)
 async def add_event_html(request: Request, customer_id: int, event: dict):
@@ -52,15 +308,7 @@ async def add_event_html(request: Request, customer_id: int, event: dict):
     event_type = event.get("type")
     details = event.get("details", {})
 
-    required_fields = {
-        "login": [],
-        "feature": ["feature_name"],
-        "ticket": [],
-        "invoice": ["amount", "due_date"],
-        "api": []
-    }
-
-    if event_type not in required_fields:
+    if event_type not in REQUIRED_FIELDS:
         return templates.TemplateResponse(
         "event_result.html",
         {
@@ -73,7 +321,7 @@ async def add_event_html(request: Request, customer_id: int, event: dict):
     )
 
     # Validate required fields
-    missing = [f for f in required_fields[event_type] if f not in details]
+    missing = [f for f in REQUIRED_FIELDS[event_type] if f not in details]
     if missing:
         return templates.TemplateResponse(
             "event_result.html",
@@ -81,40 +329,35 @@ async def add_event_html(request: Request, customer_id: int, event: dict):
             
         )
 
-    # Insert into database
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor()
+    # Counters must be non-negative integers before they reach the rollups
+    error = validate_event(event_type, details)
+    if error:
+        return templates.TemplateResponse(
+            "event_result.html",
+            {"request": request, "success": False, "message": error, "event": event},
+            status_code=400
+        )
+
+    # Queued events are written later, so check the customer exists now;
+    # inline, write_events checks it inside the transaction
     try:
-        if event_type == "login":
-            cursor.execute(
-                "INSERT INTO logins (customer_id, login_date) VALUES (%s, NOW())",
-                (customer_id,)
-            )
-        elif event_type == "feature":
-            cursor.execute(
-                "INSERT INTO feature_usage (customer_id, feature_name, usage_count, usage_date) VALUES (%s,%s,%s,NOW())",
-                (customer_id, details['feature_name'], details.get('usage_count', 1))
-            )
-        elif event_type == "ticket":
-            cursor.execute(
-                "INSERT INTO support_tickets (customer_id, created_at, status, priority) VALUES (%s,NOW(),%s,%s)",
-                (customer_id, details.get('status', 'open'), details.get('priority', 'medium'))
-            )
-        elif event_type == "invoice":
-            cursor.execute(
-                "INSERT INTO invoices (customer_id, amount, due_date, paid_date) VALUES (%s,%s,%s,%s)",
-                (customer_id, details['amount'], details['due_date'], details.get('paid_date'))
-            )
-        elif event_type == "api":
-            cursor.execute(
-                "INSERT INTO api_usage (customer_id, calls_count, usage_date) VALUES (%s,%s,NOW())",
-                (customer_id, details.get('calls_count', 1))
-            )
-
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+        if event_queue is not None and not await run_in_threadpool(existing_customers, [customer_id]):
+            raise UnknownCustomers([customer_id])
+        # Insert into database on a pooled connection, off the event loop
+        queued = await ingest_events([(customer_id, event_type, details)])
+    except UnknownCustomers as e:
+        return templates.TemplateResponse(
+            "event_result.html",
+            {"request": request, "success": False, "message": str(e), "event": event},
+            status_code=404
+        )
+
+    if queued:
+        return templates.TemplateResponse(
+            "event_result.html",
+            {"request": request, "success": True, "message": "Event queued for processing.", "event": event},
+            status_code=202
+        )
 
     return templates.TemplateResponse(
         "event_result.html",
@@ -122,8 +365,111 @@ async def add_event_html(request: Request, customer_id: int, event: dict):
     )
 
 
+def known_events(candidates, known):
+    """The events of candidates whose customer is in known; the others' results are marked failed."""
+    valid = []
+    for result, event in candidates:
+        if event[0] in known:
+            valid.append(event)
+        else:
+            result["success"] = False
+            result["message"] = f"Unknown customer_id: {event[0]}"
+    return valid
+
+
+@app.post("/api/events/batch")
+async def add_events_batch(batch: dict):
+    """
+    Ingest many events (any customers, any types) in one transaction.
+
+    Body: {"events": [{"customer_id": 1, "type": "login", "details": {}}, ...]}
+    Invalid items are reported and skipped; valid ones are written with one
+    multi-row INSERT per target table.
+    """
+    items = batch.get("events")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must contain an 'events' list")
+    if len(items) > MAX_BATCH_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_EVENTS} events per batch")
+
+    results = []
+    candidates = []  # (result, event) of the items that passed validation
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "success": False, "message": "Event must be an object"})
+            continue
+        customer_id = item.get("customer_id")
+        event_type = item.get("type")
+        details = item.get("details", {})
+
+        if not isinstance(customer_id, int) or isinstance(customer_id, bool):
+            error = "customer_id must be an integer"
+        else:
+            error = validate_event(event_type, details)
+
+        result = {"index": index, "customer_id": customer_id, "type": event_type, "success": error is None}
+        if error:
+            result["message"] = error
+        else:
+            candidates.append((result, (customer_id, event_type, details)))
+        results.append(result)
+
+    # Unknown customers would make write_events reject the whole batch, so
+    # they are reported per item like any other invalid event
+    known = await run_in_threadpool(existing_customers, [event[0] for _, event in candidates])
+    try:
+        valid = known_events(candidates, known)
+        queued = bool(valid) and await ingest_events(valid)
+    except UnknownCustomers as e:
+        # A customer deleted since the lookup: report it and write the rest
+        valid = known_events(candidates, known - set(e.customer_ids))
+        queued = bool(valid) and await ingest_events(valid)
+
+    body = {"inserted": len(valid), "failed": len(items) - len(valid), "queued": queued, "results": results}
+    return JSONResponse(body, status_code=202 if queued else 200)
+
+
 @app.get("/api/dashboard", response_class=HTMLResponse)
 def dashboard(request: Request):
-    df = get_health_details()
-    customers = df.to_dict(orient='records')
-    return templates.TemplateResponse("dashboard.html", {"request": request, "customers": customers})
\ No newline at end of file
+    # Histogram and headline figures are aggregated in the database, so the
+    # page carries ten bucket counts rather than every customer
+    def render():
+        summary = health_cache.get(("dashboard",), read_health_summary)
+        return templates.TemplateResponse("dashboard.html", {"request": request, "summary": summary})
+
+    return conditional(request, health_cache.etag(), render)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Latency histograms, rows per query, event counts and pool / cache state in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/healthz")
+def liveness():
+    """Liveness: the process is serving requests. Never touches the database."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readiness():
+    """Readiness: warm-up has finished and the database answers; 503 until then."""
+    warm = warmup.stats() if warmup is not None else {"ready": True}
+    # The database is only probed once warm-up (which needs it) is done
+    database = db.ping() if warm["ready"] else None
+    ready = bool(database)
+    body = {"status": "ready" if ready else "starting", "database": database, "warmup": warm}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return health_cache.stats()
+
+
+@app.get("/api/events/queue/stats")
+def event_queue_stats():
+    if event_queue is None:
+        return {"enabled": False}
+    return {"enabled": True, **event_queue.stats()}
\ No newline at end of file
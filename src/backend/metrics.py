@@ -0,0 +1,200 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from src.backend import tracing
+
+# Minimal Prometheus instrumentation, rendered in the text exposition format
+# by GET /metrics. Recording is a perf_counter() pair, a bisect and a short
+# locked update, cheap enough to leave on in production.
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the rows-per-query histogram buckets
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = []
+# Called at scrape time to refresh the gauges that mirror other components' stats
+COLLECTORS = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """[(suffix, label values, extra label, value)] for the text format."""
+        with self._lock:
+            return [("", key, "", value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Index of the first bucket whose bound is >= value (le is inclusive)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, n) for key, (counts, total, n) in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, n in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                samples.append(("_bucket", key, f'le="{_number(bound) if bound != "+Inf" else bound}"', cumulative))
+            samples.append(("_sum", key, "", total))
+            samples.append(("_count", key, "", n))
+        return samples
+
+
+def render():
+    """Every registered metric in the Prometheus text format."""
+    for collect in COLLECTORS:
+        collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---------------------------------------------------
+
+FUNCTION_SECONDS = Histogram(
+    "health_function_duration_seconds", "Time spent in a scoring function, including its queries.", ["function"])
+QUERY_ROWS = Histogram(
+    "health_query_rows", "Rows fetched per query, by the scoring function that ran it.", ["function"], ROW_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce a response (to the first byte for streams).",
+    ["method", "route", "status"])
+TEMPLATE_SECONDS = Histogram("template_render_duration_seconds", "Time spent rendering a Jinja template.", ["template"])
+EVENTS_INSERTED = Counter("events_inserted_total", "Events written to the database, by type.", ["type"])
+POOL_CONNECTIONS = Gauge("db_pool_connections", "Database pool connections by state, and the pool size.", ["state"])
+POOL_CONNECTS = Gauge("db_pool_connects", "Connections the pool has opened since start, and how many replaced broken ones.",
+                      ["kind"])
+CACHE_LOOKUPS = Gauge("health_cache_lookups", "Read cache lookups since start (or the last clear), by result.", ["result"])
+
+# Name of the innermost instrumented function running in this context, so
+# the queries it issues are attributed to it
+_current_function = ContextVar("current_function", default="other")
+
+
+def current_function():
+    return _current_function.get()
+
+
+def timed(func):
+    """Record func's duration in FUNCTION_SECONDS under its name (and as a phase of a traced request)."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_function.set(name)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            FUNCTION_SECONDS.observe(elapsed, function=name)
+            _current_function.reset(token)
+            trace = tracing.current()
+            if trace is not None:
+                trace.add_span(name, elapsed)
+    return wrapper
+
+
+def collect_pool_and_cache():
+    # Imported here: db and the cache are instrumented by this module's users
+    from src.backend import db
+    from src.backend.health_cache import health_cache
+
+    stats = db.pool_stats()
+    if stats is not None:
+        for state in ("in_use", "idle", "size"):
+            POOL_CONNECTIONS.set(stats[state], state=state)
+        POOL_CONNECTS.set(stats["created"], kind="created")
+        POOL_CONNECTS.set(stats["reconnects"], kind="reconnects")
+    cache = health_cache.stats()
+    CACHE_LOOKUPS.set(cache["hits"], result="hit")
+    CACHE_LOOKUPS.set(cache["misses"], result="miss")
+
+
+COLLECTORS.append(collect_pool_and_cache)
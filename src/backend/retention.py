@@ -0,0 +1,218 @@
+import argparse
+import os
+from datetime import date
+from src.backend import db
+from src.backend.rollups import ROLLUPS, backfill
+
+# Whole months of raw events kept before the current one. The scoring queries
+# read the rollups, so raw events only need to outlive late corrections.
+RAW_RETENTION_MONTHS = int(os.getenv("RAW_RETENTION_MONTHS", "6"))
+# Whole months kept in the windowed rollups (scoring looks back 3 months)
+ROLLUP_RETENTION_MONTHS = int(os.getenv("ROLLUP_RETENTION_MONTHS", "15"))
+# Whole months of daily score history kept for the trend endpoint
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "13"))
+# Empty monthly partitions created ahead of the current month
+PARTITIONS_AHEAD = 3
+
+# Raw event table -> (date column, rollup it is folded into)
+RAW_TABLES = {spec['source']: (spec['date_column'], table) for table, spec in ROLLUPS.items()}
+# Rollups partitioned by day; daily_feature_usage holds lifetime adoption instead
+WINDOW_ROLLUPS = ['daily_logins', 'daily_api_usage', 'daily_tickets']
+HISTORY_TABLE = 'health_score_history'
+
+# Fold daily feature rows older than %s into one row per customer, feature and
+# month (dated the 1st), so COUNT(DISTINCT feature_name) is unchanged
+COMPACT_FEATURES_QUERY = """
+    INSERT INTO daily_feature_usage (customer_id, day, feature_name, usage_count)
+    SELECT * FROM (
+        SELECT customer_id, day - INTERVAL (DAYOFMONTH(day) - 1) DAY AS month_start,
+               feature_name, SUM(usage_count) AS monthly_count
+        FROM daily_feature_usage
+        WHERE day < %s AND DAYOFMONTH(day) > 1
+        GROUP BY customer_id, month_start, feature_name
+    ) AS folded
+    ON DUPLICATE KEY UPDATE usage_count = daily_feature_usage.usage_count + VALUES(usage_count)
+    """
+
+PARTITIONS_QUERY = """
+    SELECT PARTITION_NAME
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+    """
+
+
+def add_months(month, n):
+    """First day of the month n months after (or before) `month`."""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name):
+    """Month held by a monthly partition, or None for p_old / pmax."""
+    if len(name) == 7 and name[0] == 'p' and name[1:].isdigit():
+        return date(int(name[1:5]), int(name[5:]), 1)
+    return None
+
+
+def missing_partitions(existing, first, last):
+    """
+    Months in [first, last] that need a partition. New partitions can only be
+    split off pmax, so months at or below the newest existing one are skipped.
+    """
+    months = [m for m in map(partition_month, existing) if m]
+    month = max(first, add_months(max(months), 1)) if months else first
+    missing = []
+    while month <= last:
+        missing.append(month)
+        month = add_months(month, 1)
+    return missing
+
+
+def expired_partitions(existing, cutoff):
+    """Monthly partitions holding only days before `cutoff`, oldest first."""
+    return [name for name in existing if partition_month(name) and partition_month(name) < cutoff]
+
+
+def list_partitions(cur, table):
+    cur.execute(PARTITIONS_QUERY, (table,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def create_partitions(cur, table, months):
+    """Split the given months off the catch-all pmax partition."""
+    parts = [f"PARTITION {partition_name(m)} VALUES LESS THAN ('{add_months(m, 1)}')" for m in months]
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cur.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(parts)})")
+
+
+def drop_partitions(cur, table, names):
+    cur.execute(f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}")
+
+
+def oldest_row(table, column):
+    """The earliest date in table.column, or None when it is empty."""
+    with db.cursor() as cur:
+        cur.execute(f"SELECT MIN({column}) FROM {table}")
+        return cur.fetchone()[0]
+
+
+def delete_rows(table, column, before):
+    """Delete the rows dated before `before` (the unpartitioned SQLite backend)."""
+    with db.transaction() as cur:
+        cur.execute(f"DELETE FROM {table} WHERE {column} < %s", (before,))
+        return cur.rowcount
+
+
+def expire_rows(plan, dry_run=False):
+    """
+    Retention without partitions: fold raw rows older than their cutoff into
+    the rollups, then delete them, for each (table, cutoff) of the plan.
+    Returns the actions, as run() does.
+    """
+    actions = []
+    for table, cutoff in plan:
+        column = RAW_TABLES[table][0] if table in RAW_TABLES else 'day'
+        oldest = oldest_row(table, column)
+        if oldest is None or str(oldest) >= str(cutoff):
+            continue
+        if table in RAW_TABLES:
+            rollup = RAW_TABLES[table][1]
+            actions.append((rollup, 'fold', f"{oldest}..{cutoff}"))
+            if not dry_run:
+                backfill(oldest, cutoff, [rollup])
+        actions.append((table, 'delete', f"before {cutoff}"))
+        if not dry_run:
+            delete_rows(table, column, cutoff)
+    return actions
+
+
+def compact_feature_rollup(before):
+    """Fold daily feature usage before `before` into monthly rows."""
+    with db.transaction() as cur:
+        cur.execute(COMPACT_FEATURES_QUERY, (before,))
+        cur.execute("DELETE FROM daily_feature_usage WHERE day < %s AND DAYOFMONTH(day) > 1", (before,))
+
+
+def partition_tables(plan, last, dry_run=False):
+    """
+    Create the monthly partitions up to `last` and retire the ones before
+    each table's cutoff, for each (table, cutoff) of the plan.
+    """
+    actions = []
+    with db.cursor() as cur:
+        for table, cutoff in plan:
+            existing = list_partitions(cur, table)
+
+            months = missing_partitions(existing, cutoff, last)
+            if months:
+                actions.append((table, 'create', [partition_name(m) for m in months]))
+                if not dry_run:
+                    create_partitions(cur, table, months)
+
+            expired = expired_partitions(existing, cutoff)
+            if not expired:
+                continue
+            if table in RAW_TABLES:
+                rollup = RAW_TABLES[table][1]
+                for name in expired:
+                    month = partition_month(name)
+                    actions.append((rollup, 'fold', name))
+                    if not dry_run:
+                        backfill(month, add_months(month, 1), [rollup])
+            actions.append((table, 'drop', expired))
+            if not dry_run:
+                drop_partitions(cur, table, expired)
+    return actions
+
+
+def run(today=None, raw_months=RAW_RETENTION_MONTHS, rollup_months=ROLLUP_RETENTION_MONTHS,
+        history_months=HISTORY_RETENTION_MONTHS, ahead=PARTITIONS_AHEAD, dry_run=False):
+    """
+    Create upcoming monthly partitions and retire expired ones.
+
+    Before an expired raw partition is dropped, its month is re-folded into
+    the rollups (rollups.backfill over that month), so lifetime metrics stay
+    correct once the raw rows are gone. The SQLite backend has no partitions,
+    so expired rows are folded and deleted instead (expire_rows). Returns the
+    actions taken, as (table, action, detail) tuples.
+    """
+    if rollup_months < raw_months:
+        raise ValueError("Rollups must be kept at least as long as the raw events")
+    this_month = (today or date.today()).replace(day=1)
+    raw_cutoff = add_months(this_month, -raw_months)
+    rollup_cutoff = add_months(this_month, -rollup_months)
+    history_cutoff = add_months(this_month, -history_months)
+    last = add_months(this_month, ahead)
+
+    plan = [(table, raw_cutoff) for table in RAW_TABLES] + [(table, rollup_cutoff) for table in WINDOW_ROLLUPS]
+    plan.append((HISTORY_TABLE, history_cutoff))
+    if db.dialect() == 'sqlite':
+        actions = expire_rows(plan, dry_run)
+    else:
+        actions = partition_tables(plan, last, dry_run)
+
+    actions.append(('daily_feature_usage', 'compact', str(rollup_cutoff)))
+    if not dry_run:
+        compact_feature_rollup(rollup_cutoff)
+    return actions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of the event and rollup tables")
+    parser.add_argument('--raw-months', type=int, default=RAW_RETENTION_MONTHS,
+                        help=f'whole months of raw events to keep (default: {RAW_RETENTION_MONTHS})')
+    parser.add_argument('--rollup-months', type=int, default=ROLLUP_RETENTION_MONTHS,
+                        help=f'whole months of windowed rollups to keep (default: {ROLLUP_RETENTION_MONTHS})')
+    parser.add_argument('--history-months', type=int, default=HISTORY_RETENTION_MONTHS,
+                        help=f'whole months of score history to keep (default: {HISTORY_RETENTION_MONTHS})')
+    parser.add_argument('--dry-run', action='store_true', help='print the actions without running them')
+    args = parser.parse_args()
+
+    for table, action, detail in run(raw_months=args.raw_months, rollup_months=args.rollup_months,
+                                     history_months=args.history_months, dry_run=args.dry_run):
+        print(f"{table}: {action} {detail}")
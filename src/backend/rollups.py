@@ -0,0 +1,146 @@
+import argparse
+from src.backend import db
+
+# How each rollup table is derived from its raw event table. The backfill
+# statement rebuilds the rollup for the days in [%s, %s).
+ROLLUPS = {
+    'daily_logins': {
+        'source': 'logins',
+        'date_column': 'login_date',
+        'backfill': """
+    INSERT INTO daily_logins (customer_id, day, logins)
+    SELECT customer_id, login_date, COUNT(*)
+    FROM logins
+    WHERE login_date >= %s AND login_date < %s
+    GROUP BY customer_id, login_date
+    """,
+    },
+    'daily_api_usage': {
+        'source': 'api_usage',
+        'date_column': 'usage_date',
+        'backfill': """
+    INSERT INTO daily_api_usage (customer_id, day, calls_count)
+    SELECT customer_id, usage_date, SUM(calls_count)
+    FROM api_usage
+    WHERE usage_date >= %s AND usage_date < %s
+    GROUP BY customer_id, usage_date
+    """,
+    },
+    'daily_feature_usage': {
+        'source': 'feature_usage',
+        'date_column': 'usage_date',
+        'backfill': """
+    INSERT INTO daily_feature_usage (customer_id, day, feature_name, usage_count)
+    SELECT customer_id, usage_date, feature_name, SUM(usage_count)
+    FROM feature_usage
+    WHERE usage_date >= %s AND usage_date < %s AND feature_name IS NOT NULL
+    GROUP BY customer_id, usage_date, feature_name
+    """,
+    },
+    'daily_tickets': {
+        'source': 'support_tickets',
+        'date_column': 'created_at',
+        'backfill': """
+    INSERT INTO daily_tickets (customer_id, day, status, tickets)
+    SELECT customer_id, created_at, status, COUNT(*)
+    FROM support_tickets
+    WHERE created_at >= %s AND created_at < %s AND status IS NOT NULL
+    GROUP BY customer_id, created_at, status
+    """,
+    },
+}
+
+# Incremental maintenance on ingest: one upsert per event type, adding the
+# day's new events to the existing counters. Events are stamped with NOW(),
+# so they land on CURDATE().
+ROLLUP_UPSERTS = {
+    'login': (
+        "INSERT INTO daily_logins (customer_id, day, logins) VALUES (%s, CURDATE(), %s) "
+        "ON DUPLICATE KEY UPDATE logins = logins + VALUES(logins)",
+        lambda customer_id, details: (customer_id,),
+        lambda details: 1
+    ),
+    'api': (
+        "INSERT INTO daily_api_usage (customer_id, day, calls_count) VALUES (%s, CURDATE(), %s) "
+        "ON DUPLICATE KEY UPDATE calls_count = calls_count + VALUES(calls_count)",
+        lambda customer_id, details: (customer_id,),
+        lambda details: details.get('calls_count', 1)
+    ),
+    'feature': (
+        "INSERT INTO daily_feature_usage (customer_id, day, feature_name, usage_count) VALUES (%s, CURDATE(), %s, %s) "
+        "ON DUPLICATE KEY UPDATE usage_count = usage_count + VALUES(usage_count)",
+        lambda customer_id, details: (customer_id, details['feature_name']),
+        lambda details: details.get('usage_count', 1)
+    ),
+    'ticket': (
+        "INSERT INTO daily_tickets (customer_id, day, status, tickets) VALUES (%s, CURDATE(), %s, %s) "
+        "ON DUPLICATE KEY UPDATE tickets = tickets + VALUES(tickets)",
+        lambda customer_id, details: (customer_id, details.get('status', 'open')),
+        lambda details: 1
+    ),
+}
+
+
+def rollup_rows(events):
+    """
+    Aggregate (customer_id, event_type, details) events into upsert rows,
+    one per rollup key, so a burst of events costs one row per key.
+    Returns {event_type: [(key..., amount), ...]}.
+    """
+    totals = {}
+    for customer_id, event_type, details in events:
+        if event_type not in ROLLUP_UPSERTS:
+            continue
+        _, key, amount = ROLLUP_UPSERTS[event_type]
+        counters = totals.setdefault(event_type, {})
+        k = key(customer_id, details)
+        counters[k] = counters.get(k, 0) + amount(details)
+    return {event_type: [k + (n,) for k, n in counters.items()] for event_type, counters in totals.items()}
+
+
+def update_rollups(cur, events):
+    """Add events to the daily rollups inside the caller's transaction."""
+    for event_type, rows in rollup_rows(events).items():
+        query = ROLLUP_UPSERTS[event_type][0]
+        if len(rows) == 1:
+            cur.execute(query, rows[0])
+        else:
+            cur.executemany(query, rows)
+
+
+def backfill(since=None, until=None, tables=None):
+    """
+    Rebuild rollups from the raw event tables for the days in [since, until).
+
+    since defaults to the oldest raw event still stored, so days whose raw
+    partitions were already compacted away (see retention.py) are never
+    wiped; until defaults to no upper bound. Each table is replaced in its
+    own transaction. Returns {table: rows written}.
+    """
+    until = until or '9999-12-31'
+    written = {}
+    for table in tables or ROLLUPS:
+        spec = ROLLUPS[table]
+        with db.transaction() as cur:
+            start = since
+            if start is None:
+                cur.execute(f"SELECT MIN({spec['date_column']}) FROM {spec['source']}")
+                start = cur.fetchone()[0]
+                if start is None:
+                    written[table] = 0
+                    continue
+            cur.execute(f"DELETE FROM {table} WHERE day >= %s AND day < %s", (start, until))
+            cur.execute(spec['backfill'], (start, until))
+            written[table] = cur.rowcount
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the daily rollup tables from the raw events")
+    parser.add_argument('--since', help='first day to rebuild, YYYY-MM-DD (default: oldest raw event)')
+    parser.add_argument('--until', help='rebuild days before this date, YYYY-MM-DD (default: no limit)')
+    parser.add_argument('--table', action='append', choices=sorted(ROLLUPS), help='rollup to rebuild (default: all)')
+    args = parser.parse_args()
+
+    for table, rows in backfill(args.since, args.until, args.table).items():
+        print(f"{table}: {rows} rows")
@@ -0,0 +1,72 @@
+import argparse
+import functools
+import logging
+import os
+import time
+from src.backend import retention
+from src.backend.health_history import record_health_history
+from src.backend.health_snapshot import refresh_health_snapshot
+
+# Periodic maintenance jobs, run by one process (the scheduler service in
+# docker-compose.backend.yml) rather than by every API replica. Each job runs
+# at start and then every interval; an interval of 0 disables it.
+
+# Full snapshot rebuild, so the 3-month windows keep sliding for customers
+# without new events (environment overrides the default)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "3600"))
+# Today's row in health_score_history (re-recording the same day replaces it)
+HISTORY_SECONDS = float(os.getenv("HISTORY_SECONDS", "86400"))
+# Partition maintenance and expiry (src.backend.retention), daily
+RETENTION_SECONDS = float(os.getenv("RETENTION_SECONDS", "86400"))
+
+logger = logging.getLogger("customer_health.scheduler")
+
+# (name, callable, interval in seconds)
+JOBS = [
+    ("health_snapshot", refresh_health_snapshot, SNAPSHOT_REFRESH_SECONDS),
+    # Copies the snapshot the job above has just rebuilt, so it must come
+    # after it and not rebuild it again
+    ("health_history", functools.partial(record_health_history, refresh=False), HISTORY_SECONDS),
+    ("retention", retention.run, RETENTION_SECONDS),
+]
+
+
+def run_due(jobs, next_run, now):
+    """
+    Run every job whose time has come (all of them on the first call) and
+    schedule its next run. A failing job is logged and tried again at its
+    next interval. Returns the time the next job is due.
+    """
+    for name, job, interval in jobs:
+        if now < next_run.get(name, now):
+            continue
+        started = time.perf_counter()
+        try:
+            result = job()
+            logger.info("%s finished in %.1fs: %s", name, time.perf_counter() - started, result)
+        except Exception:
+            logger.exception("%s failed", name)
+        next_run[name] = now + interval
+    return min(next_run.values())
+
+
+def run_forever(jobs=JOBS, clock=time.monotonic, sleep=time.sleep):
+    jobs = [job for job in jobs if job[2] > 0]
+    if not jobs:
+        return
+    next_run = {}
+    while True:
+        wake = run_due(jobs, next_run, clock())
+        sleep(max(0.0, wake - clock()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the periodic maintenance jobs")
+    parser.add_argument('--once', action='store_true', help='run every job once and exit (e.g. from cron)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.once:
+        run_due(JOBS, {}, time.monotonic())
+    else:
+        run_forever()
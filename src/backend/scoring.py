@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from src.backend.metrics import timed
+
+# Threshold tables for the components that are bucketed into 0–100 scores.
+# 'edges' are ascending bin edges and 'scores' has one more entry than 'edges'.
+# side='right' means a value equal to an edge moves up a bucket (>=),
+# side='left' means it stays in the lower bucket (> / <=).
+# 'missing' is the score given when the customer has no data for the metric.
+SCORE_TABLES = {
+    'login_score': {
+        'column': 'avg_logins_per_week',
+        'edges': [1, 5, 10, 20],
+        'scores': [0, 25, 50, 75, 100],
+        'side': 'right',
+        'missing': 0,
+    },
+    'ticket_score': {
+        # Inverse: more tickets = lower score
+        'column': 'open_tickets',
+        'edges': [0, 2, 5],
+        'scores': [100, 75, 50, 25],
+        'side': 'left',
+        'missing': 100,
+    },
+    'api_score': {
+        'column': 'avg_api_calls_per_week',
+        'edges': [50, 200, 400],
+        'scores': [25, 50, 75, 100],
+        'side': 'left',
+        'missing': 25,
+    },
+}
+
+# Components that are already 0–100 and only need a default when missing
+PASSTHROUGH_SCORES = {
+    'feature_score': {'column': 'feature_adoption_score', 'missing': 0},
+    'invoice_payment_score': {'column': 'invoice_payment_score', 'missing': 100},
+}
+
+WEIGHTS = {
+    'login_score': 0.25,
+    'feature_score': 0.25,
+    'ticket_score': 0.2,
+    'invoice_payment_score': 0.15,
+    'api_score': 0.15
+}
+
+SCORE_COLUMNS = ['login_score', 'feature_score', 'ticket_score', 'invoice_payment_score', 'api_score']
+
+
+def score_column(values, table):
+    """
+    Bucket a whole column of raw metric values into scores using one of the
+    SCORE_TABLES entries. NaN/None values get the table's 'missing' score.
+    """
+    values = np.asarray(values, dtype=float)
+    edges = np.asarray(table['edges'], dtype=float)
+    scores = np.asarray(table['scores'], dtype=float)
+
+    idx = np.searchsorted(edges, values, side=table['side'])
+    # NaN sorts past the last edge, so the index is clipped before the lookup
+    result = scores[np.minimum(idx, len(scores) - 1)]
+    return np.where(np.isnan(values), float(table['missing']), result)
+
+
+def health_score(scores):
+    """
+    Weighted sum of the component score columns. `scores` is any mapping of
+    column name -> array (DataFrame or dict).
+    """
+    matrix = np.column_stack([np.asarray(scores[col], dtype=float) for col in SCORE_COLUMNS])
+    weights = np.array([WEIGHTS[col] for col in SCORE_COLUMNS])
+    return matrix @ weights
+
+
+@timed
+def score_components(df):
+    """
+    Turn the raw components (see calculate_health_score.COMPONENT_COLUMNS)
+    into the five 0–100 component scores and the overall health_score.
+
+    Returns a new DataFrame with customer_id, the score columns and health_score.
+    """
+    out = pd.DataFrame({'customer_id': df['customer_id'].to_numpy()})
+
+    for name, table in SCORE_TABLES.items():
+        out[name] = score_column(df[table['column']], table)
+
+    for name, spec in PASSTHROUGH_SCORES.items():
+        values = np.asarray(df[spec['column']], dtype=float)
+        out[name] = np.where(np.isnan(values), float(spec['missing']), values)
+
+    out['health_score'] = health_score(out)
+    return out[['customer_id'] + SCORE_COLUMNS + ['health_score']]
@@ -0,0 +1,172 @@
+import math
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from src.backend.db import POOL_PING_AFTER, POOL_SIZE, POOL_TIMEOUT, ConnectionPool
+
+# Embedded storage for DB_BACKEND=sqlite (see db.get_pool): one database file,
+# no server. The rest of the code keeps writing MySQL; translate() rewrites
+# the handful of MySQL-only constructs it uses into SQLite.
+#
+# Known difference: NOW() - INTERVAL n MONTH becomes '-n months', which does
+# not clamp to the end of a shorter month as MySQL does. On May 31, MySQL's
+# 3-month window starts on Feb 29 (or 28) and SQLite's on "Feb 31", i.e.
+# Mar 2 (or 3), so the live windows can start a day or two later. as_of
+# windows are computed in Python (months_before) and agree on both.
+# Long id lists are split into FILTER_CHUNK_SIZE pieces by their callers
+# (calculate_health_score.id_chunks) to stay under the bound-variable limit.
+
+SCHEMA = Path(__file__).resolve().parents[2] / "database" / "schema_sqlite.sql"
+
+# (pattern, replacement), applied in order
+TRANSLATIONS = [
+    (r"NOW\(\) - INTERVAL (\d+) MONTH", r"datetime('now', 'localtime', '-\1 months')"),
+    # Every other NOW() is written to a DATE column, which MySQL truncates to
+    # the day (customer_health.updated_at is the exception and loses its time)
+    (r"NOW\(\)|CURDATE\(\)", "date('now', 'localtime')"),
+    (r"(\w+) - INTERVAL \(DAYOFMONTH\(\1\) - 1\) DAY", r"date(\1, 'start of month')"),
+    (r"DAYOFMONTH\((\w+)\)", r"CAST(strftime('%d', \1) AS INTEGER)"),
+    # MySQL's / always returns a decimal; SQLite divides integers as integers
+    (r"/ (\d+)\b(?!\.)", r"/ \1.0"),
+    (r"/ COUNT\(\*\)", "* 1.0 / COUNT(*)"),
+    (r"VALUES\((\w+)\)", r"excluded.\1"),
+    (r"ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET"),
+    (r"%s", "?"),
+    # A write transaction already excludes every other writer of the file
+    (r" FOR UPDATE\b", ""),
+]
+
+
+@lru_cache(maxsize=512)
+def translate(query):
+    """Rewrite a MySQL query of this code base into SQLite."""
+    for pattern, replacement in TRANSLATIONS:
+        query = re.sub(pattern, replacement, query)
+    # An INSERT ... SELECT upsert needs a WHERE before ON CONFLICT, or SQLite
+    # reads the ON as a join constraint
+    if "ON CONFLICT" in query and re.search(r"\bSELECT\b", query):
+        head, tail = query.split("ON CONFLICT", 1)
+        if "WHERE" not in head[head.rfind(")"):]:
+            query = head + "WHERE true ON CONFLICT" + tail
+    return query
+
+
+# Dates go in as ISO strings and DATE / DATETIME columns come back as objects,
+# like mysql-connector returns them
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value[:10].decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _floor(value):
+    return None if value is None else math.floor(value)
+
+
+class Cursor:
+    """A sqlite3 cursor taking MySQL queries and, with dictionary, returning dict rows."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=()):
+        self._cursor.execute(translate(query), tuple(params))
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(translate(query), rows)
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip([column[0] for column in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """The parts of a mysql-connector connection the code base uses, over sqlite3."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return Cursor(self._conn.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def is_connected(self):
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(path, timeout=POOL_TIMEOUT):
+    # Pooled connections move between threads, one at a time
+    conn = sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.create_function("FLOOR", 1, _floor, deterministic=True)
+    conn.create_function("LEAST", -1, min, deterministic=True)
+    conn.create_function("GREATEST", -1, max, deterministic=True)
+    return Connection(conn)
+
+
+def init_schema(path):
+    """Create any missing tables and indexes of schema_sqlite.sql."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA.read_text())
+    finally:
+        conn.close()
+
+
+class SQLitePool(ConnectionPool):
+    """
+    ConnectionPool over one SQLite database file. The schema is applied when
+    the pool is created; WAL mode lets readers run while a writer commits.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        super().__init__({"database": path}, size, timeout, ping_after)
+        init_schema(path)
+
+    def _connect(self):
+        conn = connect(self.db_config["database"], self.timeout)
+        with self._lock:
+            self.created += 1
+        return conn
@@ -0,0 +1,137 @@
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+
+# Opt-in per-request tracing: a request carrying "X-Trace: <TRACE_HEADER_SECRET>"
+# (or picked by TRACE_SAMPLE_RATE) records every query of the scoring layer,
+# the scoring phases and template renders, and optionally the peak traced
+# memory. The breakdown is returned in a Server-Timing header and logged as
+# one JSON line when the request took at least TRACE_SLOW_MS.
+TRACE_HEADER = "X-Trace"
+# Clients can only ask for a trace with this shared secret; unset, the
+# header is ignored
+TRACE_HEADER_SECRET = os.getenv("TRACE_HEADER_SECRET", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+# tracemalloc slows every allocation of the process down while any traced
+# request is running, so it is off unless asked for
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "0") == "1"
+# Longest SQL text kept per query in the log
+MAX_STATEMENT_LENGTH = 300
+
+# Slow traced requests are written to stderr as one JSON object per line
+logger = logging.getLogger("customer_health.trace")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_trace = ContextVar("trace", default=None)
+
+_memory_lock = threading.Lock()
+_memory_users = 0
+_memory_owned = False
+
+
+class Trace:
+    """Queries and timed phases of one request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.queries = []  # (statement, seconds, rows)
+        self.spans = []  # (name, seconds), in completion order
+        self.peak_bytes = None
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def add_query(self, statement, seconds, rows):
+        self.queries.append((statement, seconds, rows))
+
+    def add_span(self, name, seconds):
+        self.spans.append((name, seconds))
+
+    def server_timing(self):
+        """Server-Timing header value: total, all queries, then each phase."""
+        parts = [f"total;dur={self.seconds * 1000:.2f}",
+                 f'db;dur={sum(q[1] for q in self.queries) * 1000:.2f};desc="{len(self.queries)} queries"']
+        parts += [f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={seconds * 1000:.2f}" for name, seconds in self.spans]
+        if self.peak_bytes is not None:
+            parts.append(f'mem;desc="peak {self.peak_bytes / 2**20:.2f} MB"')
+        return ", ".join(parts)
+
+    def summary(self, status=None):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_ms": round(self.seconds * 1000, 3),
+            "peak_bytes": self.peak_bytes,
+            "phases": [{"name": name, "ms": round(seconds * 1000, 3)} for name, seconds in self.spans],
+            "queries": [{"sql": " ".join(statement.split())[:MAX_STATEMENT_LENGTH], "ms": round(seconds * 1000, 3),
+                         "rows": rows} for statement, seconds, rows in self.queries],
+        }
+
+
+def current():
+    """The Trace of the request being handled, or None when it is not traced."""
+    return _trace.get()
+
+
+def should_trace(header_value, sample_rate=TRACE_SAMPLE_RATE, secret=None):
+    """Trace when the header carries the configured secret, otherwise when sampled."""
+    secret = TRACE_HEADER_SECRET if secret is None else secret
+    if header_value is not None and secret:
+        return hmac.compare_digest(header_value.encode(), secret.encode())
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _start_memory():
+    global _memory_users, _memory_owned
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_owned = True
+        _memory_users += 1
+        # Concurrent traced requests share the peak
+        tracemalloc.reset_peak()
+
+
+def _stop_memory():
+    global _memory_users, _memory_owned
+    with _memory_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _memory_users -= 1
+        if _memory_users == 0 and _memory_owned:
+            tracemalloc.stop()
+            _memory_owned = False
+    return peak
+
+
+def start(method, path):
+    """Begin tracing the current request. Returns the token finish() needs."""
+    trace = Trace(method, path)
+    if TRACE_MEMORY:
+        _start_memory()
+    return _trace.set(trace)
+
+
+def finish(token, status=None):
+    """Stop the trace begun with start(), log it if slow, and return it."""
+    trace = _trace.get()
+    _trace.reset(token)
+    trace.seconds = time.perf_counter() - trace.started
+    if TRACE_MEMORY:
+        trace.peak_bytes = _stop_memory()
+    if trace.seconds * 1000 >= TRACE_SLOW_MS:
+        logger.info(json.dumps(trace.summary(status)))
+    return trace
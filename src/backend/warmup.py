@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+from src.backend.db import CONNECT_BACKOFF_MAX
+
+# Warm-up before serving (environment overrides the defaults): with
+# WARM_CACHE=1 the app starts immediately and reports ready on /readyz only
+# once the pool is open and the cached reads have been computed
+WARM_CACHE = os.getenv("WARM_CACHE", "1") == "1"
+# First wait between failed warm-up attempts; it doubles up to DB_CONNECT_BACKOFF_MAX
+WARM_RETRY_SECONDS = float(os.getenv("WARM_RETRY_SECONDS", "1"))
+
+
+class Warmup:
+    """
+    Runs `steps` (blocking callables, in a worker thread) in the background
+    until they all succeed, retrying with backoff, e.g. while the database
+    is still starting. `ready` tells the readiness probe when they have.
+    """
+
+    def __init__(self, steps, retry_seconds=WARM_RETRY_SECONDS):
+        self.steps = steps
+        self.retry_seconds = retry_seconds
+        self._task = None
+        self.ready = False
+        self.attempts = 0
+        self.last_error = None
+        self.seconds = None
+
+    async def start(self):
+        """Start warming up on the running event loop; returns at once."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _warm(self):
+        for step in self.steps:
+            step()
+
+    async def _run(self):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self.attempts += 1
+            try:
+                await asyncio.to_thread(self._warm)
+                break
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(min(self.retry_seconds * 2 ** attempt, CONNECT_BACKOFF_MAX))
+            attempt += 1
+        self.seconds = time.perf_counter() - started
+        self.last_error = None
+        self.ready = True
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+        }
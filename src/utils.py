@@ -1,9 +1,23 @@
 import json
 import os
 
+# Environment variables that override db_config.json (see README)
+ENV_OVERRIDES = {
+    "host": "DB_HOST",
+    "port": "DB_PORT",
+    "user": "DB_USER",
+    "password": "DB_PASSWORD",
+    "database": "DB_NAME",
+}
+
 def config():
     # Load from JSON
     with open(os.path.join(os.path.dirname(__file__), "db_config.json")) as f:
         db_config = json.load(f)
 
+    for key, variable in ENV_OVERRIDES.items():
+        value = os.getenv(variable)
+        if value:
+            db_config[key] = int(value) if key == "port" else value
+
     return db_config
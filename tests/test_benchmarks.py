@@ -0,0 +1,42 @@
+# test_benchmarks.py
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import compare, measure
+from benchmarks.seed import schema_statements
+
+
+class TestBenchmarkSeed(unittest.TestCase):
+    """Tests for the benchmark database setup (no real database)"""
+
+    def test_schema_targets_benchmark_database(self):
+        statements = schema_statements('customer_health_bench')
+        self.assertEqual(statements[0], 'USE customer_health_bench')
+        self.assertTrue(any(s.startswith('CREATE TABLE customers') for s in statements))
+
+
+class TestBenchmarkRun(unittest.TestCase):
+    """Tests for measuring and comparing against the baseline"""
+
+    def test_measure_reports_percentiles_and_memory(self):
+        result = measure(lambda: [0] * 100_000, repeat=5)
+        self.assertEqual(result['runs'], 5)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        # The list of 100k references is ~0.8 MB
+        self.assertGreater(result['peak_mb'], 0.5)
+
+    def test_compare_flags_only_regressions_beyond_tolerance(self):
+        baseline = {'a': {'p95_ms': 10.0, 'peak_mb': 2.0}, 'b': {'p95_ms': 10.0, 'peak_mb': 2.0}}
+        results = {
+            'a': {'p95_ms': 12.0, 'peak_mb': 2.0},   # within 25%
+            'b': {'p95_ms': 10.0, 'peak_mb': 3.0},   # memory grew 50%
+            'new': {'p95_ms': 99.0, 'peak_mb': 9.0},  # no baseline yet
+        }
+        self.assertEqual(compare(results, baseline, 0.25), [('b', 'peak_mb', 2.0, 3.0)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+# test_creating_samples.py
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.creating_samples import (BLOCK_SIZE, COLUMNS, EVENTS_PER_CUSTOMER, generate_block, insert_rows,
+                                       load_samples, name_pool)
+
+END = date(2024, 6, 30)
+NAMES = name_pool(42)
+
+
+def block(number, customers, seed=42):
+    return generate_block(number, customers, seed, months=3, end=END, names=NAMES)
+
+
+class TestSampleGeneration(unittest.TestCase):
+    """Tests for the sample data generator (no real database)"""
+
+    def test_same_seed_same_rows(self):
+        first, second = block(0, 500), block(0, 500)
+        for table in COLUMNS:
+            self.assertTrue(first[table].equals(second[table]), table)
+        self.assertFalse(block(0, 500, seed=7)['logins'].equals(first['logins']))
+
+    def test_blocks_cover_disjoint_id_ranges(self):
+        customers = BLOCK_SIZE + 50
+        first, second = block(0, customers), block(1, customers)
+        self.assertEqual(first['customers']['id'].tolist(), list(range(1, BLOCK_SIZE + 1)))
+        self.assertEqual(second['customers']['id'].tolist(), list(range(BLOCK_SIZE + 1, customers + 1)))
+        self.assertTrue(second['logins']['customer_id'].between(BLOCK_SIZE + 1, customers).all())
+
+    def test_block_does_not_depend_on_the_others(self):
+        # A worker generating only block 1 gets the same rows as a full run
+        self.assertTrue(block(1, 2 * BLOCK_SIZE)['logins'].equals(block(1, 3 * BLOCK_SIZE)['logins']))
+
+    def test_events_match_the_means(self):
+        data = block(0, 5000)
+        for table, mean in EVENTS_PER_CUSTOMER.items():
+            self.assertAlmostEqual(len(data[table]) / 5000, mean, delta=mean * 0.15, msg=table)
+
+    def test_activity_is_skewed(self):
+        counts = block(0, 5000)['logins']['customer_id'].value_counts()
+        # The busiest 5% of customers produce far more than 5% of the logins
+        self.assertGreater(counts.nlargest(250).sum() / counts.sum(), 0.15)
+
+    def test_dates_stay_in_the_period(self):
+        data = block(0, 1000)
+        days = data['logins']['login_date']
+        self.assertLessEqual(days.max().date(), END)
+        self.assertGreaterEqual(days.min().date(), date(2024, 4, 1))
+        paid = data['invoices']['paid_date'].dropna()
+        self.assertLessEqual(paid.max().date(), END)
+        self.assertTrue(data['invoices']['paid_date'].isna().any())
+
+    def test_insert_rows_batches_with_dates_and_nulls(self):
+        cur = MagicMock()
+        df = block(0, 100)['invoices']
+        insert_rows(cur, 'invoices', df)
+        query, rows = cur.executemany.call_args_list[0].args
+        self.assertTrue(query.startswith("INSERT INTO invoices (customer_id, amount, due_date, paid_date)"))
+        self.assertEqual(sum(len(call.args[1]) for call in cur.executemany.call_args_list), len(df))
+        self.assertIsInstance(rows[0][2], date)
+        self.assertIn(None, [row[3] for row in rows])
+
+    def test_each_block_closes_its_connection(self):
+        conn = MagicMock()
+        with patch('database.creating_samples.mysql.connector.connect', return_value=conn) as connect:
+            totals = load_samples({"host": "db"}, customers=BLOCK_SIZE + 10, months=1, end=END)
+
+        self.assertEqual(totals['customers'], BLOCK_SIZE + 10)
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(conn.close.call_count, 2)
+        self.assertEqual(conn.commit.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
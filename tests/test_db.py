@@ -0,0 +1,136 @@
+# test_db.py
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.db import ConnectionPool, PoolTimeout, backoff_delays, connect_with_retry
+
+
+def fake_connection():
+    conn = MagicMock()
+    conn.in_transaction = False
+    conn.is_connected.return_value = True
+    return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Unit tests for the pooled connection layer (no real database)"""
+
+    def setUp(self):
+        self.connect_patch = patch('src.backend.db.mysql.connector.connect', side_effect=lambda **kw: fake_connection())
+        self.mock_connect = self.connect_patch.start()
+        self.addCleanup(self.connect_patch.stop)
+
+    def test_connection_is_reused(self):
+        pool = ConnectionPool({}, size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(self.mock_connect.call_count, 1)
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool({}, size=1, timeout=0.05)
+        with pool.connection():
+            with self.assertRaises(PoolTimeout):
+                pool.acquire()
+
+    def test_broken_idle_connection_is_replaced(self):
+        pool = ConnectionPool({}, size=1, ping_after=0)
+        with pool.connection() as first:
+            first.is_connected.return_value = False
+        with pool.connection() as second:
+            pass
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        self.assertEqual(pool.stats()['reconnects'], 1)
+
+    def test_open_transaction_rolled_back_on_release(self):
+        pool = ConnectionPool({}, size=1)
+        with pool.connection() as conn:
+            conn.in_transaction = True
+        conn.rollback.assert_called_once()
+
+    def test_error_discards_connection_that_cannot_roll_back(self):
+        pool = ConnectionPool({}, size=1)
+        with self.assertRaises(RuntimeError):
+            with pool.connection() as conn:
+                conn.rollback.side_effect = Exception("connection lost")
+                raise RuntimeError("query failed")
+        conn.close.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 0)
+        # The slot was released, so a new connection can be opened
+        with pool.connection() as replacement:
+            self.assertIsNot(conn, replacement)
+
+    def test_interrupt_still_releases_the_slot(self):
+        pool = ConnectionPool({}, size=1, timeout=0.05)
+        with self.assertRaises(KeyboardInterrupt):
+            with pool.connection() as conn:
+                raise KeyboardInterrupt
+        conn.rollback.assert_called_once()
+        self.assertEqual(pool.stats()['in_use'], 0)
+        with pool.connection() as again:
+            self.assertIs(again, conn)
+
+    def test_concurrent_use_never_exceeds_size(self):
+        pool = ConnectionPool({}, size=3)
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(50):
+                with pool.connection():
+                    with lock:
+                        peak.append(pool.stats()['in_use'])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertLessEqual(max(peak), 3)
+        self.assertLessEqual(self.mock_connect.call_count, 3)
+
+    def test_failed_connect_is_retried(self):
+        self.mock_connect.side_effect = [Exception("server starting"), Exception("server starting"), fake_connection()]
+        pool = ConnectionPool({}, size=1)
+        with patch('src.backend.db.time.sleep') as mock_sleep:
+            with pool.connection():
+                pass
+        self.assertEqual(self.mock_connect.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_prefill_opens_connections_without_holding_them(self):
+        pool = ConnectionPool({}, size=3)
+        pool.prefill()
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['idle'], stats['in_use']), (3, 3, 0))
+
+
+class TestConnectRetry(unittest.TestCase):
+    """Unit tests for the connect backoff"""
+
+    def test_delays_double_up_to_the_limit(self):
+        delays = backoff_delays(retries=5, backoff=1, limit=4)
+        for delay, base in zip(delays, [1, 2, 4, 4, 4]):
+            self.assertTrue(base / 2 <= delay <= base)
+
+    def test_last_error_is_raised(self):
+        connect = MagicMock(side_effect=ConnectionError("refused"))
+        sleep = MagicMock()
+        with self.assertRaises(ConnectionError):
+            connect_with_retry(connect, retries=2, sleep=sleep)
+        self.assertEqual(connect.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
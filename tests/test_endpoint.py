@@ -13,6 +13,7 @@ import json
 from unittest.mock import patch, Mock, MagicMock
 import pandas as pd
 from decimal import Decimal
+from datetime import date
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 import pytest
@@ -38,11 +39,21 @@ sys.path.insert(0, project_root)
 
 # Now import after mocking - this ensures the modules use our mocks
 import src.backend.calculate_health_score
+import src.backend.db
 from src.backend.main import app  # Replace 'your_api_module' with your actual API module name
+from src.backend.health_cache import health_cache
+from src.backend.calculate_health_score import COMPONENT_COLUMNS
+
+# Replace the database driver used by the connection pool with our mock, even
+# if src.backend.db was already imported by another test module
+src.backend.db.mysql = mysql_mock
+src.backend.db._pool = None
+
+
+def component_rows(*records):
+    """Rows of the health_components() query, which are read as tuples in COMPONENT_COLUMNS order"""
+    return [tuple(record.get(column) for column in COMPONENT_COLUMNS) for record in records]
 
-# Replace the module-level database objects with our mocks
-src.backend.calculate_health_score.conn = mock_conn
-src.backend.calculate_health_score.cursor = mock_cursor
 
 class TestAPIIntegration(unittest.TestCase):
     """Integration tests for API endpoints with mocked database"""
@@ -81,48 +92,26 @@ class TestAPIIntegration(unittest.TestCase):
             }
         ])
     
+        # customer_health aggregate behind the dashboard (scores 85.5, 67.2, 45.8)
+        cls.sample_summary_row = {
+            'customers': 3, 'average': 66.16666, 'minimum': 45.8, 'maximum': 85.5,
+            **{f'bucket_{i}': Decimal(1 if i in (4, 6, 8) else 0) for i in range(10)}
+        }
+
     def setUp(self):
         """Reset mocks before each test"""
         mock_cursor.reset_mock()
         mock_conn.reset_mock()
+        health_cache.clear()
         
         # Setup default mock responses for health score calculation
         self.setup_default_health_score_mocks()
     
     def setup_default_health_score_mocks(self):
         """Setup default mock responses for health score calculations"""
-        # Mock login_freq data
+        # Mock customer_health snapshot rows
         mock_cursor.fetchall.side_effect = [
-            # login_freq call
-            [
-                {'customer_id': 1, 'avg_logins_per_week': Decimal('15.0')},
-                {'customer_id': 2, 'avg_logins_per_week': Decimal('8.0')},
-                {'customer_id': 3, 'avg_logins_per_week': Decimal('3.0')}
-            ],
-            # features_used call
-            [
-                {'customer_id': 1, 'feature_adoption_score': Decimal('80.0')},
-                {'customer_id': 2, 'feature_adoption_score': Decimal('60.0')},
-                {'customer_id': 3, 'feature_adoption_score': Decimal('40.0')}
-            ],
-            # tickets call
-            [
-                {'customer_id': 1, 'open_tickets': 0},
-                {'customer_id': 2, 'open_tickets': 2},
-                {'customer_id': 3, 'open_tickets': 5}
-            ],
-            # invoice call
-            [
-                {'customer_id': 1, 'invoice_payment_score': Decimal('95.0')},
-                {'customer_id': 2, 'invoice_payment_score': Decimal('80.0')},
-                {'customer_id': 3, 'invoice_payment_score': Decimal('60.0')}
-            ],
-            # api_call call
-            [
-                {'customer_id': 1, 'avg_api_calls_per_week': Decimal('300.0')},
-                {'customer_id': 2, 'avg_api_calls_per_week': Decimal('150.0')},
-                {'customer_id': 3, 'avg_api_calls_per_week': Decimal('40.0')}
-            ]
+            self.sample_health_data.to_dict(orient='records')
         ]
 
     def test_list_customers_endpoint(self):
@@ -142,6 +131,9 @@ class TestAPIIntegration(unittest.TestCase):
 
     def test_customer_health_detail_endpoint_success(self):
         """Test GET /api/customers/{customer_id}/health endpoint with valid customer (HTML)"""
+        # Arrange - primary-key lookup returns just this customer
+        mock_cursor.fetchall.side_effect = [self.sample_health_data.iloc[[0]].to_dict(orient='records')]
+
         # Act
         response = self.client.get("/api/customers/1/health")
         
@@ -158,6 +150,9 @@ class TestAPIIntegration(unittest.TestCase):
 
     def test_customer_health_detail_endpoint_not_found(self):
         """Test GET /api/customers/{customer_id}/health endpoint with invalid customer"""
+        # Arrange - no snapshot row and the single-customer live query finds nothing
+        mock_cursor.fetchall.side_effect = [[], []]
+
         # Act
         response = self.client.get("/api/customers/5/health")
         
@@ -167,8 +162,59 @@ class TestAPIIntegration(unittest.TestCase):
         data = response.json()
         self.assertEqual(data['detail'], "Customer not found")
 
+    def test_customer_health_detail_snapshot_miss(self):
+        """Test that a customer missing from the snapshot is scored with a point query"""
+        # Arrange - empty snapshot lookup, then the live single-customer components
+        mock_cursor.fetchall.side_effect = [[], component_rows(
+            {'customer_id': 7, 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 0.0, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 300.0}
+        )]
+
+        # Act
+        response = self.client.get("/api/customers/7/health")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Overall Health Score", response.text)
+        components_query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("WHERE c.id IN (%s)", components_query)
+        self.assertEqual(params, (7,) * 6)
+
+    def test_customer_trend_endpoint(self):
+        """Test GET /api/customers/{customer_id}/trend returns column series"""
+        trend = {'day': ['2024-05-01'], 'login_score': [75], 'feature_score': [60], 'ticket_score': [100],
+                 'invoice_payment_score': [67], 'api_score': [25], 'health_score': [67.55]}
+
+        with patch('src.backend.main.read_health_trend', return_value=trend) as mock_trend:
+            response = self.client.get("/api/customers/7/trend?days=30")
+            self.client.get("/api/customers/7/trend?days=30")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['customer_id'], 7)
+        self.assertEqual(data['health_score'], [67.55])
+        # Second read is served from the cache
+        mock_trend.assert_called_once_with(7, 30)
+        self.assertEqual(self.client.get("/api/customers/7/trend?days=0").status_code, 422)
+
+    def test_customer_health_as_of_scores_live(self):
+        """Test that ?as_of= skips the snapshot and scores the customer at that date"""
+        mock_cursor.fetchall.side_effect = [component_rows(
+            {'customer_id': 7, 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 0.0, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 300.0}
+        )]
+
+        response = self.client.get("/api/customers/7/health?as_of=2024-05-31")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        components_query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("WHERE day > %s AND day <= %s AND customer_id IN (%s)", components_query)
+        self.assertEqual(params[:3], (date(2024, 2, 29), date(2024, 5, 31), 7))
+
     def test_add_login_event_endpoint(self):
         """Test POST /api/customers/{customer_id}/events endpoint with login event"""
+        mock_cursor.fetchall.side_effect = [[(1,)], []]  # the customers lock, then no components for the snapshot
         # Arrange
         event_data = {
             "type": "login",
@@ -193,8 +239,43 @@ class TestAPIIntegration(unittest.TestCase):
         )
         mock_conn.commit.assert_called()
 
+        # ...and the daily rollup read by the scoring queries was incremented
+        mock_cursor.execute.assert_any_call(
+            "INSERT INTO daily_logins (customer_id, day, logins) VALUES (%s, CURDATE(), %s) "
+            "ON DUPLICATE KEY UPDATE logins = logins + VALUES(logins)",
+            (1, 1)
+        )
+
+    def test_add_event_refreshes_health_snapshot(self):
+        """Test that an event recomputes the customer's snapshot row before commit"""
+        # Arrange - the customers lock, then components for customer 1 read inside the write transaction
+        mock_cursor.fetchall.side_effect = [[(1,)], component_rows(
+            {'customer_id': 1, 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 0.0, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 300.0}
+        )]
+
+        # Act
+        response = self.client.post("/api/customers/1/events", json={"type": "login", "details": {}})
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        # The customer is locked before the insert, so concurrent writers can't lose each other's refresh
+        self.assertEqual(mock_cursor.execute.call_args_list[0][0],
+                         ("SELECT id FROM customers WHERE id IN (%s) ORDER BY id FOR UPDATE", (1,)))
+        components_query, params = mock_cursor.execute.call_args_list[-1][0]
+        self.assertIn("WHERE c.id IN (%s)", components_query)
+        self.assertIn("AND customer_id IN (%s)", components_query)
+        self.assertEqual(params, (1,) * 6)
+
+        upsert_query, rows = mock_cursor.executemany.call_args[0]
+        self.assertIn("INSERT INTO customer_health", upsert_query)
+        self.assertEqual(rows[0][0], 1)
+        self.assertAlmostEqual(rows[0][-1], 75*0.25 + 80*0.25 + 100*0.2 + 95*0.15 + 75*0.15)
+        mock_conn.commit.assert_called_once()
+
     def test_add_feature_event_endpoint(self):
         """Test POST /api/customers/{customer_id}/events endpoint with feature event"""
+        mock_cursor.fetchall.side_effect = [[(1,)], []]  # the customers lock, then no components for the snapshot
         # Arrange
         event_data = {
             "type": "feature",
@@ -226,6 +307,7 @@ class TestAPIIntegration(unittest.TestCase):
 
     def test_add_ticket_event_endpoint(self):
         """Test POST /api/customers/{customer_id}/events endpoint with ticket event"""
+        mock_cursor.fetchall.side_effect = [[(1,)], []]  # the customers lock, then no components for the snapshot
         # Arrange
         event_data = {
             "type": "ticket",
@@ -257,6 +339,7 @@ class TestAPIIntegration(unittest.TestCase):
 
     def test_add_invoice_event_endpoint(self):
         """Test POST /api/customers/{customer_id}/events endpoint with invoice event"""
+        mock_cursor.fetchall.side_effect = [[(1,)], []]  # the customers lock, then no components for the snapshot
         # Arrange
         event_data = {
             "type": "invoice",
@@ -289,6 +372,7 @@ class TestAPIIntegration(unittest.TestCase):
 
     def test_add_api_event_endpoint(self):
         """Test POST /api/customers/{customer_id}/events endpoint with API event"""
+        mock_cursor.fetchall.side_effect = [[(1,)], []]  # the customers lock, then no components for the snapshot
         # Arrange
         event_data = {
             "type": "api",
@@ -356,8 +440,328 @@ class TestAPIIntegration(unittest.TestCase):
         html_content = response.text
         self.assertIn("Missing required fields: amount, due_date", html_content)
 
+    def test_add_event_rejects_string_count(self):
+        """Test that a counter sent as a string is refused rather than summed into the rollups"""
+        response = self.client.post("/api/customers/1/events",
+                                    json={"type": "api", "details": {"calls_count": "5"}})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("calls_count must be a non-negative integer", response.text)
+        mock_cursor.execute.assert_not_called()
+
+        batch = {"events": [
+            {"customer_id": 1, "type": "feature", "details": {"feature_name": "Export", "usage_count": "3"}},
+            {"customer_id": 1, "type": "api", "details": {"calls_count": -1}},
+        ]}
+        data = self.client.post("/api/events/batch", json=batch).json()
+        self.assertEqual((data['inserted'], data['failed']), (0, 2))
+        self.assertEqual([r['message'] for r in data['results']],
+                         ["usage_count must be a non-negative integer", "calls_count must be a non-negative integer"])
+        mock_conn.commit.assert_not_called()
+
+    def test_events_the_database_would_reject_are_refused_before_queueing(self):
+        """Test that ENUM values, dates, names and amounts are checked before a 202"""
+        queue = Mock()
+        with patch('src.backend.main.event_queue', queue):
+            response = self.client.post("/api/customers/1/events", json={"type": "ticket", "details": {"status": "weird"}})
+            data = self.client.post("/api/events/batch", json={"events": [
+                {"customer_id": 1, "type": "ticket", "details": {"priority": "urgent"}},
+                {"customer_id": 1, "type": "invoice", "details": {"amount": 10, "due_date": "31/05/2024"}},
+                {"customer_id": 1, "type": "invoice", "details": {"amount": 10, "due_date": "2024-06-01",
+                                                                  "paid_date": "2024-02-30"}},
+                {"customer_id": 1, "type": "invoice", "details": {"amount": "ten", "due_date": "2024-06-01"}},
+                {"customer_id": 1, "type": "feature", "details": {"feature_name": "x" * 51}},
+                {"customer_id": 1, "type": "api", "details": {"calls_count": 2**31}},
+            ]}).json()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status must be one of: open, closed, pending", response.text)
+        self.assertEqual([r['message'] for r in data['results']], [
+            "priority must be one of: low, medium, high",
+            "due_date must be a date (YYYY-MM-DD)",
+            "paid_date must be a date (YYYY-MM-DD)",
+            "amount must be a number below 100000000",
+            "feature_name must be a string of 1 to 50 characters",
+            "calls_count must be a non-negative integer",
+        ])
+        self.assertEqual(data['failed'], 6)
+        queue.enqueue.assert_not_called()
+
+    def test_add_events_batch_endpoint(self):
+        """Test POST /api/events/batch groups valid events into multi-row inserts"""
+        # Arrange - mixed customers and types, plus two invalid items; then
+        # the customer lookup, the customers lock and the snapshot components
+        mock_cursor.fetchall.side_effect = [[(1,), (2,), (3,)], [(1,), (2,), (3,)], []]
+        batch = {"events": [
+            {"customer_id": 1, "type": "login", "details": {}},
+            {"customer_id": 2, "type": "login"},
+            {"customer_id": 1, "type": "api", "details": {"calls_count": 20}},
+            {"customer_id": 3, "type": "feature", "details": {}},
+            {"customer_id": 3, "type": "unknown"},
+            {"customer_id": 2, "type": "api", "details": {"calls_count": 5}},
+        ]}
+
+        # Act
+        response = self.client.post("/api/events/batch", json=batch)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['inserted'], 4)
+        self.assertEqual(data['failed'], 2)
+        self.assertEqual([r['success'] for r in data['results']], [True, True, True, False, False, True])
+        self.assertEqual(data['results'][3]['message'], "Missing required fields: feature_name")
+        self.assertEqual(data['results'][4]['message'], "Unknown event type: unknown")
+
+        # One multi-row insert per target table, then the snapshot upsert
+        mock_cursor.executemany.assert_any_call(
+            "INSERT INTO logins (customer_id, login_date) VALUES (%s, NOW())",
+            [(1,), (2,)]
+        )
+        mock_cursor.executemany.assert_any_call(
+            "INSERT INTO api_usage (customer_id, calls_count, usage_date) VALUES (%s,%s,NOW())",
+            [(1, 20), (2, 5)]
+        )
+        components_query, params = mock_cursor.execute.call_args[0]
+        self.assertEqual(params, (1, 2) * 6)
+        mock_conn.commit.assert_called_once()
+
+    def test_add_events_batch_reports_unknown_customers_per_item(self):
+        """Test that an unknown customer_id fails only its own item instead of the whole batch"""
+        mock_cursor.fetchall.side_effect = [[(1,)], [(1,)], []]
+        batch = {"events": [
+            {"customer_id": 1, "type": "login", "details": {}},
+            {"customer_id": 999999, "type": "invoice", "details": {"amount": 10, "due_date": "2024-06-01"}},
+        ]}
+
+        response = self.client.post("/api/events/batch", json=batch)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['inserted'], data['failed']), (1, 1))
+        self.assertEqual(data['results'][1], {"index": 1, "customer_id": 999999, "type": "invoice", "success": False,
+                                              "message": "Unknown customer_id: 999999"})
+        lookup, params = mock_cursor.execute.call_args_list[0][0]
+        self.assertEqual((lookup, params), ("SELECT id FROM customers WHERE id IN (%s,%s)", (1, 999999)))
+        mock_cursor.execute.assert_any_call("INSERT INTO logins (customer_id, login_date) VALUES (%s, NOW())", (1,))
+        self.assertFalse(any("INSERT INTO invoices" in c[0][0] for c in mock_cursor.execute.call_args_list))
+        mock_conn.commit.assert_called_once()
+
+    def test_add_events_batch_requires_event_list(self):
+        """Test POST /api/events/batch rejects a body without an events list"""
+        response = self.client.post("/api/events/batch", json={"type": "login"})
+
+        self.assertEqual(response.status_code, 400)
+        mock_conn.commit.assert_not_called()
+
+    def test_add_event_for_unknown_customer_writes_nothing(self):
+        """Test that the inline path answers 404 instead of writing orphan event rows"""
+        mock_cursor.fetchall.side_effect = [[]]  # the customers lock finds no row
+
+        response = self.client.post("/api/customers/999/events", json={"type": "login", "details": {}})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("Unknown customer_id: 999", response.text)
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertIn("FOR UPDATE", mock_cursor.execute.call_args[0][0])
+        mock_conn.commit.assert_not_called()
+        mock_conn.rollback.assert_called()
+
+    def test_add_events_batch_skips_customer_deleted_after_lookup(self):
+        """Test that a customer missing at write time fails its items and the rest are written"""
+        mock_cursor.fetchall.side_effect = [[(1,), (2,)], [(1,)], [(1,)], []]
+        batch = {"events": [
+            {"customer_id": 1, "type": "login", "details": {}},
+            {"customer_id": 2, "type": "login", "details": {}},
+        ]}
+
+        data = self.client.post("/api/events/batch", json=batch).json()
+
+        self.assertEqual((data['inserted'], data['failed']), (1, 1))
+        self.assertEqual(data['results'][1]['message'], "Unknown customer_id: 2")
+        mock_conn.commit.assert_called_once()
+
+    def test_add_event_write_behind_queue(self):
+        """Test that events are acknowledged with 202 and enqueued when write-behind is enabled"""
+        queue = Mock()
+        mock_cursor.fetchall.side_effect = [[(1,)], [(2,)]]  # each request's customer lookup
+        with patch('src.backend.main.event_queue', queue):
+            response = self.client.post("/api/customers/1/events", json={"type": "login", "details": {}})
+            batch_response = self.client.post("/api/events/batch", json={"events": [
+                {"customer_id": 2, "type": "api", "details": {"calls_count": 3}}
+            ]})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn("Event queued for processing.", response.text)
+        self.assertEqual(batch_response.status_code, 202)
+        self.assertTrue(batch_response.json()['queued'])
+        queue.enqueue.assert_any_call([(1, "login", {})])
+        queue.enqueue.assert_any_call([(2, "api", {"calls_count": 3})])
+        mock_conn.commit.assert_not_called()
+
+    def test_write_behind_rejects_unknown_customer_before_enqueue(self):
+        """Test that a queued event for a missing customer is refused instead of dropped at flush time"""
+        queue = Mock()
+        mock_cursor.fetchall.side_effect = [[]]
+        with patch('src.backend.main.event_queue', queue):
+            response = self.client.post("/api/customers/999999/events", json={"type": "login", "details": {}})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("Unknown customer_id: 999999", response.text)
+        mock_cursor.execute.assert_called_once_with("SELECT id FROM customers WHERE id IN (%s)", (999999,))
+        queue.enqueue.assert_not_called()
+
+    def test_read_endpoints_served_from_cache(self):
+        """Test that repeated reads hit the cache until an event is written"""
+        # Act - first request populates the cache, second is served from memory
+        mock_cursor.fetchall.side_effect = [[self.sample_summary_row]]
+        first = self.client.get("/api/dashboard")
+        second = self.client.get("/api/dashboard")
+
+        # Assert
+        self.assertEqual(first.text, second.text)
+        self.assertEqual(mock_cursor.fetchall.call_count, 1)
+        self.assertEqual(health_cache.stats()['hits'], 1)
+
+        # An event write bumps the watermark and the next read goes to the DB
+        mock_cursor.fetchall.side_effect = [[(1,)], [], [self.sample_summary_row]]
+        self.client.post("/api/customers/1/events", json={"type": "login", "details": {}})
+        self.client.get("/api/dashboard")
+        self.assertEqual(mock_cursor.fetchall.call_count, 4)
+
+    def test_conditional_get_returns_304_without_query_or_render(self):
+        """Test If-None-Match with the current ETag skips the database and the template"""
+        first = self.client.get("/api/customers")
+        etag = first.headers["ETag"]
+        self.assertEqual(first.headers["Cache-Control"], "no-cache")
+
+        health_cache.clear()
+        mock_cursor.fetchall.reset_mock()
+        with patch.object(src.backend.main.templates, 'TemplateResponse') as mock_render:
+            response = self.client.get("/api/customers", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        mock_cursor.fetchall.assert_not_called()
+        mock_render.assert_not_called()
+
+        # A stale tag gets the full page
+        mock_cursor.fetchall.side_effect = [self.sample_health_data.to_dict(orient='records')]
+        self.assertEqual(self.client.get("/api/customers", headers={"If-None-Match": 'W/"old"'}).status_code, 200)
+
+    def test_customer_etag_differs_per_as_of(self):
+        """Test that the current and as_of views of one customer never share an ETag"""
+        mock_cursor.fetchall.side_effect = [self.sample_health_data.iloc[[0]].to_dict(orient='records')]
+        current_tag = self.client.get("/api/customers/1/health").headers["ETag"]
+
+        with patch('src.backend.main.get_health_details', return_value=self.sample_health_data.iloc[[0]]):
+            past = self.client.get("/api/customers/1/health?as_of=2024-03-31",
+                                   headers={"If-None-Match": current_tag})
+            other_past = self.client.get("/api/customers/1/health?as_of=2024-02-29")
+
+        self.assertEqual(past.status_code, 200)
+        self.assertNotEqual(past.headers["ETag"], current_tag)
+        self.assertNotEqual(past.headers["ETag"], other_past.headers["ETag"])
+        self.assertEqual(self.client.get("/api/customers/1/health?as_of=2024-03-31",
+                                         headers={"If-None-Match": past.headers["ETag"]}).status_code, 304)
+
+    def test_customer_etag_changes_only_with_that_customers_events(self):
+        """Test the detail view's ETag survives writes to other customers"""
+        mock_cursor.fetchall.side_effect = [self.sample_health_data.iloc[[0]].to_dict(orient='records'),
+                                            self.sample_health_data.to_dict(orient='records')]
+        detail_tag = self.client.get("/api/customers/1/health").headers["ETag"]
+        list_tag = self.client.get("/api/customers").headers["ETag"]
+
+        mock_cursor.fetchall.side_effect = [[(2,)], []]
+        self.client.post("/api/customers/2/events", json={"type": "login", "details": {}})
+
+        self.assertEqual(self.client.get("/api/customers/1/health",
+                                         headers={"If-None-Match": detail_tag}).status_code, 304)
+        self.assertNotEqual(health_cache.etag(), list_tag)
+
+        mock_cursor.fetchall.side_effect = [[(1,)], [], self.sample_health_data.iloc[[0]].to_dict(orient='records')]
+        self.client.post("/api/customers/1/events", json={"type": "login", "details": {}})
+        self.assertEqual(self.client.get("/api/customers/1/health",
+                                         headers={"If-None-Match": detail_tag}).status_code, 200)
+
+    def test_cache_stats_endpoint(self):
+        """Test GET /api/cache/stats exposes hit/miss counters"""
+        self.client.get("/api/customers")
+        self.client.get("/api/customers")
+
+        response = self.client.get("/api/cache/stats")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['hits'], 1)
+        self.assertEqual(data['misses'], 1)
+
+    def test_metrics_endpoint(self):
+        """Test GET /metrics exposes route, template, query and pool metrics"""
+        mock_cursor.fetchall.side_effect = [[self.sample_summary_row]]
+        self.client.get("/api/dashboard")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain; version=0.0.4", response.headers["content-type"])
+        text = response.text
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/api/dashboard",status="200"}', text)
+        self.assertIn('template_render_duration_seconds_bucket{template="dashboard.html",le="+Inf"}', text)
+        self.assertIn('health_query_rows_count{function="other"}', text)
+        self.assertIn('db_pool_connections{state="size"}', text)
+
+    def test_traced_request_returns_server_timing(self):
+        """Test X-Trace with the configured secret returns the query and render breakdown in Server-Timing"""
+        mock_cursor.fetchall.side_effect = [[self.sample_summary_row]]
+
+        with patch('src.backend.tracing.TRACE_HEADER_SECRET', "s3cret"), \
+                self.assertLogs("customer_health.trace", level="INFO") as logs:
+            response = self.client.get("/api/dashboard", headers={"X-Trace": "s3cret"})
+            guessed = self.client.get("/api/dashboard", headers={"X-Trace": "1"})
+
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers["Server-Timing"]
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn('render_dashboard_html;dur=', timing)
+        logged = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logged["path"], "/api/dashboard")
+        self.assertEqual(logged["queries"][0]["rows"], 1)
+        self.assertTrue(logged["queries"][0]["sql"].startswith("SELECT COUNT(*) AS customers"))
+        self.assertEqual(len(logs.records), 1)
+        self.assertNotIn("Server-Timing", guessed.headers)
+
+        # Untraced requests carry no breakdown
+        mock_cursor.fetchall.side_effect = [[self.sample_summary_row]]
+        health_cache.clear()
+        self.assertNotIn("Server-Timing", self.client.get("/api/dashboard").headers)
+
+    def test_liveness_and_readiness_endpoints(self):
+        """Test /healthz is always up and /readyz waits for warm-up and the database"""
+        self.assertEqual(self.client.get("/healthz").json(), {"status": "ok"})
+
+        # The lifespan (and so the warm-up) hasn't run under this client
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "starting")
+        mock_cursor.execute.assert_not_called()
+
+        with patch('src.backend.main.warmup', None):
+            response = self.client.get("/readyz")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["database"], True)
+
+            mock_cursor.execute.side_effect = Exception("database down")
+            try:
+                self.assertEqual(self.client.get("/readyz").status_code, 503)
+            finally:
+                mock_cursor.execute.side_effect = None
+
     def test_dashboard_endpoint(self):
-        """Test GET /api/dashboard endpoint"""
+        """Test GET /api/dashboard renders the server-side histogram"""
+        mock_cursor.fetchall.side_effect = [[self.sample_summary_row]]
+
         # Act
         response = self.client.get("/api/dashboard")
         
@@ -365,12 +769,105 @@ class TestAPIIntegration(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("text/html", response.headers["content-type"])
         
-        # Verify HTML content contains customer data
+        # Only the bucket counts and headline figures are embedded
         html_content = response.text
-        self.assertIn("1", html_content)  # Customer IDs should be in template
-        self.assertIn("2", html_content)
-        self.assertIn("3", html_content)
+        self.assertIn("[0, 0, 0, 0, 1, 0, 1, 0, 1, 0]", html_content)
+        self.assertIn("66.2", html_content)
+        self.assertNotIn("login_score", html_content)
+        query = mock_cursor.execute.call_args[0][0]
+        self.assertIn("SUM(LEAST(FLOOR(health_score / 10), 9) = 9) AS bucket_9", query)
 
+    def test_customers_json_pages_by_keyset(self):
+        """Test GET /api/customers.json walks the snapshot in keyset pages"""
+        rows = self.sample_health_data[['customer_id', 'health_score']].to_dict(orient='records')
+        mock_cursor.fetchall.side_effect = [rows, rows[2:]]
+
+        # Act - page size 2 with 3 customers: one more row is read to detect the end
+        first = self.client.get("/api/customers.json?limit=2")
+        query, params = mock_cursor.execute.call_args[0]
+
+        # Assert
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["content-type"], "application/json")
+        page = first.json()
+        self.assertEqual([c['customer_id'] for c in page['items']], [1, 2])
+        self.assertEqual(set(page['items'][0]), {'customer_id', 'health_score'})
+        self.assertEqual(query, "SELECT customer_id, health_score FROM customer_health "
+                                "ORDER BY customer_id ASC LIMIT %s")
+        self.assertEqual(params, (3,))
+
+        second = self.client.get("/api/customers.json", params={"limit": 2, "cursor": page['next']})
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertEqual([c['customer_id'] for c in second.json()['items']], [3])
+        self.assertIsNone(second.json()['next'])
+        self.assertIn("WHERE customer_id > %s", query)
+        self.assertEqual(params, (2, 3))
+
+    def test_dashboard_json_sorted_by_score_with_projection(self):
+        """Test GET /api/dashboard.json keyset pagination on health_score"""
+        rows = [{'customer_id': 3, 'health_score': 45.8, 'api_score': 25},
+                {'customer_id': 2, 'health_score': 67.2, 'api_score': 50}]
+        mock_cursor.fetchall.side_effect = [rows, []]
+
+        first = self.client.get("/api/dashboard.json?sort=health_score&fields=api_score&limit=1")
+        self.assertEqual(first.json()['items'], [{'api_score': 25}])
+        cursor = first.json()['next']
+        self.client.get("/api/dashboard.json", params={"sort": "health_score", "fields": "api_score",
+                                                       "limit": 1, "cursor": cursor})
+        query, params = mock_cursor.execute.call_args[0]
+
+        # The sort keys are selected but not returned; the cursor resumes after (45.8, 3)
+        self.assertIn("SELECT customer_id, api_score, health_score FROM customer_health", query)
+        self.assertIn("WHERE health_score > %s OR (health_score = %s AND customer_id > %s)", query)
+        self.assertIn("ORDER BY health_score ASC, customer_id ASC", query)
+        self.assertEqual(params, (45.8, 45.8, 3, 2))
+
+    def test_json_pages_reject_bad_parameters(self):
+        """Test that unknown fields, sorts and cursors are rejected"""
+        self.assertEqual(self.client.get("/api/customers.json?fields=password").status_code, 400)
+        self.assertEqual(self.client.get("/api/customers.json?sort=name").status_code, 400)
+        self.assertEqual(self.client.get("/api/customers.json?cursor=garbage").status_code, 400)
+        self.assertEqual(self.client.get("/api/customers.json?limit=100000").status_code, 422)
+        # A cursor from one sort order is not valid for another
+        self.assertEqual(self.client.get("/api/customers.json", params={
+            "sort": "-health_score", "cursor": "WyJjdXN0b21lcl9pZCIsIDJd"}).status_code, 400)
+
+    def test_export_health_streams_chunks(self):
+        """Test GET /api/export/health streams NDJSON and CSV chunk by chunk"""
+        chunks = [self.sample_health_data.iloc[:2], self.sample_health_data.iloc[2:]]
+
+        with patch('src.backend.main.iter_health_details', side_effect=lambda size, as_of: iter(chunks)) as mock_iter:
+            ndjson = self.client.get("/api/export/health?chunk_size=2")
+            csv = self.client.get("/api/export/health?format=csv&as_of=2024-03-31")
+
+        self.assertEqual(ndjson.status_code, 200)
+        self.assertIn("application/x-ndjson", ndjson.headers["content-type"])
+        lines = [json.loads(line) for line in ndjson.text.splitlines()]
+        self.assertEqual([line['customer_id'] for line in lines], [1, 2, 3])
+        self.assertEqual(lines[0]['health_score'], 85.5)
+        mock_iter.assert_any_call(2, None)
+        mock_iter.assert_any_call(1000, date(2024, 3, 31))
+
+        self.assertIn("text/csv", csv.headers["content-type"])
+        rows = csv.text.splitlines()
+        # One header, then every customer in the header's column order
+        self.assertEqual(rows[0].split(',')[0], 'customer_id')
+        self.assertEqual(rows[1].split(',')[0], '1')
+        self.assertEqual(rows[1].split(',')[-1], '85.5')
+        self.assertEqual(len(rows), 4)
+
+    def test_empty_csv_export_still_has_header(self):
+        """Test that a CSV export with no customers is the header line alone"""
+        with patch('src.backend.main.iter_health_details', side_effect=lambda size, as_of: iter([])):
+            response = self.client.get("/api/export/health?format=csv")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, "customer_id,login_score,feature_score,ticket_score,"
+                                        "invoice_payment_score,api_score,health_score\n")
+
+    def test_export_health_rejects_unknown_format(self):
+        """Test that the export only offers NDJSON and CSV"""
+        self.assertEqual(self.client.get("/api/export/health?format=xml").status_code, 400)
 
 
 class TestAPIEndpointsEdgeCases(unittest.TestCase):
@@ -384,9 +881,10 @@ class TestAPIEndpointsEdgeCases(unittest.TestCase):
         """Reset mocks and setup for each test"""
         mock_cursor.reset_mock()
         mock_conn.reset_mock()
+        health_cache.clear()
         
         # Setup empty health data scenario
-        mock_cursor.fetchall.side_effect = [[], [], [], [], []]  # Empty results for all queries
+        mock_cursor.fetchall.side_effect = [[]]  # Empty result for the consolidated query
     
     def test_list_customers_empty_database(self):
         """Test GET /api/customers when database is empty"""
@@ -403,6 +901,16 @@ class TestAPIEndpointsEdgeCases(unittest.TestCase):
         self.assertIn("<tbody>", html_content)
         self.assertNotIn("<td>", html_content) 
 
+    def test_dashboard_empty_database(self):
+        """Test GET /api/dashboard with no customers"""
+        mock_cursor.fetchall.side_effect = [[{'customers': 0, 'average': None, 'minimum': None, 'maximum': None,
+                                               **{f'bucket_{i}': None for i in range(10)}}]]
+
+        response = self.client.get("/api/dashboard")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("[0, 0, 0, 0, 0, 0, 0, 0, 0, 0]", response.text)
+
     def test_add_event_with_malformed_json(self):
         """Test POST /api/customers/{customer_id}/events with malformed JSON"""
         # Act
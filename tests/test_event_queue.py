@@ -0,0 +1,137 @@
+# test_event_queue.py
+import unittest
+import asyncio
+import sys
+import os
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.event_queue import EventQueue, QueueFull, QueueClosed
+
+
+class RecordingWriter:
+    """Stand-in for events.write_events that records each flushed batch"""
+
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+        self.lock = threading.Lock()
+
+    def __call__(self, events):
+        with self.lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("database unavailable")
+            self.batches.append(list(events))
+
+
+def event(i):
+    return (i, "login", {})
+
+
+class TestEventQueue(unittest.TestCase):
+    """Unit tests for the write-behind event queue"""
+
+    def test_flush_when_batch_size_reached(self):
+        writer = RecordingWriter()
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=100, flush_ms=10_000, flush_events=3)
+            await queue.start()
+            queue.enqueue([event(i) for i in range(3)])
+            await asyncio.sleep(0.05)
+            self.assertEqual(writer.batches, [[event(0), event(1), event(2)]])
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_flush_after_interval(self):
+        writer = RecordingWriter()
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=100, flush_ms=20, flush_events=100)
+            await queue.start()
+            queue.enqueue([event(1)])
+            await asyncio.sleep(0.1)
+            self.assertEqual(writer.batches, [[event(1)]])
+            self.assertEqual(queue.stats()['flushes'], 1)
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_capacity_is_bounded(self):
+        writer = RecordingWriter()
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=2, flush_ms=10_000, flush_events=100)
+            await queue.start()
+            queue.enqueue([event(1), event(2)])
+            with self.assertRaises(QueueFull):
+                queue.enqueue([event(3)])
+            self.assertEqual(queue.stats()['rejected'], 1)
+            self.assertEqual(queue.stats()['depth'], 2)
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_stop_drains_queue(self):
+        writer = RecordingWriter()
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=100, flush_ms=10_000, flush_events=100)
+            await queue.start()
+            queue.enqueue([event(i) for i in range(5)])
+            await queue.stop()
+            with self.assertRaises(QueueClosed):
+                queue.enqueue([event(6)])
+            return queue
+
+        queue = asyncio.run(scenario())
+        self.assertEqual(sum(len(b) for b in writer.batches), 5)
+        self.assertEqual(queue.stats()['depth'], 0)
+        self.assertEqual(queue.stats()['flushed'], 5)
+
+    def test_failed_flush_is_retried(self):
+        writer = RecordingWriter(fail_times=1)
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=100, flush_ms=5, flush_events=100)
+            await queue.start()
+            queue.enqueue([event(1)])
+            await queue.stop()
+            return queue
+
+        queue = asyncio.run(scenario())
+        self.assertEqual(writer.batches, [[event(1)]])
+        self.assertEqual(queue.stats()['failed_flushes'], 1)
+        self.assertEqual(queue.stats()['dropped'], 0)
+
+    def test_failing_batch_is_split_to_drop_only_the_bad_event(self):
+        bad = (99, "login", {})
+
+        def writer(events):
+            if bad in events:
+                raise RuntimeError("foreign key constraint fails")
+            written.extend(events)
+
+        written = []
+
+        async def scenario():
+            queue = EventQueue(writer, capacity=100, flush_ms=1, flush_events=100, max_attempts=2)
+            await queue.start()
+            queue.enqueue([event(1), event(2), bad, event(3)])
+            await queue.stop()
+            return queue
+
+        with self.assertLogs("customer_health.event_queue", level="ERROR") as logs:
+            queue = asyncio.run(scenario())
+        self.assertEqual(sorted(written), [event(1), event(2), event(3)])
+        self.assertEqual(queue.stats()['dropped'], 1)
+        self.assertEqual(queue.stats()['flushed'], 3)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(repr(bad), logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+# test_explain_queries.py
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.explain_queries import capture_queries, full_scans
+
+
+class TestExplainQueries(unittest.TestCase):
+    """Tests for the query-plan verification tool (no database needed)"""
+
+    def test_captures_every_scoring_query(self):
+        captured = capture_queries(7)
+        labels = [label for label, _, _, _ in captured]
+
+        self.assertEqual(len(captured), 12)
+        self.assertIn('login_freq()', labels)
+        self.assertIn('health_components(customer_ids=[7])', labels)
+        for label, point_query, query, params in captured:
+            if point_query:
+                self.assertIn(7, params, label)
+            else:
+                self.assertEqual(params, (), label)
+
+    def test_population_query_may_only_scan_customers(self):
+        plan = [
+            {'table': 'c', 'type': 'ALL'},
+            {'table': '<derived2>', 'type': 'ALL'},
+            {'table': 'logins', 'type': 'index'},
+            {'table': 'api_usage', 'type': 'ALL'},
+        ]
+        flagged = full_scans(plan, point_query=False)
+        self.assertEqual([row['table'] for row in flagged], ['api_usage'])
+
+    def test_point_query_must_use_an_index_lookup(self):
+        plan = [
+            {'table': 'c', 'type': 'const'},
+            {'table': 'logins', 'type': 'ref'},
+            {'table': 'feature_usage', 'type': 'index'},
+        ]
+        flagged = full_scans(plan, point_query=True)
+        self.assertEqual([row['table'] for row in flagged], ['feature_usage'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
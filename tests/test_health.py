@@ -1,19 +1,33 @@
 # test_health_scores.py
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, call
+import numpy as np
 import pandas as pd
 import sys
 import os
+import threading
 import mysql.connector
 from decimal import Decimal
 
 # Add the parent directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-with patch('mysql.connector.connect'), patch('src.backend.calculate_health_score.cursor') as mock_cursor_patch:
+with patch('mysql.connector.connect'):
     # Import after patching to ensure the mock is in place
     import src.backend.calculate_health_score
-    from src.backend.calculate_health_score import login_freq, features_used, tickets, invoice, api_call, get_health_scores
+    from src.backend.calculate_health_score import login_freq, features_used, tickets, invoice, api_call, get_health_scores, get_health_details, iter_health_details, months_before, health_components
+    from src.backend.calculate_health_score import ComponentQueryError, run_concurrently
+from datetime import date
+
+
+def pooled_cursor_mock():
+    """
+    Mock for src.backend.db.cursor: `with db.cursor(...) as cur` yields the
+    mock itself, so tests configure fetchall/execute on the patched object.
+    """
+    mock_cursor = MagicMock()
+    mock_cursor.return_value.__enter__.return_value = mock_cursor
+    return mock_cursor
 
 
 class TestHealthScoreCalculation(unittest.TestCase):
@@ -26,7 +40,7 @@ class TestHealthScoreCalculation(unittest.TestCase):
         self.mock_cursor = Mock()
         self.mock_cursor.fetchall = Mock()
         
-    @patch('src.backend.calculate_health_score.cursor')
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
     def test_login_freq_calculation(self, mock_cursor):
         """Test login frequency calculation with mock data"""
         # Arrange
@@ -44,9 +58,9 @@ class TestHealthScoreCalculation(unittest.TestCase):
         expected_query = """
     SELECT
         customer_id,
-        COUNT(*) / 12 AS avg_logins_per_week
-    FROM logins
-    WHERE login_date >= NOW() - INTERVAL 3 MONTH
+        SUM(logins) / 12 AS avg_logins_per_week
+    FROM daily_logins
+    WHERE day >= NOW() - INTERVAL 3 MONTH
     GROUP BY customer_id
     """
         mock_cursor.execute.assert_called_once_with(expected_query)
@@ -54,7 +68,7 @@ class TestHealthScoreCalculation(unittest.TestCase):
         self.assertEqual(result.iloc[0]['customer_id'], 'cust-001')
         self.assertEqual(float(result.iloc[0]['avg_logins_per_week']), 15.5)
     
-    @patch('src.backend.calculate_health_score.cursor')
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
     def test_features_used_calculation(self, mock_cursor):
         """Test feature adoption score calculation with mock data"""
         # Arrange
@@ -73,14 +87,14 @@ class TestHealthScoreCalculation(unittest.TestCase):
     SELECT
         customer_id,
         COUNT(DISTINCT feature_name) / 5.0 * 100 AS feature_adoption_score
-    FROM feature_usage
+    FROM daily_feature_usage
     GROUP BY customer_id
     """
         mock_cursor.execute.assert_called_once_with(expected_query)
         self.assertEqual(len(result), 3)
         self.assertEqual(float(result.iloc[0]['feature_adoption_score']), 80.0)
     
-    @patch('src.backend.calculate_health_score.cursor')
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
     def test_tickets_calculation(self, mock_cursor):
         """Test support tickets score calculation with mock data"""
         # Arrange
@@ -98,10 +112,10 @@ class TestHealthScoreCalculation(unittest.TestCase):
         expected_query = """
     SELECT
         customer_id,
-        COUNT(*) AS open_tickets
-    FROM support_tickets
+        SUM(tickets) AS open_tickets
+    FROM daily_tickets
     WHERE status IN ('open','pending')
-    AND created_at >= NOW() - INTERVAL 3 MONTH
+    AND day >= NOW() - INTERVAL 3 MONTH
     GROUP BY customer_id
     """
         mock_cursor.execute.assert_called_once_with(expected_query)
@@ -112,7 +126,7 @@ class TestHealthScoreCalculation(unittest.TestCase):
         self.assertEqual(result.iloc[1]['ticket_score'], 75)   # 2 tickets = 75 score
         self.assertEqual(result.iloc[2]['ticket_score'], 25)   # 6 tickets = 25 score
     
-    @patch('src.backend.calculate_health_score.cursor')
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
     def test_invoice_calculation(self, mock_cursor):
         """Test invoice payment score calculation with mock data"""
         # Arrange
@@ -138,7 +152,7 @@ class TestHealthScoreCalculation(unittest.TestCase):
         self.assertEqual(len(result), 3)
         self.assertEqual(float(result.iloc[0]['invoice_payment_score']), 95.0)
     
-    @patch('src.backend.calculate_health_score.cursor')
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
     def test_api_call_calculation(self, mock_cursor):
         """Test API usage score calculation with mock data"""
         # Arrange
@@ -157,8 +171,8 @@ class TestHealthScoreCalculation(unittest.TestCase):
     SELECT
         customer_id,
         SUM(calls_count) / 12 AS avg_api_calls_per_week
-    FROM api_usage
-    WHERE usage_date >= NOW() - INTERVAL 3 MONTH
+    FROM daily_api_usage
+    WHERE day >= NOW() - INTERVAL 3 MONTH
     GROUP BY customer_id
     """
         mock_cursor.execute.assert_called_once_with(expected_query)
@@ -169,13 +183,75 @@ class TestHealthScoreCalculation(unittest.TestCase):
         self.assertEqual(result.iloc[1]['api_score'], 75)   # 250 calls = 75 score
         self.assertEqual(result.iloc[2]['api_score'], 25)   # 30 calls = 25 score
 
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_component_queries_push_customer_filter(self, mock_cursor):
+        """Test that a customer-id filter is pushed into each component query"""
+        mock_cursor.fetchall.return_value = []
+
+        login_freq([1, 2])
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("INTERVAL 3 MONTH AND customer_id IN (%s,%s)", query)
+        self.assertEqual(params, (1, 2))
+
+        invoice([3])
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("FROM invoices WHERE customer_id IN (%s)", query)
+        self.assertEqual(params, (3,))
+
+        # An empty id set matches no rows
+        features_used([])
+        self.assertIn("WHERE customer_id IN (NULL)", mock_cursor.execute.call_args[0][0])
+
+    def test_months_before_clamps_like_mysql(self):
+        """Test the window start matches MySQL's INTERVAL 3 MONTH"""
+        self.assertEqual(months_before(date(2024, 5, 31)), date(2024, 2, 29))
+        self.assertEqual(months_before(date(2024, 2, 15)), date(2023, 11, 15))
+        self.assertEqual(months_before(date(2023, 3, 31), 1), date(2023, 2, 28))
+
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_component_queries_as_of(self, mock_cursor):
+        """Test that as_of replaces NOW() with an explicit window"""
+        mock_cursor.fetchall.return_value = []
+        as_of = date(2024, 5, 31)
+
+        login_freq([1], as_of)
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("WHERE day > %s AND day <= %s AND customer_id IN (%s)", query)
+        self.assertNotIn("NOW()", query)
+        self.assertEqual(params, (date(2024, 2, 29), as_of, 1))
+
+        # Feature adoption stays lifetime, up to as_of
+        features_used(as_of=as_of)
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("FROM daily_feature_usage WHERE day <= %s", query)
+        self.assertEqual(params, (as_of,))
+
+        # Only invoices already due by as_of count
+        invoice([3], as_of)
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn("FROM invoices WHERE due_date <= %s AND customer_id IN (%s)", query)
+        self.assertEqual(params, (as_of, 3))
+
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_health_components_as_of_params(self, mock_cursor):
+        """Test the consolidated query binds the as_of window in placeholder order"""
+        mock_cursor.fetchall.return_value = []
+        as_of = date(2024, 5, 31)
+        start = date(2024, 2, 29)
+
+        health_components([4], as_of=as_of)
+
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertEqual(query.count("%s"), len(params))
+        self.assertEqual(params, (start, as_of, 4, as_of, 4, start, as_of, 4, as_of, 4, start, as_of, 4, 4))
+
     def test_ticket_score_function_edge_cases(self):
         """Test edge cases for ticket scoring function"""
         # Import the function directly to test it
         from src.backend.calculate_health_score import tickets
         
         # Mock the cursor to return edge case data
-        with patch('src.backend.calculate_health_score.cursor') as mock_cursor:
+        with patch('src.backend.db.cursor', new_callable=pooled_cursor_mock) as mock_cursor:
             # Test boundary conditions
             test_cases = [
                 ({'customer_id': 'test', 'open_tickets': 0}, 100),
@@ -197,7 +273,7 @@ class TestHealthScoreCalculation(unittest.TestCase):
         """Test edge cases for API scoring function"""
         from src.backend.calculate_health_score import api_call
         
-        with patch('src.backend.calculate_health_score.cursor') as mock_cursor:
+        with patch('src.backend.db.cursor', new_callable=pooled_cursor_mock) as mock_cursor:
             # Test boundary conditions
             test_cases = [
                 ({'customer_id': 'test', 'avg_api_calls_per_week': Decimal('500.0')}, 100),
@@ -246,42 +322,17 @@ class TestHealthScoreCalculation(unittest.TestCase):
 class TestIntegratedHealthScoreCalculation(unittest.TestCase):
     """Integration tests for the complete health score calculation"""
     
-    @patch('src.backend.calculate_health_score.api_call')
-    @patch('src.backend.calculate_health_score.invoice')
-    @patch('src.backend.calculate_health_score.tickets')
-    @patch('src.backend.calculate_health_score.features_used')
-    @patch('src.backend.calculate_health_score.login_freq')
-    def test_get_health_scores_integration(self, mock_login, mock_features, mock_tickets, mock_invoice, mock_api):
+    @patch('src.backend.calculate_health_score.health_components')
+    def test_get_health_scores_integration(self, mock_components):
         """Test the complete health score calculation with mocked components"""
-        # Arrange - Mock all component functions
-        mock_login.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'avg_logins_per_week': 15.0},
-            {'customer_id': 'cust-002', 'avg_logins_per_week': 5.0},
-            {'customer_id': 'cust-003', 'avg_logins_per_week': 0.5}
-        ])
-        
-        mock_features.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'feature_adoption_score': 80.0},
-            {'customer_id': 'cust-002', 'feature_adoption_score': 60.0},
-            {'customer_id': 'cust-003', 'feature_adoption_score': 20.0}
-        ])
-        
-        mock_tickets.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'open_tickets': 1, 'ticket_score': 75},
-            {'customer_id': 'cust-002', 'open_tickets': 3, 'ticket_score': 50},
-            {'customer_id': 'cust-003', 'open_tickets': 8, 'ticket_score': 25}
-        ])
-        
-        mock_invoice.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'invoice_payment_score': 95.0},
-            {'customer_id': 'cust-002', 'invoice_payment_score': 75.0},
-            {'customer_id': 'cust-003', 'invoice_payment_score': 50.0}
-        ])
-        
-        mock_api.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'avg_api_calls_per_week': 450.0, 'api_score': 100},
-            {'customer_id': 'cust-002', 'avg_api_calls_per_week': 250.0, 'api_score': 75},
-            {'customer_id': 'cust-003', 'avg_api_calls_per_week': 30.0, 'api_score': 25}
+        # Arrange - Mock the consolidated component query
+        mock_components.return_value = pd.DataFrame([
+            {'customer_id': 'cust-001', 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 1, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 450.0},
+            {'customer_id': 'cust-002', 'avg_logins_per_week': 5.0, 'feature_adoption_score': 60.0,
+             'open_tickets': 3, 'invoice_payment_score': 75.0, 'avg_api_calls_per_week': 250.0},
+            {'customer_id': 'cust-003', 'avg_logins_per_week': 0.5, 'feature_adoption_score': 20.0,
+             'open_tickets': 8, 'invoice_payment_score': 50.0, 'avg_api_calls_per_week': 30.0}
         ])
         
         # Act
@@ -303,48 +354,24 @@ class TestIntegratedHealthScoreCalculation(unittest.TestCase):
         for score in result['health_score']:
             self.assertTrue(0 <= score <= 100, f"Health score {score} is out of range")
     
-    @patch('src.backend.calculate_health_score.api_call')
-    @patch('src.backend.calculate_health_score.invoice')
-    @patch('src.backend.calculate_health_score.tickets')
-    @patch('src.backend.calculate_health_score.features_used')
-    @patch('src.backend.calculate_health_score.login_freq')
-    def test_get_health_scores_with_missing_data(self, mock_login, mock_features, mock_tickets, mock_invoice, mock_api):
+    @patch('src.backend.calculate_health_score.health_components')
+    def test_get_health_scores_with_missing_data(self, mock_components):
         """Test health score calculation with missing data for some customers"""
-        # Arrange - Mock functions with missing data for some customers
-        mock_login.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'avg_logins_per_week': 15.0},
-            {'customer_id': 'cust-002', 'avg_logins_per_week': 5.0}
-            # cust-003 missing
-        ])
-        
-        mock_features.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'feature_adoption_score': 80.0},
-            # cust-002 and cust-003 missing
-        ])
-        
-        mock_tickets.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'open_tickets': 1, 'ticket_score': 75},
-            {'customer_id': 'cust-003', 'open_tickets': 8, 'ticket_score': 25}
-            # cust-002 missing
-        ])
-        
-        mock_invoice.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'invoice_payment_score': 95.0},
-            {'customer_id': 'cust-002', 'invoice_payment_score': 75.0},
-            {'customer_id': 'cust-003', 'invoice_payment_score': 50.0}
-        ])
-        
-        mock_api.return_value = pd.DataFrame([
-            {'customer_id': 'cust-001', 'avg_api_calls_per_week': 450.0, 'api_score': 100},
-            {'customer_id': 'cust-002', 'avg_api_calls_per_week': 250.0, 'api_score': 75}
-            # cust-003 missing
+        # Arrange - NULL components for customers without events
+        mock_components.return_value = pd.DataFrame([
+            {'customer_id': 'cust-001', 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 1, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 450.0},
+            {'customer_id': 'cust-002', 'avg_logins_per_week': 5.0, 'feature_adoption_score': None,
+             'open_tickets': None, 'invoice_payment_score': 75.0, 'avg_api_calls_per_week': 250.0},
+            {'customer_id': 'cust-003', 'avg_logins_per_week': None, 'feature_adoption_score': None,
+             'open_tickets': 8, 'invoice_payment_score': 50.0, 'avg_api_calls_per_week': None}
         ])
         
         # Act
         result = get_health_scores()
         
         # Assert
-        # Should have all customers due to outer joins
+        # Every customer returned by the query is scored
         self.assertEqual(len(result), 3)
         
         # Check that missing values are filled with defaults
@@ -352,6 +379,151 @@ class TestIntegratedHealthScoreCalculation(unittest.TestCase):
             self.assertFalse(pd.isna(row['health_score']), "Health score should not be NaN")
             self.assertTrue(0 <= row['health_score'] <= 100, "Health score should be in valid range")
 
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_health_components_single_query(self, mock_cursor):
+        """Test that all components are fetched in one round-trip driven from customers"""
+        # Arrange - customer 2 has no events at all
+        # Rows are tuples in COMPONENT_COLUMNS order, the metrics cast to DOUBLE
+        mock_cursor.fetchall.return_value = [
+            (1, 15.0, 80.0, 1.0, 95.0, 450.0),
+            (2, None, None, None, None, None)
+        ]
+
+        # Act
+        result = get_health_details()
+
+        # Assert
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertIn("FROM customers c", mock_cursor.execute.call_args[0][0])
+        self.assertIn("CAST(l.avg_logins_per_week AS DOUBLE)", mock_cursor.execute.call_args[0][0])
+        self.assertEqual(mock_cursor.call_args, call())
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result['customer_id'].dtype, 'int32')
+
+        # No events: login 0, feature 0, ticket 100, invoice 100, api 25
+        idle = result[result['customer_id'] == 2].iloc[0]
+        self.assertEqual(idle['ticket_score'], 100)
+        self.assertEqual(idle['api_score'], 25)
+        self.assertAlmostEqual(idle['health_score'], 100*0.2 + 100*0.15 + 25*0.15)
+
+
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_iter_health_details_scores_in_chunks(self, mock_cursor):
+        """Test that the export walks customers by keyset and scores each chunk"""
+        def components(*ids):
+            return [(i, None, None, None, None, None) for i in ids]
+
+        # Two full chunks of 2 ids, then a short one that ends the walk
+        mock_cursor.fetchall.side_effect = [
+            [{'id': 1}, {'id': 2}], components(1, 2),
+            [{'id': 3}, {'id': 5}], components(3, 5),
+            [{'id': 8}], components(8),
+        ]
+
+        chunks = list(iter_health_details(chunk_size=2))
+
+        self.assertEqual([list(df['customer_id']) for df in chunks], [[1, 2], [3, 5], [8]])
+        id_reads = [c.args for c in mock_cursor.execute.call_args_list if 'SELECT id FROM customers' in c.args[0]]
+        self.assertEqual([params for _, params in id_reads], [(0, 2), (2, 2), (5, 2)])
+        # Each chunk's component query is filtered to that chunk's customers
+        components_query, params = mock_cursor.execute.call_args_list[3].args
+        self.assertIn("WHERE c.id IN (%s,%s)", components_query)
+        self.assertEqual(params, (3, 5) * 6)
+
+    @patch('src.backend.db.cursor', new_callable=pooled_cursor_mock)
+    def test_health_components_are_typed_arrays(self, mock_cursor):
+        """Test that the components come back as int32 ids and float64 metrics, NULL as NaN"""
+        mock_cursor.fetchall.return_value = [(3, 2.5, None, 0.0, 100.0, 75.0)]
+
+        df = health_components()
+
+        self.assertEqual(df['customer_id'].dtype, 'int32')
+        self.assertTrue((df.dtypes[1:] == 'float64').all())
+        self.assertTrue(pd.isna(df.loc[0, 'feature_adoption_score']))
+
+        # No rows still yields every typed column
+        mock_cursor.fetchall.return_value = []
+        empty = health_components()
+        self.assertEqual(list(empty.columns), src.backend.calculate_health_score.COMPONENT_COLUMNS)
+        self.assertEqual(empty['customer_id'].dtype, 'int32')
+
+
+class TestParallelComponents(unittest.TestCase):
+    """Tests for the concurrent component queries (PARALLEL_COMPONENTS=1)"""
+
+    # Tuple rows per component table (metrics already cast to DOUBLE);
+    # customer 2 has no events at all
+    ROWS = {
+        'FROM customers': [(1,), (2,)],
+        'FROM daily_logins': [(1, 15.0)],
+        'FROM daily_feature_usage': [(1, 80.0)],
+        'FROM daily_tickets': [(1, 1.0)],
+        'FROM invoices': [(1, 95.0)],
+        'FROM daily_api_usage': [(1, 450.0)],
+    }
+
+    def setUp(self):
+        patcher = patch('src.backend.calculate_health_score.PARALLEL_COMPONENTS', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.threads = set()
+        self.queries = []
+
+    def fake_fetch_arrays(self, query, dtypes, params=(), cur=None):
+        self.threads.add(threading.current_thread().name)
+        self.queries.append(query)
+        rows = next(rows for table, rows in self.ROWS.items() if table in query)
+        return {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(dtypes.items(), zip(*rows))}
+
+    def test_components_are_fetched_concurrently_and_joined(self):
+        with patch('src.backend.calculate_health_score.fetch_arrays', side_effect=self.fake_fetch_arrays) as mock_fetch:
+            components = health_components()
+            result = get_health_details()
+
+        self.assertEqual(mock_fetch.call_count, 12)
+        self.assertTrue(all(name.startswith('component') for name in self.threads))
+        self.assertIn("CAST(avg_logins_per_week AS DOUBLE) AS avg_logins_per_week FROM (", self.queries[1] + self.queries[2])
+        self.assertEqual(list(components.columns), src.backend.calculate_health_score.COMPONENT_COLUMNS)
+        self.assertEqual(dict(components.dtypes), src.backend.calculate_health_score.COMPONENT_DTYPES)
+        self.assertEqual(components['customer_id'].tolist(), [1, 2])
+        self.assertTrue(components.iloc[1, 1:].isna().all())
+
+        # Same scores as the single consolidated query
+        idle = result[result['customer_id'] == 2].iloc[0]
+        self.assertAlmostEqual(idle['health_score'], 100*0.2 + 100*0.15 + 25*0.15)
+        active = result[result['customer_id'] == 1].iloc[0]
+        self.assertEqual((active['login_score'], active['ticket_score'], active['api_score']), (75, 75, 100))
+
+    def test_transaction_cursor_keeps_the_single_query(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+        health_components([1], cur)
+        self.assertEqual(cur.execute.call_count, 1)
+        self.assertIn("FROM customers c", cur.execute.call_args[0][0])
+
+    def test_failed_component_raises(self):
+        def failing(query, dtypes, params=(), cur=None):
+            if 'daily_tickets' in query:
+                raise RuntimeError("lost connection")
+            return self.fake_fetch_arrays(query, dtypes, params, cur)
+
+        with patch('src.backend.calculate_health_score.fetch_arrays', side_effect=failing):
+            with self.assertRaisesRegex(ComponentQueryError, "tickets query failed: lost connection"):
+                health_components()
+
+    def test_slow_component_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow(query, params=(), cur=None):
+            if 'invoices' in query:
+                release.wait(5)
+            return []
+
+        with patch('src.backend.calculate_health_score.fetch_all', side_effect=slow):
+            with self.assertRaisesRegex(ComponentQueryError, "invoice did not finish within 0.05s"):
+                run_concurrently({'invoice': lambda: invoice(), 'login_freq': lambda: login_freq()}, timeout=0.05)
+
 
 class TestHealthScoreComponents(unittest.TestCase):
     """Test individual components and helper functions"""
@@ -0,0 +1,105 @@
+# test_health_cache.py
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.health_cache import VersionedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestVersionedCache(unittest.TestCase):
+    """Unit tests for the data-version keyed result cache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = VersionedCache(ttl=10, clock=self.clock)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_hit_after_first_miss(self):
+        self.assertEqual(self.cache.get("k", self.compute), 1)
+        self.assertEqual(self.cache.get("k", self.compute), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_bump_invalidates(self):
+        self.cache.get("k", self.compute)
+        self.cache.bump()
+        self.assertEqual(self.cache.get("k", self.compute), 2)
+        self.assertEqual(self.cache.stats()['version'], 1)
+
+    def test_ttl_expiry(self):
+        self.cache.get("k", self.compute)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get("k", self.compute), 1)
+        self.clock.now = 10.0
+        self.assertEqual(self.cache.get("k", self.compute), 2)
+
+    def test_result_racing_a_write_is_not_stored(self):
+        def compute_during_write():
+            self.cache.bump()
+            return self.compute()
+
+        self.cache.get("k", compute_during_write)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VersionedCache(ttl=10, clock=self.clock, max_entries=2)
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.get("a", lambda: 0)  # a is now the most recently used
+        cache.get("c", lambda: 3)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.get("a", lambda: 0), 1)
+        self.assertEqual(cache.get("b", lambda: 4), 4)
+
+    def test_expired_entries_go_before_live_ones(self):
+        cache = VersionedCache(ttl=10, clock=self.clock, max_entries=2)
+        cache.get("old", lambda: 1)
+        self.clock.now = 5
+        cache.get("live", lambda: 2)
+        self.clock.now = 12
+        cache.get("new", lambda: 3)
+        # "old" expired and was purged; nothing live had to be evicted
+        self.assertEqual(cache.stats()['evictions'], 0)
+        self.assertEqual(cache.get("live", lambda: 0), 2)
+
+    def test_etag_follows_the_watermark_and_ttl(self):
+        tag = self.cache.etag()
+        self.assertTrue(tag.startswith('W/"'))
+        self.assertEqual(self.cache.etag(), tag)
+        self.cache.bump()
+        self.assertNotEqual(self.cache.etag(), tag)
+        tag = self.cache.etag()
+        # Writers this process never hears about are covered by the TTL
+        self.clock.now = 10.0
+        self.assertNotEqual(self.cache.etag(), tag)
+
+    def test_customer_etag_ignores_other_customers_writes(self):
+        first, second = self.cache.etag(1), self.cache.etag(2)
+        self.cache.bump([2])
+        self.assertEqual(self.cache.etag(1), first)
+        self.assertNotEqual(self.cache.etag(2), second)
+        # A write without customer ids may have touched anyone
+        self.cache.bump()
+        self.assertNotEqual(self.cache.etag(1), first)
+
+    def test_no_etag_without_caching(self):
+        self.assertIsNone(VersionedCache(ttl=0).etag())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,121 @@
+# test_health_history.py
+import unittest
+import sys
+import os
+import math
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.health_history import (RECORD_QUERY, UPSERT_QUERY, record_health_history, read_health_trend,
+                                       history_components, backfill_history)
+from src.backend.calculate_health_score import months_before
+
+
+class TestHealthHistory(unittest.TestCase):
+    """Tests for the daily score history (no real database)"""
+
+    def test_record_copies_snapshot_for_the_day(self):
+        cur = MagicMock()
+        cur.rowcount = 3
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+
+        with patch('src.backend.db.transaction', transaction), \
+                patch('src.backend.health_history.refresh_health_snapshot') as mock_refresh:
+            count = record_health_history(date(2024, 5, 1))
+
+        mock_refresh.assert_called_once_with()
+        cur.execute.assert_called_once_with(RECORD_QUERY, (date(2024, 5, 1),))
+        self.assertEqual(count, 3)
+        # Scores are stored compactly: whole components, health_score in hundredths
+        self.assertIn("ROUND(health_score * 100)", RECORD_QUERY)
+
+    def test_record_without_refresh(self):
+        transaction = MagicMock()
+        with patch('src.backend.db.transaction', transaction), \
+                patch('src.backend.health_history.refresh_health_snapshot') as mock_refresh:
+            record_health_history(refresh=False)
+        mock_refresh.assert_not_called()
+
+    def test_trend_is_one_range_read(self):
+        rows = [
+            {'day': date(2024, 4, 30), 'login_score': 50, 'feature_score': 60, 'ticket_score': 100,
+             'invoice_payment_score': 67, 'api_score': 25, 'health_score': 6130},
+            {'day': date(2024, 5, 1), 'login_score': 75, 'feature_score': 60, 'ticket_score': 100,
+             'invoice_payment_score': 67, 'api_score': 25, 'health_score': 6755},
+        ]
+        with patch('src.backend.health_history.fetch_all', return_value=rows) as mock_fetch:
+            trend = read_health_trend(7, days=30, today=date(2024, 5, 1))
+
+        query, params = mock_fetch.call_args[0]
+        self.assertIn("WHERE customer_id = %s AND day >= %s", query)
+        self.assertEqual(params, (7, date(2024, 4, 2)))
+        self.assertEqual(trend['day'], ['2024-04-30', '2024-05-01'])
+        self.assertEqual(trend['login_score'], [50, 75])
+        self.assertEqual(trend['health_score'], [61.3, 67.55])
+
+
+
+class TestHistoryBackfill(unittest.TestCase):
+    """Tests for the vectorized range backfill"""
+
+    inputs = {
+        # (customer_id, day, amount)
+        'logins': [(1, date(2024, 2, 29), 40), (1, date(2024, 3, 1), 30), (1, date(2024, 6, 1), 50),
+                   (2, date(2024, 5, 31), 4)],
+        'api_calls': [(2, date(2024, 3, 2), 1200), (2, date(2024, 6, 2), 3000)],
+        'tickets': [(1, date(2024, 3, 1), 2), (1, date(2024, 6, 1), 4)],
+        'features': [(1, date(2023, 1, 5), 1), (1, date(2024, 6, 1), 1), (2, date(2024, 5, 30), 1)],
+        'invoices': [(1, date(2022, 1, 1), 1), (1, date(2024, 5, 31), 0), (1, date(2024, 6, 2), 0)],
+    }
+
+    def expected(self, customer_id, day):
+        """The component queries evaluated by hand for one customer and as_of day."""
+        def window(name):
+            return sum(a for c, d, a in self.inputs[name] if c == customer_id and months_before(day) < d <= day)
+        due = [a for c, d, a in self.inputs['invoices'] if c == customer_id and d <= day]
+        return {
+            'avg_logins_per_week': window('logins') / 12,
+            'feature_adoption_score': sum(1 for c, d, _ in self.inputs['features']
+                                          if c == customer_id and d <= day) / 5.0 * 100,
+            'open_tickets': window('tickets'),
+            'invoice_payment_score': sum(due) / len(due) * 100 if due else math.nan,
+            'avg_api_calls_per_week': window('api_calls') / 12,
+        }
+
+    def test_matches_per_day_queries(self):
+        first, last = date(2024, 5, 30), date(2024, 6, 2)
+
+        df = history_components([1, 2], first, last, self.inputs)
+
+        self.assertEqual(len(df), 2 * 4)
+        for _, row in df.iterrows():
+            for column, value in self.expected(row['customer_id'], row['day']).items():
+                if math.isnan(value):
+                    self.assertTrue(math.isnan(row[column]), (row['customer_id'], row['day'], column))
+                else:
+                    self.assertAlmostEqual(row[column], value, msg=(row['customer_id'], row['day'], column))
+
+    def test_backfill_writes_every_customer_day(self):
+        cur = MagicMock()
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+        inputs = {name: [] for name in self.inputs}
+
+        with patch('src.backend.health_history.iter_customer_ids', return_value=iter([[1, 2], [3]])), \
+                patch('src.backend.health_history.fetch_backfill_inputs', return_value=inputs), \
+                patch('src.backend.db.transaction', transaction):
+            written = backfill_history(date(2024, 1, 1), date(2024, 1, 10))
+
+        self.assertEqual(written, 3 * 10)
+        rows = [row for c in cur.executemany.call_args_list for row in c.args[1]]
+        self.assertEqual(cur.executemany.call_args_list[0].args[0], UPSERT_QUERY)
+        self.assertEqual(len(rows), 30)
+        # No events at all: login 0, feature 0, ticket 100, invoice 100, api 25 -> 38.75
+        self.assertEqual(rows[0], (1, date(2024, 1, 1), 0, 0, 100, 100, 25, 3875))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
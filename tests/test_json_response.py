@@ -0,0 +1,28 @@
+# test_json_response.py
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.json_response import dumps
+
+
+class TestDumps(unittest.TestCase):
+    """Tests for the compact JSON serializer of FastJSONResponse"""
+
+    def test_compact_output(self):
+        self.assertEqual(dumps({"items": [{"customer_id": 1, "name": "Café"}], "next": None}),
+                         '{"items":[{"customer_id":1,"name":"Café"}],"next":null}'.encode('utf-8'))
+
+    def test_fallback_matches_json_response(self):
+        with patch('src.backend.json_response.orjson', None):
+            self.assertEqual(dumps({"score": 1.5, "name": "Café"}), '{"score":1.5,"name":"Café"}'.encode('utf-8'))
+            # Like Starlette's JSONResponse: an error, never invalid JSON
+            with self.assertRaises(ValueError):
+                dumps({"score": float('nan')})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
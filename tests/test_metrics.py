@@ -0,0 +1,65 @@
+# test_metrics.py
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend import metrics
+from src.backend.metrics import REGISTRY, Counter, Histogram, current_function, timed
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for the Prometheus metrics primitives"""
+
+    def setUp(self):
+        self.registered = list(REGISTRY)
+        self.addCleanup(self.restore_registry)
+
+    def restore_registry(self):
+        REGISTRY[:] = self.registered
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("test_seconds", "Test.", ["route"], buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, route="/a")
+        self.assertEqual(histogram.render(), [
+            "# HELP test_seconds Test.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{route="/a",le="0.1"} 2',
+            'test_seconds_bucket{route="/a",le="1"} 3',
+            'test_seconds_bucket{route="/a",le="+Inf"} 4',
+            'test_seconds_sum{route="/a"} 3.65',
+            'test_seconds_count{route="/a"} 4',
+        ])
+
+    def test_counter_per_label_and_escaping(self):
+        counter = Counter("test_total", "Test.", ["type"])
+        counter.inc(type="login")
+        counter.inc(2, type='a"b')
+        self.assertEqual(counter.value(type="login"), 1)
+        self.assertIn('test_total{type="a\\"b"} 2', counter.render())
+
+    def test_timed_records_duration_and_attributes_queries(self):
+        seen = []
+
+        @timed
+        def login_freq():
+            seen.append(current_function())
+
+        before = metrics.FUNCTION_SECONDS.count(function="login_freq")
+        login_freq()
+        self.assertEqual(seen, ["login_freq"])
+        self.assertEqual(current_function(), "other")
+        self.assertEqual(metrics.FUNCTION_SECONDS.count(function="login_freq"), before + 1)
+
+    def test_render_includes_every_registered_metric(self):
+        text = metrics.render()
+        for name in ("health_function_duration_seconds", "health_query_rows", "http_request_duration_seconds",
+                     "template_render_duration_seconds", "events_inserted_total", "db_pool_connections"):
+            self.assertIn(f"# TYPE {name} ", text)
+        self.assertTrue(text.endswith("\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
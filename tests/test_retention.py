@@ -0,0 +1,94 @@
+# test_retention.py
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.retention import (add_months, partition_month, missing_partitions, expired_partitions,
+                                   create_partitions, run, RAW_TABLES, WINDOW_ROLLUPS)
+
+
+class TestPartitionPlanning(unittest.TestCase):
+    """Tests for working out which monthly partitions to create and drop"""
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 2, 1), -6), date(2023, 8, 1))
+
+    def test_partition_month(self):
+        self.assertEqual(partition_month('p202402'), date(2024, 2, 1))
+        self.assertIsNone(partition_month('p_old'))
+        self.assertIsNone(partition_month('pmax'))
+
+    def test_missing_partitions_on_fresh_table(self):
+        months = missing_partitions(['p_old', 'pmax'], date(2024, 1, 1), date(2024, 3, 1))
+        self.assertEqual(months, [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+
+    def test_missing_partitions_only_after_newest(self):
+        existing = ['p_old', 'p202401', 'p202402', 'pmax']
+        months = missing_partitions(existing, date(2024, 1, 1), date(2024, 4, 1))
+        self.assertEqual(months, [date(2024, 3, 1), date(2024, 4, 1)])
+        self.assertEqual(missing_partitions(existing, date(2024, 1, 1), date(2024, 2, 1)), [])
+
+    def test_expired_partitions(self):
+        existing = ['p_old', 'p202312', 'p202401', 'p202402', 'pmax']
+        self.assertEqual(expired_partitions(existing, date(2024, 2, 1)), ['p202312', 'p202401'])
+
+    def test_create_partitions_splits_pmax(self):
+        cur = MagicMock()
+        create_partitions(cur, 'logins', [date(2024, 12, 1)])
+        cur.execute.assert_called_once_with(
+            "ALTER TABLE logins REORGANIZE PARTITION pmax INTO ("
+            "PARTITION p202412 VALUES LESS THAN ('2025-01-01'), "
+            "PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+
+
+class TestRetentionRun(unittest.TestCase):
+    """Tests for the retention job (no real database)"""
+
+    def run_job(self, partitions, **kwargs):
+        cur = MagicMock()
+        cur.fetchall.side_effect = lambda: [(name,) for name in partitions]
+        cursor = MagicMock()
+        cursor.return_value.__enter__.return_value = cur
+        with patch('src.backend.db.cursor', cursor), \
+                patch('src.backend.retention.backfill') as mock_backfill, \
+                patch('src.backend.retention.compact_feature_rollup') as mock_compact:
+            actions = run(today=date(2024, 8, 15), raw_months=6, rollup_months=15, ahead=1, **kwargs)
+        return actions, cur, mock_backfill, mock_compact
+
+    def test_expired_raw_month_is_folded_before_drop(self):
+        partitions = ['p_old', 'p202401', 'p202402', 'p202403', 'p202409', 'pmax']
+        actions, cur, mock_backfill, mock_compact = self.run_job(partitions)
+
+        # Raw cutoff is 2024-02-01: only January has expired
+        mock_backfill.assert_any_call(date(2024, 1, 1), date(2024, 2, 1), ['daily_logins'])
+        self.assertEqual(mock_backfill.call_count, len(RAW_TABLES))
+        self.assertIn(('logins', 'drop', ['p202401']), actions)
+        cur.execute.assert_any_call("ALTER TABLE logins DROP PARTITION p202401")
+        # The windowed rollups keep 15 months, so nothing of theirs expires
+        for table in WINDOW_ROLLUPS:
+            self.assertNotIn('drop', [action for t, action, _ in actions if t == table])
+        mock_compact.assert_called_once_with(date(2023, 5, 1))
+
+    def test_dry_run_changes_nothing(self):
+        actions, cur, mock_backfill, mock_compact = self.run_job(['p_old', 'p202401', 'pmax'], dry_run=True)
+
+        self.assertIn(('logins', 'create', ['p202402', 'p202403', 'p202404', 'p202405', 'p202406',
+                                            'p202407', 'p202408', 'p202409']), actions)
+        executed = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertFalse([q for q in executed if q.startswith('ALTER')])
+        self.assertIn('health_score_history', [table for table, action, _ in actions if action == 'create'])
+        mock_backfill.assert_not_called()
+        mock_compact.assert_not_called()
+
+    def test_rollups_must_outlive_raw_events(self):
+        with self.assertRaises(ValueError):
+            run(today=date(2024, 8, 15), raw_months=6, rollup_months=3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
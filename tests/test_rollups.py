@@ -0,0 +1,104 @@
+# test_rollups.py
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.rollups import ROLLUPS, ROLLUP_UPSERTS, rollup_rows, update_rollups, backfill
+
+
+class TestRollupMaintenance(unittest.TestCase):
+    """Tests for incremental rollup maintenance on ingest"""
+
+    def test_events_are_aggregated_per_rollup_key(self):
+        events = [
+            (1, "login", {}),
+            (1, "login", {}),
+            (2, "login", {}),
+            (1, "api", {"calls_count": 30}),
+            (1, "api", {}),
+            (1, "feature", {"feature_name": "export", "usage_count": 2}),
+            (1, "feature", {"feature_name": "export"}),
+            (3, "ticket", {"status": "pending"}),
+            (3, "ticket", {}),
+            (3, "invoice", {"amount": 10, "due_date": "2024-01-01"}),
+        ]
+
+        rows = rollup_rows(events)
+
+        self.assertEqual(sorted(rows['login']), [(1, 2), (2, 1)])
+        self.assertEqual(rows['api'], [(1, 31)])
+        self.assertEqual(rows['feature'], [(1, 'export', 3)])
+        self.assertEqual(sorted(rows['ticket']), [(3, 'open', 1), (3, 'pending', 1)])
+        self.assertNotIn('invoice', rows)
+
+    def test_update_rollups_upserts_counters(self):
+        cur = MagicMock()
+
+        update_rollups(cur, [(1, "login", {}), (2, "login", {}), (1, "api", {"calls_count": 5})])
+
+        cur.executemany.assert_called_once_with(ROLLUP_UPSERTS['login'][0], [(1, 1), (2, 1)])
+        cur.execute.assert_called_once_with(ROLLUP_UPSERTS['api'][0], (1, 5))
+        self.assertIn("ON DUPLICATE KEY UPDATE calls_count = calls_count + VALUES(calls_count)",
+                      ROLLUP_UPSERTS['api'][0])
+
+
+class TestRollupBackfill(unittest.TestCase):
+    """Tests for rebuilding rollups from the raw events"""
+
+    def test_backfill_replaces_days_in_range(self):
+        cur = MagicMock()
+        cur.rowcount = 42
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+
+        with patch('src.backend.db.transaction', transaction):
+            written = backfill('2024-06-01', '2024-07-01', ['daily_logins'])
+
+        self.assertEqual(written, {'daily_logins': 42})
+        cur.execute.assert_any_call("DELETE FROM daily_logins WHERE day >= %s AND day < %s",
+                                    ('2024-06-01', '2024-07-01'))
+        cur.execute.assert_any_call(ROLLUPS['daily_logins']['backfill'], ('2024-06-01', '2024-07-01'))
+
+    def test_backfill_starts_at_oldest_raw_event(self):
+        cur = MagicMock()
+        cur.fetchone.return_value = ('2024-03-05',)
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+
+        with patch('src.backend.db.transaction', transaction):
+            backfill(tables=['daily_tickets'])
+
+        # Rollup days older than the retained raw events are left alone
+        cur.execute.assert_any_call("SELECT MIN(created_at) FROM support_tickets")
+        cur.execute.assert_any_call("DELETE FROM daily_tickets WHERE day >= %s AND day < %s",
+                                    ('2024-03-05', '9999-12-31'))
+
+    def test_backfill_skips_empty_source(self):
+        cur = MagicMock()
+        cur.fetchone.return_value = (None,)
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+
+        with patch('src.backend.db.transaction', transaction):
+            written = backfill(tables=['daily_logins'])
+
+        self.assertEqual(written, {'daily_logins': 0})
+        self.assertEqual(cur.execute.call_count, 1)
+
+    def test_backfill_all_tables_by_default(self):
+        cur = MagicMock()
+        transaction = MagicMock()
+        transaction.return_value.__enter__.return_value = cur
+
+        with patch('src.backend.db.transaction', transaction):
+            written = backfill()
+
+        self.assertEqual(set(written), set(ROLLUPS))
+        self.assertEqual(transaction.call_count, len(ROLLUPS))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
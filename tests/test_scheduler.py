@@ -0,0 +1,67 @@
+# test_scheduler.py
+import unittest
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend import retention
+from src.backend.health_history import record_health_history
+from src.backend.scheduler import HISTORY_SECONDS, JOBS, RETENTION_SECONDS, run_due, run_forever
+
+
+class TestScheduler(unittest.TestCase):
+    """Unit tests for the periodic maintenance loop"""
+
+    def test_jobs_run_at_start_then_every_interval(self):
+        snapshot, history = MagicMock(return_value=10), MagicMock(return_value=10)
+        jobs = [("snapshot", snapshot, 60), ("history", history, 3600)]
+        next_run = {}
+
+        self.assertEqual(run_due(jobs, next_run, 0), 60)
+        self.assertEqual(run_due(jobs, next_run, 30), 60)
+        self.assertEqual(run_due(jobs, next_run, 60), 120)
+
+        self.assertEqual(snapshot.call_count, 2)
+        self.assertEqual(history.call_count, 1)
+
+    def test_failing_job_is_logged_and_retried(self):
+        job = MagicMock(side_effect=[RuntimeError("database down"), 5])
+        next_run = {}
+        with self.assertLogs("customer_health.scheduler", level="ERROR"):
+            run_due([("snapshot", job, 60)], next_run, 0)
+        run_due([("snapshot", job, 60)], next_run, 60)
+        self.assertEqual(job.call_count, 2)
+
+    def test_loop_sleeps_until_the_next_job(self):
+        clock = iter([0, 0, 60, 60])
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise KeyboardInterrupt
+
+        disabled = MagicMock()
+        with self.assertRaises(KeyboardInterrupt):
+            run_forever([("snapshot", MagicMock(), 60), ("off", disabled, 0)], clock=lambda: next(clock), sleep=sleep)
+        self.assertEqual(sleeps, [60, 60])
+        disabled.assert_not_called()
+
+    def test_history_is_recorded_daily_after_the_snapshot(self):
+        names = [name for name, _, _ in JOBS]
+        self.assertLess(names.index("health_snapshot"), names.index("health_history"))
+        _, job, interval = JOBS[names.index("health_history")]
+        # Copies the snapshot just rebuilt rather than rebuilding it again
+        self.assertEqual((job.func, job.keywords), (record_health_history, {"refresh": False}))
+        self.assertEqual(interval, HISTORY_SECONDS)
+        self.assertEqual(HISTORY_SECONDS, 86400)
+
+    def test_retention_runs_daily(self):
+        self.assertIn(("retention", retention.run, RETENTION_SECONDS), JOBS)
+        self.assertEqual(RETENTION_SECONDS, 86400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
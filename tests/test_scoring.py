@@ -0,0 +1,87 @@
+# test_scoring.py
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.scoring import SCORE_TABLES, WEIGHTS, score_column, score_components
+
+
+class TestScoreTables(unittest.TestCase):
+    """Boundary tests for the declarative threshold tables"""
+
+    def test_login_score_boundaries(self):
+        values = [25.0, 20.0, 15.0, 10.0, 7.5, 5.0, 3.0, 1.0, 0.5, 0.0]
+        expected = [100, 100, 75, 75, 50, 50, 25, 25, 0, 0]
+        result = score_column(values, SCORE_TABLES['login_score'])
+        self.assertEqual(result.tolist(), expected)
+
+    def test_ticket_score_boundaries(self):
+        values = [0, 1, 2, 3, 5, 6, 100]
+        expected = [100, 75, 75, 50, 50, 25, 25]
+        result = score_column(values, SCORE_TABLES['ticket_score'])
+        self.assertEqual(result.tolist(), expected)
+
+    def test_api_score_boundaries(self):
+        values = [500, 401, 400, 300, 200, 100, 50, 10]
+        expected = [100, 100, 75, 75, 50, 50, 25, 25]
+        result = score_column(values, SCORE_TABLES['api_score'])
+        self.assertEqual(result.tolist(), expected)
+
+    def test_missing_values_get_default(self):
+        for name, table in SCORE_TABLES.items():
+            result = score_column([np.nan, None], table)
+            self.assertEqual(result.tolist(), [table['missing']] * 2, name)
+
+    def test_weights_sum_to_one(self):
+        self.assertAlmostEqual(sum(WEIGHTS.values()), 1.0, places=6)
+
+
+class TestScoreComponents(unittest.TestCase):
+    """Tests for scoring a whole components frame at once"""
+
+    def test_score_components(self):
+        df = pd.DataFrame([
+            {'customer_id': 1, 'avg_logins_per_week': 15.0, 'feature_adoption_score': 80.0,
+             'open_tickets': 1, 'invoice_payment_score': 95.0, 'avg_api_calls_per_week': 450.0},
+            {'customer_id': 2, 'avg_logins_per_week': None, 'feature_adoption_score': None,
+             'open_tickets': None, 'invoice_payment_score': None, 'avg_api_calls_per_week': None},
+        ])
+
+        result = score_components(df)
+
+        self.assertEqual(result['customer_id'].tolist(), [1, 2])
+        self.assertAlmostEqual(result.iloc[0]['health_score'], 75*0.25 + 80*0.25 + 75*0.2 + 95*0.15 + 100*0.15)
+        self.assertAlmostEqual(result.iloc[1]['health_score'], 100*0.2 + 100*0.15 + 25*0.15)
+
+    def test_score_components_empty(self):
+        df = pd.DataFrame(columns=['customer_id', 'avg_logins_per_week', 'feature_adoption_score',
+                                   'open_tickets', 'invoice_payment_score', 'avg_api_calls_per_week'])
+        result = score_components(df)
+        self.assertTrue(result.empty)
+        self.assertIn('health_score', result.columns)
+
+    def test_score_components_large_population(self):
+        """Scoring is vectorized, so a million rows is a handful of array ops"""
+        n = 1_000_000
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'customer_id': np.arange(n),
+            'avg_logins_per_week': rng.uniform(0, 30, n),
+            'feature_adoption_score': rng.uniform(0, 100, n),
+            'open_tickets': rng.integers(0, 10, n),
+            'invoice_payment_score': rng.uniform(0, 100, n),
+            'avg_api_calls_per_week': rng.uniform(0, 600, n),
+        })
+
+        result = score_components(df)
+
+        self.assertEqual(len(result), n)
+        self.assertTrue(((result['health_score'] >= 0) & (result['health_score'] <= 100)).all())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,162 @@
+# test_sqlite_backend.py
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend import db, retention, rollups
+from src.backend.calculate_health_score import get_health_details, health_components, invoice, login_freq
+from src.backend.events import UnknownCustomers, existing_customers, write_events
+from src.backend.health_history import read_health_trend, record_health_history
+from src.backend.health_snapshot import UPSERT_QUERY, read_health_page, read_health_summary, refresh_health_snapshot
+from src.backend.retention import COMPACT_FEATURES_QUERY
+from src.backend.sqlite_backend import connect as sqlite_backend_connect, translate
+
+AS_OF = date(2024, 6, 30)
+
+
+class TestTranslate(unittest.TestCase):
+    """Tests for the MySQL -> SQLite query rewriting"""
+
+    def test_placeholders_and_window(self):
+        self.assertEqual(translate("SELECT 1 FROM t WHERE day >= NOW() - INTERVAL 3 MONTH AND id = %s"),
+                         "SELECT 1 FROM t WHERE day >= datetime('now', 'localtime', '-3 months') AND id = ?")
+
+    def test_integer_division_is_decimal(self):
+        self.assertIn("SUM(logins) / 12.0", translate("SELECT SUM(logins) / 12 FROM daily_logins"))
+        self.assertIn("/ 5.0 * 100", translate("SELECT COUNT(DISTINCT f) / 5.0 * 100 FROM t"))
+        self.assertIn("* 1.0 / COUNT(*)", translate("SELECT SUM(x) / COUNT(*) FROM t"))
+
+    def test_upsert(self):
+        query = translate(UPSERT_QUERY)
+        self.assertIn("ON CONFLICT DO UPDATE SET", query)
+        self.assertIn("health_score = excluded.health_score", query)
+        self.assertIn("VALUES (?,?,?,?,?,?,?,date('now', 'localtime'))", query)
+
+    def test_insert_select_upsert_gets_a_where(self):
+        query = translate(COMPACT_FEATURES_QUERY)
+        self.assertIn("AS folded\n    WHERE true ON CONFLICT DO UPDATE SET", query)
+        self.assertIn("date(day, 'start of month') AS month_start", query)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """End-to-end tests of the scoring path on an embedded SQLite database file"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = patch.dict(os.environ, {"DB_BACKEND": "sqlite", "DB_PATH": os.path.join(directory.name, "test.sqlite3")})
+        env.start()
+        self.addCleanup(env.stop)
+        db._pool = None
+        self.addCleanup(self.close_pool)
+
+        with db.transaction() as cur:
+            cur.executemany("INSERT INTO customers (id, name, segment, created_at) VALUES (%s, %s, %s, %s)",
+                            [(1, 'Acme', 'SMB', date(2024, 1, 1)), (2, 'Idle', 'Startup', date(2024, 1, 1))])
+            # Customer 1: 24 logins in the window and 2 older ones; 2 of the 3 invoices due by AS_OF paid on time
+            cur.executemany("INSERT INTO logins (customer_id, login_date) VALUES (%s, %s)",
+                            [(1, AS_OF - timedelta(days=i)) for i in range(24)] + [(1, date(2024, 1, 5))] * 2)
+            cur.executemany("INSERT INTO invoices (customer_id, amount, due_date, paid_date) VALUES (%s, %s, %s, %s)",
+                            [(1, 100, date(2024, 5, 1), date(2024, 4, 30)), (1, 100, date(2024, 5, 10), date(2024, 5, 10)),
+                             (1, 100, date(2024, 6, 1), None), (1, 100, date(2024, 7, 15), None)])
+            cur.executemany("INSERT INTO feature_usage (customer_id, feature_name, usage_count, usage_date) "
+                            "VALUES (%s, %s, %s, %s)", [(1, 'Feature_A', 3, date(2024, 6, 1)),
+                                                        (1, 'Feature_B', 1, date(2024, 6, 2))])
+        rollups.backfill()
+
+    def close_pool(self):
+        db.get_pool().close()
+        db._pool = None
+
+    def test_components_match_mysql_semantics(self):
+        df = login_freq(as_of=AS_OF)
+        self.assertAlmostEqual(float(df['avg_logins_per_week'].iloc[0]), 2.0)
+        df = invoice(as_of=AS_OF)
+        self.assertAlmostEqual(float(df['invoice_payment_score'].iloc[0]), 200 / 3)
+
+    def test_health_details_include_customers_without_events(self):
+        df = get_health_details(as_of=AS_OF)
+        self.assertEqual(df['customer_id'].tolist(), [1, 2])
+        self.assertEqual(df.loc[0, 'feature_score'], 40.0)
+
+    def test_parallel_components_match_the_consolidated_query(self):
+        expected = health_components(as_of=AS_OF)
+        with patch('src.backend.calculate_health_score.PARALLEL_COMPONENTS', True):
+            actual = health_components(as_of=AS_OF)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_snapshot_summary_and_pages(self):
+        self.assertEqual(refresh_health_snapshot(), 2)
+        summary = read_health_summary()
+        self.assertEqual(summary['customers'], 2)
+        self.assertEqual(sum(summary['buckets']), 2)
+        rows, last = read_health_page(order='-health_score', limit=1)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(last, (rows[0]['health_score'], rows[0]['customer_id']))
+
+    def test_full_refresh_runs_in_locked_chunks(self):
+        with patch('src.backend.health_snapshot.REFRESH_CHUNK_SIZE', 1):
+            self.assertEqual(refresh_health_snapshot(), 2)
+        self.assertEqual(read_health_summary()['customers'], 2)
+
+    def test_long_id_lists_stay_under_the_variable_limit(self):
+        # 6,000 ids repeated in the six filters of the component query, or
+        # 40,000 in one lookup, would pass SQLite's default 32,766 bound
+        # variables (some builds raise it, so the test sets it)
+        with db.transaction() as cur:
+            cur.executemany("INSERT INTO customers (id, name, segment, created_at) VALUES (%s, %s, %s, %s)",
+                            [(i, f'Customer {i}', 'SMB', date(2024, 1, 1)) for i in range(3, 6001)])
+        self.close_pool()
+
+        def connect(*args, **kwargs):
+            conn = sqlite_backend_connect(*args, **kwargs)
+            conn._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 32766)
+            return conn
+
+        with patch('src.backend.sqlite_backend.connect', side_effect=connect):
+            self.assertEqual(len(existing_customers(range(1, 40001))), 6000)
+            df = get_health_details(list(range(1, 6001)), as_of=AS_OF)
+            self.assertEqual(df['customer_id'].tolist(), list(range(1, 6001)))
+            self.assertEqual(refresh_health_snapshot(list(range(1, 6001))), 6000)
+
+    def test_events_update_rollups_and_history(self):
+        refresh_health_snapshot()
+        write_events([(2, 'login', {}), (2, 'login', {}), (2, 'api', {'calls_count': 40})])
+        with db.cursor() as cur:
+            cur.execute("SELECT day, logins FROM daily_logins WHERE customer_id = %s", (2,))
+            self.assertEqual(cur.fetchall(), [(date.today(), 2)])
+        record_health_history(refresh=False)
+        trend = read_health_trend(2, days=1)
+        self.assertEqual(trend['day'], [date.today().isoformat()])
+
+    def test_events_for_unknown_customers_are_rejected(self):
+        # The partitioned event tables have no foreign key to catch this
+        with self.assertRaisesRegex(UnknownCustomers, "Unknown customer_id: 999"):
+            write_events([(1, 'login', {}), (999, 'login', {})])
+        with db.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM logins WHERE login_date = %s", (date.today(),))
+            self.assertEqual(cur.fetchall(), [(0,)])
+            cur.execute("SELECT COUNT(*) FROM daily_logins WHERE customer_id = %s", (999,))
+            self.assertEqual(cur.fetchall(), [(0,)])
+
+    def test_retention_deletes_instead_of_dropping_partitions(self):
+        actions = retention.run(today=date(2024, 7, 15), raw_months=1, rollup_months=2)
+        self.assertIn(('logins', 'delete', 'before 2024-06-01'), actions)
+        with db.cursor() as cur:
+            # The two January logins were folded and deleted
+            cur.execute("SELECT COUNT(*) FROM logins")
+            self.assertEqual(cur.fetchone()[0], 24)
+            cur.execute("SELECT SUM(logins) FROM daily_logins")
+            # Rollups before the rollup cutoff (2024-05-01) are gone, the rest survive
+            self.assertEqual(cur.fetchone()[0], 24)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,57 @@
+# test_tracing.py
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend import tracing
+from src.backend.metrics import timed
+
+
+class TestTracing(unittest.TestCase):
+    """Tests for the opt-in per-request trace"""
+
+    def test_header_or_sampling_enables_tracing(self):
+        self.assertTrue(tracing.should_trace("s3cret", secret="s3cret"))
+        self.assertFalse(tracing.should_trace("1", sample_rate=1.0, secret="s3cret"))
+        self.assertFalse(tracing.should_trace(None, sample_rate=0))
+        self.assertTrue(tracing.should_trace(None, sample_rate=1.0))
+
+    def test_header_is_ignored_without_a_secret(self):
+        self.assertFalse(tracing.should_trace("1", sample_rate=0, secret=""))
+        with patch.object(tracing, 'TRACE_HEADER_SECRET', ""):
+            self.assertFalse(tracing.should_trace("1", sample_rate=0))
+
+    def test_trace_collects_phases_queries_and_memory(self):
+        @timed
+        def get_health_details():
+            tracing.current().add_query("SELECT 1", 0.002, 5)
+            return [0] * 100_000
+
+        self.assertIsNone(tracing.current())
+        with patch.object(tracing, 'TRACE_SLOW_MS', 10_000), patch.object(tracing, 'TRACE_MEMORY', True):
+            token = tracing.start("GET", "/api/dashboard")
+            get_health_details()
+            trace = tracing.finish(token, 200)
+
+        self.assertIsNone(tracing.current())
+        self.assertEqual([name for name, _ in trace.spans], ["get_health_details"])
+        summary = trace.summary(200)
+        self.assertEqual(summary["queries"], [{"sql": "SELECT 1", "ms": 2.0, "rows": 5}])
+        # The list of 100k references is ~0.8 MB
+        self.assertGreater(summary["peak_bytes"], 500_000)
+        timing = trace.server_timing()
+        self.assertTrue(timing.startswith("total;dur="))
+        self.assertIn('db;dur=2.00;desc="1 queries"', timing)
+        self.assertIn("get_health_details;dur=", timing)
+
+    def test_only_slow_requests_are_logged(self):
+        with patch.object(tracing, 'TRACE_SLOW_MS', 10_000), patch.object(tracing.logger, 'info') as log:
+            tracing.finish(tracing.start("GET", "/fast"))
+        log.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+# test_warmup.py
+import unittest
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.warmup import Warmup
+
+
+class TestWarmup(unittest.TestCase):
+    """Unit tests for the background warm-up behind /readyz"""
+
+    def test_ready_once_every_step_ran(self):
+        calls = []
+        warmup = Warmup([lambda: calls.append("pool"), lambda: calls.append("cache")])
+
+        async def scenario():
+            await warmup.start()
+            await asyncio.sleep(0.05)
+            await warmup.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(calls, ["pool", "cache"])
+        self.assertTrue(warmup.ready)
+        self.assertEqual(warmup.stats()["attempts"], 1)
+
+    def test_failures_are_retried_until_the_database_is_up(self):
+        failures = [ConnectionError("database starting")] * 2
+
+        def step():
+            if failures:
+                raise failures.pop()
+
+        warmup = Warmup([step], retry_seconds=0.01)
+
+        async def scenario():
+            await warmup.start()
+            # Not ready while the first attempts fail
+            await asyncio.sleep(0)
+            self.assertFalse(warmup.ready)
+            await asyncio.sleep(0.2)
+            await warmup.stop()
+
+        asyncio.run(scenario())
+        self.assertTrue(warmup.ready)
+        self.assertEqual(warmup.attempts, 3)
+        self.assertIsNone(warmup.last_error)
+
+    def test_stop_cancels_an_unfinished_warmup(self):
+        warmup = Warmup([lambda: (_ for _ in ()).throw(ConnectionError("refused"))], retry_seconds=10)
+
+        async def scenario():
+            await warmup.start()
+            await asyncio.sleep(0.05)
+            await warmup.stop()
+
+        asyncio.run(scenario())
+        self.assertFalse(warmup.ready)
+        self.assertEqual(warmup.stats()["last_error"], "ConnectionError: refused")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)